@@ -20,7 +20,7 @@ from flask import (
     g,
     url_for)
 from flask._compat import string_types
-from flask.globals import _lookup_req_object, _request_ctx_stack
+from flask.globals import _request_ctx_err_msg, _request_ctx_stack
 from flask_login import LoginManager
 from flask_wtf import CSRFProtect
 from flask_wtf.csrf import CSRFError
@@ -39,8 +39,14 @@ from werkzeug.exceptions import abort
 from werkzeug.local import LocalProxy
 
 import app.proxy_fix
-from app.asset_fingerprinter import AssetFingerprinter
-from app.its_dangerous_session import ItsdangerousSessionInterface
+from app.asset_fingerprinter import ASSET_MANIFEST_PATH, AssetFingerprinter
+from app.cache import SharedCache, get_cache_backend
+from app.executor import RequestContextExecutor
+from app.its_dangerous_session import ItsdangerousSessionInterface, ServerSideSessionInterface
+from app.password_blacklist import PasswordBlacklist
+from app.preview_cache import PreviewCache
+from app.static_files import StaticFiles
+from app.template_preview_client import TemplatePreviewClient
 from app.notify_client.service_api_client import ServiceAPIClient
 from app.notify_client.api_key_api_client import ApiKeyApiClient
 from app.notify_client.invite_api_client import InviteApiClient
@@ -52,9 +58,12 @@ from app.notify_client.user_api_client import UserApiClient
 from app.notify_client.events_api_client import EventsApiClient
 from app.notify_client.provider_client import ProviderClient
 from app.notify_client.organisations_client import OrganisationsClient
+from app.notify_client import clear_request_cache
+from app.notify_client.connection_pool import ApiConnectionPool
 from app.notify_client.models import AnonymousUser
 from app.notify_client.letter_jobs_client import LetterJobsClient
 from app.notify_client.billing_api_client import BillingAPIClient
+from app.spreadsheet_converter import SpreadsheetConverter
 from app.utils import get_cdn_domain
 
 from app.utils import gmt_timezones
@@ -73,13 +82,37 @@ template_statistics_client = TemplateStatisticsApiClient()
 events_api_client = EventsApiClient()
 provider_client = ProviderClient()
 organisations_client = OrganisationsClient()
-asset_fingerprinter = AssetFingerprinter()
+asset_fingerprinter = AssetFingerprinter(manifest_path=ASSET_MANIFEST_PATH)
 statsd_client = StatsdClient()
 letter_jobs_client = LetterJobsClient()
 billing_api_client = BillingAPIClient()
-
-# The current service attached to the request stack.
-current_service = LocalProxy(partial(_lookup_req_object, 'service'))
+request_executor = RequestContextExecutor()
+shared_cache = SharedCache()
+api_connection_pool = ApiConnectionPool()
+spreadsheet_converter = SpreadsheetConverter()
+password_blacklist = PasswordBlacklist()
+preview_cache = PreviewCache()
+template_preview_client = TemplatePreviewClient()
+
+
+def _get_current_service():
+    request_context = _request_ctx_stack.top
+    if request_context is None:
+        raise RuntimeError(_request_ctx_err_msg)
+    if not hasattr(request_context, 'service'):
+        service_id = getattr(request_context, 'service_id', None)
+        try:
+            request_context.service = service_api_client.get_service(service_id)['data'] if service_id else None
+        except Exception:
+            # so the error page doesn't try to fetch it again
+            request_context.service = None
+            raise
+    return request_context.service
+
+
+# The current service attached to the request stack. It's only fetched from the API the first time it's used, because
+# plenty of pages (signing out, support, platform admin) never use it.
+current_service = LocalProxy(_get_current_service)
 
 
 def create_app():
@@ -96,6 +129,13 @@ def create_app():
     logging.init_app(application, statsd_client)
     init_csrf(application)
     request_id.init_app(application)
+    request_executor.init_app(application)
+    shared_cache.init_app(application)
+    api_connection_pool.init_app(application)
+    spreadsheet_converter.init_app(application)
+    password_blacklist.init_app(application)
+    preview_cache.init_app(application)
+    template_preview_client.init_app(application)
 
     service_api_client.init_app(application)
     user_api_client.init_app(application)
@@ -125,7 +165,20 @@ def create_app():
 
     proxy_fix.init_app(application)
 
-    application.session_interface = ItsdangerousSessionInterface()
+    application.wsgi_app = StaticFiles(
+        application.wsgi_app,
+        asset_fingerprinter,
+        root=application.static_folder,
+        prefix=application.static_url_path,
+        autorefresh=application.debug,
+    )
+
+    if application.config['SESSION_BACKEND']:
+        application.session_interface = ServerSideSessionInterface(
+            get_cache_backend(application, application.config['SESSION_BACKEND'], prefix='notify-admin-session:')
+        )
+    else:
+        application.session_interface = ItsdangerousSessionInterface()
 
     application.add_template_filter(format_datetime)
     application.add_template_filter(format_datetime_24h)
@@ -150,6 +203,7 @@ def create_app():
 
     application.after_request(useful_headers_after_request)
     application.after_request(save_service_after_request)
+    application.after_request(count_current_service_fetch)
     application.before_request(load_service_before_request)
 
     @application.context_processor
@@ -191,6 +245,8 @@ def init_app(application):
         g.start = monotonic()
         g.endpoint = request.endpoint
 
+    application.teardown_request(clear_request_cache)
+
     @application.context_processor
     def inject_global_template_variables():
         return {
@@ -255,11 +311,12 @@ def format_datetime_relative(date):
 
 def get_human_day(time):
 
+    local_time = gmt_timezones(time)
     #  Add 1 hour to get ‘midnight today’ instead of ‘midnight tomorrow’
-    time_as_day = (gmt_timezones(time) - timedelta(hours=1)).strftime('%A')
-    six_days_ago = gmt_timezones((datetime.utcnow() + timedelta(days=-6)).isoformat())
+    time_as_day = (local_time - timedelta(hours=1)).strftime('%A')
+    six_days_ago = datetime.now(timezone.utc) + timedelta(days=-6)
 
-    if gmt_timezones(time) < six_days_ago:
+    if local_time < six_days_ago:
         return format_date_short(time)
     if time_as_day == (datetime.utcnow() + timedelta(days=1)).strftime('%A'):
         return 'tomorrow'
@@ -271,13 +328,11 @@ def get_human_day(time):
 
 
 def format_time(date):
+    time = gmt_timezones(date).strftime('%-I:%M%p')
     return {
         '12:00AM': 'Midnight',
         '12:00PM': 'Midday'
-    }.get(
-        gmt_timezones(date).strftime('%-I:%M%p'),
-        gmt_timezones(date).strftime('%-I:%M%p')
-    ).lower()
+    }.get(time, time).lower()
 
 
 def format_date(date):
@@ -392,19 +447,30 @@ def load_user(user_id):
 
 
 def load_service_before_request():
-    if '/static/' in request.url:
+    if request.path.startswith('/static/'):
         _request_ctx_stack.top.service = None
         return
     service_id = request.view_args.get('service_id', session.get('service_id')) if request.view_args \
         else session.get('service_id')
     if _request_ctx_stack.top is not None:
-        _request_ctx_stack.top.service = service_api_client.get_service(service_id)['data'] if service_id else None
+        # fetched by `current_service` if it's used
+        _request_ctx_stack.top.service_id = service_id
+
+
+def count_current_service_fetch(response):
+    request_context = _request_ctx_stack.top
+    if getattr(request_context, 'service_id', None):
+        current_app.statsd_client.incr('current-service.{}.{}'.format(
+            'fetched' if hasattr(request_context, 'service') else 'skipped',
+            request.endpoint,
+        ))
+    return response
 
 
 def save_service_after_request(response):
     # Only save the current session if the request is 200
     service_id = request.view_args.get('service_id', None) if request.view_args else None
-    if response.status_code == 200 and service_id:
+    if response.status_code == 200 and service_id and session.get('service_id') != service_id:
         session['service_id'] = service_id
     return response
 
@@ -1,5 +1,9 @@
 import hashlib
-import codecs
+import json
+import os
+
+# written by scripts/generate_asset_manifest.py
+ASSET_MANIFEST_PATH = 'app/static/asset-manifest.json'
 
 
 class AssetFingerprinter(object):
@@ -18,29 +22,68 @@ class AssetFingerprinter(object):
             {{ asset_fingerprinter.get_url('stylesheets/application.css') }}
 
         * 'app/static' is assumed to be the root for all asset files
+
+        If there's a manifest at `manifest_path` (written at build time by
+        `scripts/generate_asset_manifest.py`) the hashes in it are used, so
+        assets don't have to be read while serving requests. Any asset that
+        isn't in the manifest is hashed the first time it's asked for.
     """
 
-    def __init__(self, asset_root='/static/', filesystem_path='app/static/'):
-        self._cache = {}
+    chunk_size = 64 * 1024
+
+    def __init__(self, asset_root='/static/', filesystem_path='app/static/', manifest_path=None):
         self._asset_root = asset_root
         self._filesystem_path = filesystem_path
+        self._cache = {
+            asset_path: self._make_url(asset_path, fingerprint)
+            for asset_path, fingerprint in self.read_manifest(manifest_path).items()
+        }
 
     def get_url(self, asset_path):
         if asset_path not in self._cache:
-            self._cache[asset_path] = (
-                self._asset_root +
-                asset_path +
-                '?' +
+            self._cache[asset_path] = self._make_url(
+                asset_path,
                 self.get_asset_fingerprint(self._filesystem_path + asset_path)
             )
         return self._cache[asset_path]
 
+    def _make_url(self, asset_path, fingerprint):
+        return self._asset_root + asset_path + '?' + fingerprint
+
     def get_asset_fingerprint(self, asset_file_path):
-        return hashlib.md5(
-            self.get_asset_file_contents(asset_file_path).encode('utf-8')
-        ).hexdigest()
-
-    def get_asset_file_contents(self, asset_file_path):
-        with codecs.open(asset_file_path, encoding='utf-8') as asset_file:
-            contents = asset_file.read()
-        return contents
+        fingerprint = hashlib.md5()
+        for chunk in self.get_asset_file_chunks(asset_file_path):
+            fingerprint.update(chunk)
+        return fingerprint.hexdigest()
+
+    def get_asset_file_chunks(self, asset_file_path):
+        with open(asset_file_path, 'rb') as asset_file:
+            for chunk in iter(lambda: asset_file.read(self.chunk_size), b''):
+                yield chunk
+
+    @staticmethod
+    def read_manifest(manifest_path):
+        if manifest_path is None:
+            return {}
+        try:
+            with open(manifest_path) as manifest:
+                return json.load(manifest)
+        except FileNotFoundError:
+            return {}
+
+    def write_manifest(self, manifest_path):
+        """
+        Hash every file under `filesystem_path` and write the hashes to `manifest_path`, keyed by the path `get_url`
+        is called with.
+        """
+        fingerprints = {}
+        for directory, _, filenames in os.walk(self._filesystem_path):
+            for filename in filenames:
+                file_path = os.path.join(directory, filename)
+                if os.path.abspath(file_path) == os.path.abspath(manifest_path):
+                    continue
+                asset_path = os.path.relpath(file_path, self._filesystem_path).replace(os.sep, '/')
+                fingerprints[asset_path] = self.get_asset_fingerprint(file_path)
+        with open(manifest_path, 'w') as manifest:
+            json.dump(fingerprints, manifest, indent=2, sort_keys=True)
+        return fingerprints
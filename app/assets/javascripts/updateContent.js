@@ -25,10 +25,12 @@
       resource,
       {
         'method': form ? 'post' : 'get',
-        'data': form ? $('#' + form).serialize() : {}
+        'data': form ? $('#' + form).serialize() : {},
+        // send the ETag of the last response, so we get an empty 304 if nothing has changed
+        'ifModified': true
       }
     ).done(
-      response => flushQueue(queue, response)
+      (response, status) => status === 'notmodified' ? clearQueue(queue) : flushQueue(queue, response)
     ).fail(
       () => poll = function(){}
     );
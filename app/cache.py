@@ -0,0 +1,241 @@
+import json
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, sleep
+
+from flask import current_app
+
+
+class LocalCache(object):
+    """
+        Keeps entries in this process's memory. Each entry can have its own
+        time to live, and once there are more than `max_entries` the least
+        recently used entries are thrown away.
+
+        Entries aren't shared between processes, so a write handled by one
+        gunicorn worker won't invalidate what the others have cached.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires_at, value = self._entries[key]
+            except KeyError:
+                return None
+            if expires_at is not None and expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._set(key, value, ex)
+
+    def _set(self, key, value, ex):
+        self._entries[key] = (monotonic() + ex if ex else None, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def add(self, key, value, ex=None):
+        """
+        Set `key` only if it isn't already set, and return whether it was.
+        """
+        with self._lock:
+            if key in self._entries:
+                expires_at, _ = self._entries[key]
+                if expires_at is None or expires_at > monotonic():
+                    return False
+            self._set(key, value, ex)
+            return True
+
+    def touch(self, key, ex=None):
+        """
+        Give `key` a new time to live, if it's still set.
+        """
+        with self._lock:
+            if key in self._entries:
+                expires_at, value = self._entries[key]
+                if expires_at is None or expires_at > monotonic():
+                    self._set(key, value, ex)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_if_equal(self, key, value):
+        """
+        Delete `key` only if it's still set to `value`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == value:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache(object):
+    """
+        Keeps entries in anything that speaks the Redis protocol, so every
+        process sees the same entries and invalidations. Eviction is left to
+        the server (run it with `maxmemory-policy allkeys-lru`).
+    """
+
+    def __init__(self, redis_client, prefix='notify-admin:'):
+        self._redis = redis_client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ex=None):
+        self._redis.set(self.prefix + key, value, ex=ex)
+
+    def add(self, key, value, ex=None):
+        return bool(self._redis.set(self.prefix + key, value, ex=ex, nx=True))
+
+    def touch(self, key, ex=None):
+        if ex:
+            self._redis.expire(self.prefix + key, ex)
+        else:
+            self._redis.persist(self.prefix + key)
+
+    def delete(self, *keys):
+        if keys:
+            self._redis.delete(*(self.prefix + key for key in keys))
+
+    def delete_if_equal(self, key, value):
+        # checked and deleted in one step on the server, so nothing can set the key in between
+        self._redis.eval(self.delete_if_equal_script, 1, self.prefix + key, value)
+
+    delete_if_equal_script = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            return redis.call('del', KEYS[1])
+        end
+        return 0
+    """
+
+
+def get_cache_backend(application, backend, prefix='notify-admin:'):
+    if backend == 'redis':
+        # only needed if this backend is configured
+        import redis
+        return RedisCache(redis.StrictRedis.from_url(
+            application.config['REDIS_URL'],
+            socket_timeout=application.config['REDIS_SOCKET_TIMEOUT'],
+        ), prefix=prefix)
+    if backend == 'local':
+        return LocalCache(max_entries=application.config['SHARED_CACHE_MAX_ENTRIES'])
+    if backend is None:
+        return None
+    raise ValueError('Unknown cache backend: {}'.format(backend))
+
+
+class SharedCache(object):
+    """
+        Caches JSON-serialisable values between requests, in whichever
+        backend `SHARED_CACHE_BACKEND` names (`local`, `redis` or `None` to
+        switch caching off).
+
+        The cache is never allowed to take the app down - if the backend
+        errors the failure is logged and treated as a miss.
+    """
+
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, application):
+        self.backend = get_cache_backend(application, application.config['SHARED_CACHE_BACKEND'])
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            current_app.logger.exception('Shared cache failed to get {}'.format(key))
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl_in_seconds=None):
+        if not self.enabled or value is None:
+            return
+        try:
+            self.backend.set(key, json.dumps(value), ex=ttl_in_seconds)
+        except Exception:
+            current_app.logger.exception('Shared cache failed to set {}'.format(key))
+
+    def get_or_set(self, key, fetch, ttl_in_seconds, lock_timeout=5, poll_interval=0.05):
+        """
+        Return what's cached under `key`, or else what `fetch()` returns, caching it for next time.
+
+        If several requests miss at once, only one of them calls `fetch`. The others wait up to `lock_timeout`
+        seconds for it to finish and share its result, rather than all making the same calls to the API at once.
+        If it doesn't finish in time they give up waiting and call `fetch` themselves.
+        """
+        if not self.enabled:
+            return fetch()
+
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = key + ':lock'
+        # so we only let go of the lock if it's still ours - if fetching took longer than `lock_timeout`, someone
+        # else may have taken it since
+        token = uuid.uuid4().hex
+        if self._add(lock_key, token, lock_timeout):
+            try:
+                # someone else may have fetched it between us missing and taking the lock
+                value = self.get(key)
+                if value is None:
+                    value = fetch()
+                    self.set(key, value, ttl_in_seconds=ttl_in_seconds)
+                return value
+            finally:
+                self._release(lock_key, token)
+
+        waited_until = monotonic() + lock_timeout
+        while monotonic() < waited_until:
+            sleep(poll_interval)
+            value = self.get(key)
+            if value is not None:
+                return value
+        return fetch()
+
+    def _add(self, key, value, ttl_in_seconds):
+        try:
+            return self.backend.add(key, json.dumps(value), ex=ttl_in_seconds)
+        except Exception:
+            current_app.logger.exception('Shared cache failed to add {}'.format(key))
+            # carry on without the lock
+            return True
+
+    def _release(self, key, value):
+        try:
+            self.backend.delete_if_equal(key, json.dumps(value))
+        except Exception:
+            current_app.logger.exception('Shared cache failed to delete {}'.format(key))
+
+    def delete(self, *keys):
+        if not self.enabled:
+            return
+        try:
+            self.backend.delete(*keys)
+        except Exception:
+            current_app.logger.exception('Shared cache failed to delete {}'.format(', '.join(keys)))
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 
@@ -50,6 +51,11 @@ class Config(object):
     SESSION_COOKIE_NAME = 'notify_admin_session'
     SESSION_COOKIE_SECURE = True
     SESSION_REFRESH_EACH_REQUEST = True
+    # unmodified sessions only get a new cookie once the old one has less than this many seconds left
+    SESSION_REFRESH_BEFORE_EXPIRY = 60 * 60
+    # where to keep sessions: `None` keeps the whole session in the cookie, `local` or `redis` keep it on the server
+    # with only its ID in the cookie
+    SESSION_BACKEND = None
     SHOW_STYLEGUIDE = True
     # TODO: move to utils
     SMS_CHAR_COUNT_LIMIT = 459
@@ -57,9 +63,44 @@ class Config(object):
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None
     CSV_UPLOAD_BUCKET_NAME = 'local-notifications-csv-upload'
+    CSV_UPLOAD_PART_SIZE = 8 * 1024 * 1024  # S3 won't accept parts smaller than 5MB
+    CSV_UPLOAD_MAX_CONCURRENCY = 2
+    CSV_EXPORT_CHUNK_SIZE = 64 * 1024  # characters
+    CSV_EXPORT_STORAGE = 's3'
+    CSV_EXPORT_LOCAL_DIRECTORY = os.path.join(tempfile.gettempdir(), 'notify-admin-exports')
+    CSV_EXPORT_SNAPSHOT_SECONDS = 15 * 60
+    SAVE_RECIPIENTS_SUMMARY = True
+    SPREADSHEET_CONVERSION_PROCESSES = 2
+    SPREADSHEET_CONVERSION_TIMEOUT = 60  # seconds
+    # a file of breached password hashes, made with scripts/build_password_blacklist.py, to check new passwords against
+    PASSWORD_BLACKLIST_FILE = os.environ.get('PASSWORD_BLACKLIST_FILE')
     DESKPRO_PERSON_EMAIL = 'donotreply@notifications.service.gov.uk'
     ACTIVITY_STATS_LIMIT_DAYS = 7
+    API_FAN_OUT_MAX_WORKERS = 8
+    API_POOL_MAXSIZE = API_FAN_OUT_MAX_WORKERS + 1  # the request's own thread, plus any it fans out to
+    API_POOL_BLOCK = True
+    API_CONNECT_TIMEOUT = 3.05  # seconds
+    API_READ_TIMEOUT = 30  # seconds
+    API_GET_RETRIES = 2
+    API_RETRY_BACKOFF_FACTOR = 0.1
+    REDIS_URL = os.environ.get('REDIS_URL')
+    REDIS_SOCKET_TIMEOUT = 0.5  # seconds
+    SHARED_CACHE_BACKEND = 'redis' if REDIS_URL else None
+    SHARED_CACHE_MAX_ENTRIES = 1000
+    JOB_UPDATES_TTL = 1  # second - less than the job page waits between polls
+    # an hour - finished jobs are mostly looked at just after they finish, and their notifications include
+    # personalisation, so they're kept for much less than the 7 days the API keeps them for
+    FINISHED_JOB_TTL = 60 * 60
     TEST_MESSAGE_FILENAME = 'Report'
+    TEMPLATE_PREVIEW_CONNECT_TIMEOUT = 3.05  # seconds
+    TEMPLATE_PREVIEW_READ_TIMEOUT = 15  # seconds
+    TEMPLATE_PREVIEW_MAX_CONCURRENCY = 2  # requests at once from each worker
+    TEMPLATE_PREVIEW_QUEUE_TIMEOUT = 5  # seconds to wait for one of those to finish
+    TEMPLATE_PREVIEW_FAILURE_THRESHOLD = 5  # failures in a row before we stop calling the service
+    TEMPLATE_PREVIEW_RESET_TIMEOUT = 30  # seconds before trying the service again
+    PREVIEW_CACHE_MEMORY_BYTES = 32 * 1024 * 1024
+    PREVIEW_CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), 'notify-admin-previews')
+    PREVIEW_CACHE_DISK_BYTES = 256 * 1024 * 1024
 
     STATSD_ENABLED = False
     STATSD_HOST = "statsd.hostedgraphite.com"
@@ -99,6 +140,8 @@ class Development(Config):
     STATSD_ENABLED = False
     CSV_UPLOAD_BUCKET_NAME = 'development-notifications-csv-upload'
     LOGO_UPLOAD_BUCKET_NAME = 'public-logos-tools'
+    SHARED_CACHE_BACKEND = 'redis' if Config.REDIS_URL else 'local'
+    CSV_EXPORT_STORAGE = 'local'
 
 
 class Test(Development):
@@ -107,9 +150,16 @@ class Test(Development):
     STATSD_ENABLED = True
     WTF_CSRF_ENABLED = False
     CSV_UPLOAD_BUCKET_NAME = 'test-notifications-csv-upload'
+    SAVE_RECIPIENTS_SUMMARY = False
+    SPREADSHEET_CONVERSION_PROCESSES = 0
+    CSV_EXPORT_STORAGE = None
+    PASSWORD_BLACKLIST_FILE = None
     LOGO_UPLOAD_BUCKET_NAME = 'public-logos-test'
     NOTIFY_ENVIRONMENT = 'test'
     TEMPLATE_PREVIEW_API_HOST = 'http://localhost:9999'
+    SHARED_CACHE_BACKEND = None
+    PREVIEW_CACHE_MEMORY_BYTES = 0
+    PREVIEW_CACHE_DIRECTORY = None
 
 
 class Preview(Config):
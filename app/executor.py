@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import Lock
+from time import monotonic
+
+from flask import current_app
+from flask.globals import _app_ctx_stack, _request_ctx_stack
+
+
+class RequestContextExecutor(object):
+    """
+        A bounded, per-process thread pool for making independent, blocking
+        API calls at the same time.
+
+        Work submitted from inside a request runs with the same app and
+        request context as the view that submitted it, so `g`, the current
+        user and the current service are all available to the worker thread.
+
+        Usage:
+
+            results = request_executor.run_concurrently(
+                'dashboard',
+                jobs=partial(job_api_client.get_jobs, service_id),
+                service=partial(service_api_client.get_detailed_service, service_id),
+            )
+            results['jobs'], results['service']
+    """
+
+    def __init__(self):
+        self.max_workers = 0
+        self._pool = None
+        self._pid = None
+        self._lock = Lock()
+
+    def init_app(self, application):
+        self.max_workers = application.config['API_FAN_OUT_MAX_WORKERS']
+
+    @property
+    def pool(self):
+        # gunicorn forks its workers after the app has been created, and threads don't survive a fork, so each
+        # process starts its own pool the first time it needs one
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def submit(self, fn, *args, **kwargs):
+        if not self.max_workers:
+            return _CompletedCall(fn, *args, **kwargs)
+        return self.pool.submit(_with_current_context(fn), *args, **kwargs)
+
+    def run_concurrently(self, stat_prefix, **calls):
+        """
+        Call each of `calls` concurrently and return a dict of their results, keyed the same way. The time each
+        call took is sent to statsd as `<stat_prefix>.<key>`. If any call raises, the exception is re-raised here.
+        """
+        futures = {
+            name: self.submit(_timed('{}.{}'.format(stat_prefix, name), call))
+            for name, call in calls.items()
+        }
+        return {
+            name: future.result()
+            for name, future in futures.items()
+        }
+
+
+class _CompletedCall(object):
+    """
+    Stands in for a `Future` when the pool is switched off, so callers don't need to care.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        self._exception = None
+        self._result = None
+        try:
+            self._result = fn(*args, **kwargs)
+        except Exception as e:
+            self._exception = e
+
+    def result(self, timeout=None):
+        if self._exception:
+            raise self._exception
+        return self._result
+
+
+def _with_current_context(fn):
+    # Push the submitting thread's contexts themselves, rather than copies, onto the worker's stacks. Copying a
+    # request context re-opens the session from the cookie, and pushing or popping one runs the app's teardown
+    # handlers, neither of which we want from a worker thread.
+    app_context = _app_ctx_stack.top
+    request_context = _request_ctx_stack.top
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if app_context is not None:
+            _app_ctx_stack.push(app_context)
+        if request_context is not None:
+            _request_ctx_stack.push(request_context)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if request_context is not None:
+                _request_ctx_stack.pop()
+            if app_context is not None:
+                _app_ctx_stack.pop()
+
+    return wrapper
+
+
+def _timed(stat, fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            current_app.statsd_client.timing(stat, monotonic() - start)
+
+    return wrapper
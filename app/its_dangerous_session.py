@@ -1,17 +1,32 @@
+import json
+import uuid
 from datetime import timedelta, datetime
+from functools import partial
 
 from werkzeug.datastructures import CallbackDict
+from flask import request
 from flask.sessions import SessionInterface, SessionMixin
 from itsdangerous import URLSafeTimedSerializer, BadSignature
 
 
 class ItsdangerousSession(CallbackDict, SessionMixin):
-    def __init__(self, initial=None):
+    def __init__(self, initial=None, issued_at=None):
         def on_update(self):
             self.modified = True
 
         CallbackDict.__init__(self, initial, on_update)
         self.modified = False
+        # when the cookie this session came from was signed
+        self.issued_at = issued_at
+        self._loaded_as = _serialize(initial)
+
+    @property
+    def changed(self):
+        """
+        Whether the session needs saving. Changing a dict or list inside the session, like
+        `session['upload_data']['valid'] = True`, doesn't set `modified`, so compare it with what was loaded too.
+        """
+        return self.modified or _serialize(self) != self._loaded_as
 
 
 class ItsdangerousSessionInterface(SessionInterface):
@@ -33,11 +48,25 @@ class ItsdangerousSessionInterface(SessionInterface):
             return self.session_class()
         max_age = app.permanent_session_lifetime.total_seconds()
         try:
-            data = s.loads(val, max_age=max_age)
-            return self.session_class(data)
+            data, issued_at = s.loads(val, max_age=max_age, return_timestamp=True)
+            return self.session_class(data, issued_at=issued_at)
         except BadSignature:
             return self.session_class()
 
+    def should_set_cookie(self, app, session):
+        """
+        Only re-issue an unmodified session's cookie once it's close to expiring, rather than on every request.
+        """
+        if session.changed or session.issued_at is None:
+            return True
+        if not app.config.get('SESSION_REFRESH_EACH_REQUEST'):
+            return False
+        expires_at = session.issued_at + timedelta(seconds=app.config.get('PERMANENT_SESSION_LIFETIME'))
+        return expires_at - datetime.utcnow() < timedelta(seconds=app.config.get('SESSION_REFRESH_BEFORE_EXPIRY'))
+
+    def count_cookie(self, app, outcome):
+        app.statsd_client.incr('session-cookie.{}.{}'.format(_get_request_type(), outcome))
+
     def save_session(self, app, session, response):
         domain = self.get_cookie_domain(app)
         if not session:
@@ -45,9 +74,170 @@ class ItsdangerousSessionInterface(SessionInterface):
                 response.delete_cookie(app.session_cookie_name,
                                        domain=domain)
             return
+        if not self.should_set_cookie(app, session):
+            self.count_cookie(app, 'skipped')
+            return
         session.permanent = True
         expires = datetime.utcnow() + timedelta(seconds=app.config.get('PERMANENT_SESSION_LIFETIME'))
         val = self.get_serializer(app).dumps(dict(session))
         response.set_cookie(app.session_cookie_name, val,
                             expires=expires, httponly=True,
                             domain=domain, secure=app.config.get('SESSION_COOKIE_SECURE'))
+        self.count_cookie(app, 'written')
+
+
+def _serialize(data):
+    return json.dumps(dict(data or {}), sort_keys=True, default=str)
+
+
+def _get_request_type():
+    if '/static/' in request.path:
+        return 'static'
+    if request.path.endswith('.json'):
+        return 'json'
+    return 'page'
+
+
+class ServerSideSession(ItsdangerousSession):
+    """
+        A session whose contents are kept in a `LocalCache` or `RedisCache`,
+        with only its ID in the cookie. The contents aren't fetched until
+        something reads or changes the session.
+    """
+
+    # who's signed in: Flask-Login's user ID, and the ID the API gave this sign in
+    authentication_keys = ('user_id', 'current_session_id')
+
+    def __init__(self, sid=None, load=None, issued_at=None):
+        super().__init__(issued_at=issued_at)
+        self.sid = sid
+        self._load = load
+        self._loaded_authentication = self._get_authentication()
+
+    @property
+    def loaded(self):
+        return self._load is None
+
+    @property
+    def changed(self):
+        # a session that's never been loaded can only have been changed by replacing its contents
+        return super().changed if self.loaded else self.modified
+
+    @property
+    def authentication_changed(self):
+        return self.loaded and self._get_authentication() != self._loaded_authentication
+
+    def load(self):
+        if self._load is not None:
+            load, self._load = self._load, None
+            # fill in the stored contents without marking the session as modified
+            dict.update(self, load() or {})
+            self._loaded_as = _serialize(self)
+            self._loaded_authentication = self._get_authentication()
+
+    def _get_authentication(self):
+        # dict.get, so looking doesn't load the session
+        return tuple(dict.get(self, key) for key in self.authentication_keys)
+
+
+def _loads_first(name):
+    def method(self, *args, **kwargs):
+        self.load()
+        return getattr(ItsdangerousSession, name)(self, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+for _name in (
+    '__contains__', '__delitem__', '__eq__', '__getitem__', '__iter__', '__len__', '__ne__', '__repr__',
+    '__setitem__', 'clear', 'copy', 'get', 'items', 'keys', 'pop', 'popitem', 'setdefault', 'update', 'values',
+):
+    setattr(ServerSideSession, _name, _loads_first(_name))
+
+
+class ServerSideSessionInterface(ItsdangerousSessionInterface):
+    """
+        Keeps sessions in `backend` and only a signed session ID in the cookie,
+        so the cookie stays small however much is put in the session.
+
+        Sessions are only written back when they've been modified. Otherwise
+        their expiry is pushed back when the cookie's is. If the backend errors,
+        the failure is logged and the session is treated as empty.
+
+        Signing in or out moves the session to a new ID and deletes the old
+        one, so an ID someone got hold of beforehand is no use to them.
+    """
+
+    session_class = ServerSideSession
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open_session(self, app, request):
+        s = self.get_serializer(app)
+        if s is None:
+            return None
+        val = request.cookies.get(app.session_cookie_name)
+        if not val:
+            return self.session_class()
+        max_age = app.permanent_session_lifetime.total_seconds()
+        try:
+            sid, issued_at = s.loads(val, max_age=max_age, return_timestamp=True)
+        except BadSignature:
+            return self.session_class()
+        return self.session_class(sid, load=partial(self._get, app, sid), issued_at=issued_at)
+
+    def save_session(self, app, session, response):
+        domain = self.get_cookie_domain(app)
+        lifetime = app.config.get('PERMANENT_SESSION_LIFETIME')
+        if session.changed:
+            if not session:
+                if session.sid:
+                    self._delete(app, session.sid)
+                response.delete_cookie(app.session_cookie_name, domain=domain)
+                return
+            if session.sid and session.authentication_changed:
+                self._delete(app, session.sid)
+                session.sid = None
+            if not session.sid:
+                session.sid = uuid.uuid4().hex
+            self._set(app, session.sid, dict(session), lifetime)
+        elif not session.sid:
+            return
+        elif self.should_set_cookie(app, session):
+            self._touch(app, session.sid, lifetime)
+        else:
+            self.count_cookie(app, 'skipped')
+            return
+        expires = datetime.utcnow() + timedelta(seconds=lifetime)
+        val = self.get_serializer(app).dumps(session.sid)
+        response.set_cookie(app.session_cookie_name, val,
+                            expires=expires, httponly=True,
+                            domain=domain, secure=app.config.get('SESSION_COOKIE_SECURE'))
+        self.count_cookie(app, 'written')
+
+    def _get(self, app, sid):
+        try:
+            value = self.backend.get(sid)
+        except Exception:
+            app.logger.exception('Couldn’t get session')
+            return None
+        return json.loads(value) if value is not None else None
+
+    def _set(self, app, sid, data, lifetime):
+        try:
+            self.backend.set(sid, json.dumps(data), ex=lifetime)
+        except Exception:
+            app.logger.exception('Couldn’t save session')
+
+    def _touch(self, app, sid, lifetime):
+        try:
+            self.backend.touch(sid, ex=lifetime)
+        except Exception:
+            app.logger.exception('Couldn’t extend session')
+
+    def _delete(self, app, sid):
+        try:
+            self.backend.delete(sid)
+        except Exception:
+            app.logger.exception('Couldn’t delete session')
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from flask import Response, current_app, request, stream_with_context
+from werkzeug.http import parse_range_header, quote_etag
+
+from app.main.s3_client import s3download_export, s3get_export_details, s3upload_export
+
+
+class LocalExportStore(object):
+    """
+        Keeps exports as files in a directory on this machine, with their
+        checksum alongside. For running the app locally.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, service_id, export_id):
+        return os.path.join(self.directory, 'service-{}-{}.csv'.format(service_id, export_id))
+
+    def get_details(self, service_id, export_id):
+        path = self._path(service_id, export_id)
+        try:
+            with open(path + '.sha256') as checksum_file:
+                return os.path.getsize(path), checksum_file.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, service_id, export_id, fileobj, checksum):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(service_id, export_id)
+        # write to temporary files and move them into place, so a half written export is never served
+        with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as saved:
+            shutil.copyfileobj(fileobj, saved)
+        os.replace(saved.name, path)
+        with tempfile.NamedTemporaryFile('w', dir=self.directory, delete=False) as saved:
+            saved.write(checksum)
+        os.replace(saved.name, path + '.sha256')
+
+    def read(self, service_id, export_id, start, stop, chunk_size):
+        with open(self._path(service_id, export_id), 'rb') as export:
+            export.seek(start)
+            remaining = stop - start
+            while remaining:
+                chunk = export.read(min(chunk_size, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+
+class S3ExportStore(object):
+    """
+        Keeps exports in the CSV upload bucket, next to the files services
+        upload, and with the same lifecycle.
+    """
+
+    get_details = staticmethod(s3get_export_details)
+    save = staticmethod(s3upload_export)
+    read = staticmethod(s3download_export)
+
+
+def get_export_store():
+    storage = current_app.config['CSV_EXPORT_STORAGE']
+    if storage == 's3':
+        return S3ExportStore()
+    if storage == 'local':
+        return LocalExportStore(current_app.config['CSV_EXPORT_LOCAL_DIRECTORY'])
+    return None
+
+
+def get_export_id(**kwargs):
+    """
+    Identifies an export by everything that affects what's in it.
+    """
+    return hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def send_export(store, service_id, export_id, generate_csv, filename):
+    """
+    Sends an export. The first time, it's streamed to the browser as it's made and saved at the same time, so
+    downloading it again, or resuming a download that failed part way through, doesn't mean fetching every
+    notification in it from the API again.
+
+    Once it's saved, supports requests for a single range of bytes, and `If-None-Match` and `If-Range` with the
+    export's checksum as its ETag.
+    """
+    details = store.get_details(service_id, export_id)
+    if details is None:
+        # its size and checksum aren't known until it's made, so it's sent whole, without an ETag
+        return Response(
+            stream_with_context(_stream_and_save_export(store, service_id, export_id, generate_csv)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'inline; filename="{}"'.format(filename)},
+        )
+    current_app.statsd_client.incr('csv-export.reused')
+    size, checksum = details
+
+    headers = {
+        'Content-Disposition': 'inline; filename="{}"'.format(filename),
+        'Accept-Ranges': 'bytes',
+        'ETag': quote_etag(checksum),
+    }
+
+    if request.if_none_match.contains(checksum):
+        return Response(status=304, headers=headers)
+
+    start, stop, status = 0, size, 200
+    byte_range = parse_range_header(request.headers.get('Range'))
+    if_range = request.headers.get('If-Range')
+    if byte_range and len(byte_range.ranges) == 1 and (not if_range or if_range == quote_etag(checksum)):
+        range_for_length = byte_range.range_for_length(size)
+        if range_for_length is None:
+            headers['Content-Range'] = 'bytes */{}'.format(size)
+            return Response(status=416, headers=headers)
+        start, stop = range_for_length
+        status = 206
+        headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, stop - 1, size)
+
+    headers['Content-Length'] = str(stop - start)
+    body = []
+    if stop > start:
+        body = store.read(service_id, export_id, start, stop, current_app.config['CSV_EXPORT_CHUNK_SIZE'])
+    return Response(
+        body,
+        status=status,
+        mimetype='text/csv',
+        headers=headers,
+    )
+
+
+def _stream_and_save_export(store, service_id, export_id, generate_csv):
+    checksum = hashlib.sha256()
+    # keep a copy on disk, rather than in memory, because exports can be hundreds of megabytes
+    with tempfile.TemporaryFile() as export:
+        for chunk in generate_csv():
+            chunk = chunk.encode('utf-8')
+            checksum.update(chunk)
+            export.write(chunk)
+            yield chunk
+        # only reached if the whole export was made and sent, so a download that's abandoned part way isn't saved
+        export.seek(0)
+        try:
+            store.save(service_id, export_id, export, checksum.hexdigest())
+        except Exception:
+            # the browser already has the export, so it's only the next download that will have to make it again
+            current_app.logger.exception('Couldn’t save export {} for service {}'.format(export_id, service_id))
+            return
+    current_app.statsd_client.incr('csv-export.saved')
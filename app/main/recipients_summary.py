@@ -0,0 +1,170 @@
+import hashlib
+import json
+
+from notifications_utils.columns import Columns
+
+from app.utils import get_errors_for_csv
+
+
+def get_fingerprint(db_template, whitelist, international_sms, service_name, sms_sender):
+    """
+    Identifies everything, other than the file itself, that checking a file depends on. If any of it changes
+    (a new version of the template, someone joins a restricted service, the service is renamed...) the file needs
+    checking again.
+
+    The service's name and text message sender are there because they decide whether text messages start with the
+    service's name, which counts towards their length.
+    """
+    return hashlib.sha256(json.dumps([
+        [db_template.get(key) for key in ('id', 'version', 'template_type', 'subject', 'content')],
+        sorted(str(item) for item in whitelist) if whitelist is not None else None,
+        international_sms,
+        service_name,
+        sms_sender,
+    ]).encode('utf-8')).hexdigest()
+
+
+class RecipientsSummary(object):
+    """
+        What the check page needs to know about an uploaded file, worked out
+        once from a `RecipientCSV` so it can be saved and used again without
+        downloading and checking the whole file each time.
+
+        How many more messages the service can send today changes all the
+        time, so it isn't part of the summary. Set `remaining_messages` before
+        asking if there are any errors.
+    """
+
+    # bump this if the attributes change, so summaries saved by older versions aren't used
+    version = 1
+
+    def __init__(
+        self,
+        fingerprint,
+        row_count,
+        max_rows,
+        too_many_rows,
+        column_headers,
+        recipient_column_headers,
+        missing_column_headers,
+        has_recipient_columns,
+        allowed_to_send_to,
+        has_errors_other_than_message_limit,
+        row_errors,
+        first_row,
+        initial_annotated_rows,
+        initial_annotated_rows_with_errors,
+        rows_with_errors,
+        count_of_displayed_recipients,
+    ):
+        self.fingerprint = fingerprint
+        self.row_count = row_count
+        self.max_rows = max_rows
+        self.too_many_rows = too_many_rows
+        self.column_headers = column_headers
+        self.recipient_column_headers = recipient_column_headers
+        self.missing_column_headers = missing_column_headers
+        self.has_recipient_columns = has_recipient_columns
+        self.allowed_to_send_to = allowed_to_send_to
+        self.has_errors_other_than_message_limit = has_errors_other_than_message_limit
+        self.row_errors = row_errors
+        self.first_row = first_row
+        self.initial_annotated_rows = initial_annotated_rows
+        self.initial_annotated_rows_with_errors = initial_annotated_rows_with_errors
+        self.rows_with_errors = rows_with_errors
+        self.count_of_displayed_recipients = count_of_displayed_recipients
+        self.remaining_messages = None
+
+    def __len__(self):
+        return self.row_count
+
+    @property
+    def more_rows_than_can_send(self):
+        return self.row_count > self.remaining_messages
+
+    @property
+    def has_errors(self):
+        return self.has_errors_other_than_message_limit or self.more_rows_than_can_send
+
+    @classmethod
+    def from_recipients(cls, recipients, template_type, fingerprint):
+        first_row = next(recipients.rows, None)
+        initial_annotated_rows = list(recipients.initial_annotated_rows)
+        initial_annotated_rows_with_errors = list(recipients.initial_annotated_rows_with_errors)
+        rows_with_errors = set(recipients.rows_with_errors)
+
+        return cls(
+            fingerprint=fingerprint,
+            # files with too many rows don't get annotated, but still need counting
+            row_count=sum(1 for _ in recipients.rows),
+            max_rows=recipients.max_rows,
+            too_many_rows=bool(recipients.too_many_rows),
+            column_headers=list(recipients.column_headers),
+            recipient_column_headers=list(recipients.recipient_column_headers),
+            missing_column_headers=sorted(recipients.missing_column_headers),
+            has_recipient_columns=bool(recipients.has_recipient_columns),
+            allowed_to_send_to=bool(recipients.allowed_to_send_to),
+            has_errors_other_than_message_limit=bool(recipients.has_errors),
+            row_errors=get_errors_for_csv(recipients, template_type),
+            first_row=first_row,
+            initial_annotated_rows=initial_annotated_rows,
+            initial_annotated_rows_with_errors=initial_annotated_rows_with_errors,
+            # only the rows that get shown on the page need to be remembered
+            rows_with_errors={
+                row['index'] for row in initial_annotated_rows + initial_annotated_rows_with_errors
+                if row['index'] in rows_with_errors
+            },
+            count_of_displayed_recipients=(
+                len(initial_annotated_rows_with_errors)
+                if rows_with_errors and not recipients.missing_column_headers else
+                len(initial_annotated_rows)
+            ),
+        )
+
+    def to_json(self):
+        return json.dumps({
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'row_count': self.row_count,
+            'max_rows': self.max_rows,
+            'too_many_rows': self.too_many_rows,
+            'column_headers': self.column_headers,
+            'recipient_column_headers': self.recipient_column_headers,
+            'missing_column_headers': self.missing_column_headers,
+            'has_recipient_columns': self.has_recipient_columns,
+            'allowed_to_send_to': self.allowed_to_send_to,
+            'has_errors_other_than_message_limit': self.has_errors_other_than_message_limit,
+            'row_errors': self.row_errors,
+            # rows are saved as lists of pairs, because they can have a column called None
+            'first_row': list(self.first_row.items()) if self.first_row is not None else None,
+            'initial_annotated_rows': [_serialise_row(row) for row in self.initial_annotated_rows],
+            'initial_annotated_rows_with_errors': [
+                _serialise_row(row) for row in self.initial_annotated_rows_with_errors
+            ],
+            'rows_with_errors': sorted(self.rows_with_errors),
+            'count_of_displayed_recipients': self.count_of_displayed_recipients,
+        })
+
+    @classmethod
+    def from_json(cls, serialised):
+        """
+        Returns None if the summary was saved by a different version of this class.
+        """
+        data = json.loads(serialised)
+        if data.pop('version', None) != cls.version:
+            return None
+        data['first_row'] = Columns(dict(data['first_row'])) if data['first_row'] is not None else None
+        data['initial_annotated_rows'] = [_deserialise_row(row) for row in data['initial_annotated_rows']]
+        data['initial_annotated_rows_with_errors'] = [
+            _deserialise_row(row) for row in data['initial_annotated_rows_with_errors']
+        ]
+        data['rows_with_errors'] = set(data['rows_with_errors'])
+        return cls(**data)
+
+
+def _serialise_row(row):
+    return dict(row, columns=list(row['columns'].items()))
+
+
+def _deserialise_row(row):
+    return dict(row, columns=Columns(dict(row['columns'])))
@@ -1,10 +1,13 @@
 import uuid
 import botocore
 from boto3 import resource
+from boto3.s3.transfer import TransferConfig
 from flask import current_app
 from notifications_utils.s3 import s3upload as utils_s3upload
 
 FILE_LOCATION_STRUCTURE = 'service-{}-notify/{}.csv'
+SUMMARY_LOCATION_STRUCTURE = 'service-{}-notify/{}.summary.json'
+EXPORT_LOCATION_STRUCTURE = 'service-{}-notify/exports/{}.csv'
 TEMP_TAG = 'temp-{user_id}_'
 LOGO_LOCATION_STRUCTURE = '{temp}{unique_id}-{filename}'
 
@@ -39,13 +42,38 @@ def get_temp_truncated_filename(filename, user_id):
 def s3upload(service_id, filedata, region):
     upload_id = str(uuid.uuid4())
     upload_file_name = FILE_LOCATION_STRUCTURE.format(service_id, upload_id)
-    utils_s3upload(filedata=filedata['data'],
-                   region=region,
-                   bucket_name=current_app.config['CSV_UPLOAD_BUCKET_NAME'],
-                   file_location=upload_file_name)
+    if hasattr(filedata['data'], 'read'):
+        s3upload_stream(filedata['data'],
+                        region=region,
+                        bucket_name=current_app.config['CSV_UPLOAD_BUCKET_NAME'],
+                        file_location=upload_file_name)
+    else:
+        utils_s3upload(filedata=filedata['data'],
+                       region=region,
+                       bucket_name=current_app.config['CSV_UPLOAD_BUCKET_NAME'],
+                       file_location=upload_file_name)
     return upload_id
 
 
+def s3upload_stream(fileobj, region, bucket_name, file_location, content_type='binary/octet-stream', metadata=None):
+    """
+    Upload a file-like object in parts, so only a few parts are held in memory at once, however big the file.
+    """
+    part_size = current_app.config['CSV_UPLOAD_PART_SIZE']
+    extra_args = {'ServerSideEncryption': 'AES256', 'ContentType': content_type}
+    if metadata:
+        extra_args['Metadata'] = metadata
+    resource('s3', region_name=region).Object(bucket_name, file_location).upload_fileobj(
+        fileobj,
+        ExtraArgs=extra_args,
+        Config=TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=current_app.config['CSV_UPLOAD_MAX_CONCURRENCY'],
+        ),
+    )
+
+
 def s3download(service_id, upload_id):
     contents = ''
     try:
@@ -60,6 +88,71 @@ def s3download(service_id, upload_id):
     return contents
 
 
+def s3upload_recipients_summary(service_id, upload_id, summary_json):
+    bucket_name = current_app.config['CSV_UPLOAD_BUCKET_NAME']
+    summary_file_name = SUMMARY_LOCATION_STRUCTURE.format(service_id, upload_id)
+    try:
+        get_s3_object(bucket_name, summary_file_name).put(
+            Body=summary_json.encode('utf-8'),
+            ServerSideEncryption='AES256',
+            ContentType='application/json',
+        )
+    except botocore.exceptions.ClientError:
+        # the summary can always be worked out again from the file
+        current_app.logger.exception("Unable to upload s3 file {}".format(summary_file_name))
+
+
+def s3download_recipients_summary(service_id, upload_id):
+    """
+    Returns None if there's no summary for this upload yet.
+    """
+    bucket_name = current_app.config['CSV_UPLOAD_BUCKET_NAME']
+    summary_file_name = SUMMARY_LOCATION_STRUCTURE.format(service_id, upload_id)
+    try:
+        return get_s3_object(bucket_name, summary_file_name).get()['Body'].read().decode('utf-8')
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] != 'NoSuchKey':
+            current_app.logger.exception("Unable to download s3 file {}".format(summary_file_name))
+        return None
+
+
+def s3upload_export(service_id, export_id, fileobj, checksum):
+    s3upload_stream(
+        fileobj,
+        region=current_app.config['AWS_REGION'],
+        bucket_name=current_app.config['CSV_UPLOAD_BUCKET_NAME'],
+        file_location=EXPORT_LOCATION_STRUCTURE.format(service_id, export_id),
+        content_type='text/csv',
+        metadata={'sha256': checksum},
+    )
+
+
+def s3get_export_details(service_id, export_id):
+    """
+    Returns the size and checksum of an export, or None if it hasn't been saved yet.
+    """
+    export_file_name = EXPORT_LOCATION_STRUCTURE.format(service_id, export_id)
+    export = get_s3_object(current_app.config['CSV_UPLOAD_BUCKET_NAME'], export_file_name)
+    try:
+        export.load()
+    except botocore.exceptions.ClientError as e:
+        if e.response['Error']['Code'] not in {'404', 'NoSuchKey'}:
+            current_app.logger.exception("Unable to find s3 file {}".format(export_file_name))
+        return None
+    return export.content_length, export.metadata.get('sha256')
+
+
+def s3download_export(service_id, export_id, start, stop, chunk_size):
+    """
+    Yields bytes `start` to `stop` (not including `stop`) of an export, a chunk at a time.
+    """
+    body = get_s3_object(
+        current_app.config['CSV_UPLOAD_BUCKET_NAME'],
+        EXPORT_LOCATION_STRUCTURE.format(service_id, export_id),
+    ).get(Range='bytes={}-{}'.format(start, stop - 1))['Body']
+    return iter(lambda: body.read(chunk_size), b'')
+
+
 def upload_logo(filename, filedata, region, user_id):
     upload_file_name = LOGO_LOCATION_STRUCTURE.format(
         temp=TEMP_TAG.format(user_id=user_id),
@@ -2,8 +2,7 @@ from wtforms import ValidationError
 from notifications_utils.template import Template
 from notifications_utils.gsm import get_non_gsm_compatible_characters
 
-from app import formatted_list
-from app.main._blacklisted_passwords import blacklisted_passwords
+from app import formatted_list, password_blacklist
 from app.utils import (
     Spreadsheet,
     is_gov_user
@@ -17,7 +16,7 @@ class Blacklist:
         self.message = message
 
     def __call__(self, form, field):
-        if field.data in blacklisted_passwords:
+        if field.data in password_blacklist:
             raise ValidationError(self.message)
 
 
@@ -7,7 +7,7 @@ from flask_login import login_required
 from notifications_utils.recipients import format_phone_number_human_readable
 from notifications_utils.template import SMSPreviewTemplate
 from app.main import main
-from app.utils import user_has_permissions
+from app.utils import user_has_permissions, with_etag
 from app import notification_api_client, service_api_client
 from notifications_python_client.errors import HTTPError
 
@@ -30,6 +30,7 @@ def conversation(service_id, notification_id):
 @main.route("/services/<service_id>/conversation/<notification_id>.json")
 @login_required
 @user_has_permissions('view_activity', admin_override=True)
+@with_etag
 def conversation_updates(service_id, notification_id):
 
     return jsonify(get_conversation_partials(
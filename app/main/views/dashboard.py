@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from datetime import datetime
 from functools import partial
 from flask import (
@@ -17,6 +18,7 @@ from app import (
     current_service,
     billing_api_client,
     job_api_client,
+    request_executor,
     service_api_client,
     template_statistics_client
 )
@@ -24,8 +26,12 @@ from app.statistics_utils import get_formatted_percentage, add_rate_to_job
 from app.utils import (
     user_has_permissions,
     get_current_financial_year,
+    get_page_from_request,
+    generate_next_dict,
+    generate_previous_dict,
     FAILURE_STATUSES,
     REQUESTED_STATUSES,
+    with_etag,
 )
 
 
@@ -61,6 +67,7 @@ def service_dashboard(service_id):
 
 @main.route("/services/<service_id>/dashboard.json")
 @user_has_permissions('view_activity', admin_override=True)
+@with_etag
 def service_dashboard_updates(service_id):
     return jsonify(**get_dashboard_partials(service_id))
 
@@ -148,41 +155,59 @@ def inbox(service_id):
     return render_template(
         'views/dashboard/inbox.html',
         partials=get_inbox_partials(service_id),
-        updates_url=url_for('.inbox_updates', service_id=service_id),
+        updates_url=url_for('.inbox_updates', service_id=service_id, page=request.args.get('page')),
     )
 
 
 @main.route("/services/<service_id>/inbox.json")
 @login_required
 @user_has_permissions('view_activity', admin_override=True)
+@with_etag
 def inbox_updates(service_id):
 
     return jsonify(get_inbox_partials(service_id))
 
 
+INBOX_PAGE_SIZE = 50
+
+
 def get_inbox_partials(service_id):
 
     if 'inbound_sms' not in current_service['permissions']:
         abort(403)
 
-    messages_to_show = list()
-    inbound_messages = service_api_client.get_inbound_sms(service_id)
+    page = get_page_from_request()
+    if page is None:
+        abort(404, "Invalid page argument ({}).".format(request.args['page']))
 
-    for message in inbound_messages:
-        if format_phone_number_human_readable(message['user_number']) not in {
-            format_phone_number_human_readable(message['user_number'])
-            for message in messages_to_show
-        }:
-            messages_to_show.append(message)
+    inbound_messages = service_api_client.get_inbound_sms(service_id)
+    conversations = group_inbound_messages(inbound_messages)
+    first_on_page = (page - 1) * INBOX_PAGE_SIZE
 
     return {'messages': render_template(
         'views/dashboard/_inbox_messages.html',
-        messages=messages_to_show,
+        messages=[message for user, message in conversations[first_on_page:first_on_page + INBOX_PAGE_SIZE]],
         count_of_messages=len(inbound_messages),
-        count_of_users=len(messages_to_show),
+        count_of_users=len(conversations),
+        prev_page=generate_previous_dict('main.inbox', service_id, page) if page > 1 else None,
+        next_page=(
+            generate_next_dict('main.inbox', service_id, page)
+            if len(conversations) > first_on_page + INBOX_PAGE_SIZE else None
+        ),
     )}
 
 
+def group_inbound_messages(messages):
+    """
+    Groups inbound messages, newest first as the API returns them, into a list of `(user, latest message)` pairs
+    with the most recently active user first.
+    """
+    conversations = OrderedDict()
+    for message in messages:
+        conversations.setdefault(format_phone_number_human_readable(message['user_number']), message)
+    return list(conversations.items())
+
+
 def aggregate_usage(template_statistics, sort_key='count'):
     return sorted(
         template_statistics,
@@ -195,19 +220,37 @@ def get_dashboard_partials(service_id):
     # all but scheduled and cancelled
     statuses_to_display = job_api_client.JOB_STATUSES - {'scheduled', 'cancelled'}
 
-    template_statistics = aggregate_usage(
-        template_statistics_client.get_template_statistics_for_service(service_id, limit_days=7)
+    # None of these calls depend on each other, so make them at the same time
+    api_calls = dict(
+        template_statistics=partial(
+            template_statistics_client.get_template_statistics_for_service, service_id, limit_days=7
+        ),
+        scheduled_jobs=partial(
+            job_api_client.get_jobs, service_id, statuses=['scheduled']
+        ),
+        immediate_jobs=partial(
+            job_api_client.get_jobs, service_id, limit_days=7, statuses=statuses_to_display
+        ),
+        service=partial(
+            service_api_client.get_detailed_service, service_id
+        ),
     )
+    if 'inbound_sms' in current_service['permissions']:
+        api_calls['inbound_sms_summary'] = partial(service_api_client.get_inbound_sms_summary, service_id)
+
+    responses = request_executor.run_concurrently('dashboard.partials', **api_calls)
+
+    template_statistics = aggregate_usage(responses['template_statistics'])
 
     scheduled_jobs = sorted(
-        job_api_client.get_jobs(service_id, statuses=['scheduled'])['data'],
+        responses['scheduled_jobs']['data'],
         key=lambda job: job['scheduled_for']
     )
     immediate_jobs = [
         add_rate_to_job(job)
-        for job in job_api_client.get_jobs(service_id, limit_days=7, statuses=statuses_to_display)['data']
+        for job in responses['immediate_jobs']['data']
     ]
-    service = service_api_client.get_detailed_service(service_id)
+    service = responses['service']
 
     return {
         'upcoming': render_template(
@@ -216,10 +259,7 @@ def get_dashboard_partials(service_id):
         ),
         'inbox': render_template(
             'views/dashboard/_inbox.html',
-            inbound_sms_summary=(
-                service_api_client.get_inbound_sms_summary(service_id)
-                if 'inbound_sms' in current_service['permissions'] else None
-            ),
+            inbound_sms_summary=responses.get('inbound_sms_summary'),
         ),
         'totals': render_template(
             'views/dashboard/_totals.html',
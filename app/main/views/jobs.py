@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from orderedset import OrderedSet
+from functools import partial
 from itertools import chain
+from time import monotonic, time
 
 from flask import (
     render_template,
@@ -25,8 +27,10 @@ from app import (
     notification_api_client,
     service_api_client,
     current_service,
+    shared_cache,
     format_datetime_short)
 from app.main import main
+from app.main.exports import get_export_id, get_export_store, send_export
 from app.main.forms import SearchNotificationsForm
 from app.utils import (
     get_page_from_request,
@@ -41,6 +45,7 @@ from app.utils import (
     SENDING_STATUSES,
     DELIVERED_STATUSES,
     get_letter_timings,
+    with_etag,
 )
 from app.statistics_utils import add_rate_to_job
 
@@ -108,9 +113,6 @@ def view_job(service_id, job_id):
     filter_args = _parse_filter_args(request.args)
     filter_args['status'] = _set_status_filters(filter_args)
 
-    total_notifications = job.get('notification_count', 0)
-    processed_notifications = job.get('notifications_delivered', 0) + job.get('notifications_failed', 0)
-
     template = service_api_client.get_service_template(
         service_id=service_id,
         template_id=job['template'],
@@ -119,7 +121,7 @@ def view_job(service_id, job_id):
 
     return render_template(
         'views/jobs/job.html',
-        finished=(total_notifications == processed_notifications),
+        finished=_job_is_finished(job),
         uploaded_file_name=job['original_file_name'],
         template_id=job['template'],
         status=request.args.get('status', ''),
@@ -149,24 +151,34 @@ def view_job_csv(service_id, job_id):
     )['data']
     filter_args = _parse_filter_args(request.args)
     filter_args['status'] = _set_status_filters(filter_args)
+    csv_args = dict(
+        service_id=service_id,
+        job_id=job_id,
+        status=filter_args.get('status'),
+        page=request.args.get('page', 1),
+        page_size=5000,
+        format_for_csv=True
+    )
+    filename = '{} - {}.csv'.format(template['name'], format_datetime_short(job['created_at']))
+
+    export_store = get_export_store()
+    if export_store and _job_is_finished(job):
+        # a finished job's notifications won't change, so the export only needs making once
+        return send_export(
+            export_store,
+            service_id,
+            get_export_id(**csv_args),
+            partial(generate_notifications_csv, **csv_args),
+            filename,
+        )
 
     return Response(
         stream_with_context(
-            generate_notifications_csv(
-                service_id=service_id,
-                job_id=job_id,
-                status=filter_args.get('status'),
-                page=request.args.get('page', 1),
-                page_size=5000,
-                format_for_csv=True
-            )
+            generate_notifications_csv(**csv_args)
         ),
         mimetype='text/csv',
         headers={
-            'Content-Disposition': 'inline; filename="{} - {}.csv"'.format(
-                template['name'],
-                format_datetime_short(job['created_at'])
-            )
+            'Content-Disposition': 'inline; filename="{}"'.format(filename)
         }
     )
 
@@ -181,18 +193,46 @@ def cancel_job(service_id, job_id):
 
 @main.route("/services/<service_id>/jobs/<job_id>.json")
 @user_has_permissions('view_activity', admin_override=True)
+@with_etag
 def view_job_updates(service_id, job_id):
+    # everyone watching the same job shares one set of calls to the API, and one render, every few seconds
+    return jsonify(**shared_cache.get_or_set(
+        'service-{}-job-{}-partials-{}'.format(service_id, job_id, request.args.get('status')),
+        partial(_get_job_updates, service_id, job_id),
+        ttl_in_seconds=current_app.config['JOB_UPDATES_TTL'],
+    ))
 
-    job = job_api_client.get_job(service_id, job_id)['data']
 
-    return jsonify(**get_job_partials(
+# when a template's index has this many finished jobs, start it again rather than let it grow
+FINISHED_JOBS_INDEX_MAX_ENTRIES = 10
+
+
+def _get_job_updates(service_id, job_id):
+    status = _set_status_filters(_parse_filter_args(request.args))
+    ttl = current_app.config['FINISHED_JOB_TTL']
+    finished_job_key = 'service-{}-job-{}-finished'.format(service_id, job_id)
+
+    job = shared_cache.get(finished_job_key)
+    if job is None:
+        job = job_api_client.get_job(service_id, job_id)['data']
+        if _job_is_finished(job):
+            # nothing about a job changes once all its notifications have been delivered or failed
+            shared_cache.set(finished_job_key, job, ttl_in_seconds=ttl)
+
+    if _job_is_finished(job):
+        notifications = _get_finished_job_notifications(service_id, job_id, job['template'], status, ttl)
+    else:
+        notifications = notification_api_client.get_notifications_for_service(service_id, job_id, status=status)
+
+    return get_job_partials(
         job,
         service_api_client.get_service_template(
             service_id=current_service['id'],
             template_id=job['template'],
             version=job['template_version']
         )['data'],
-    ))
+        notifications=notifications,
+    )
 
 
 @main.route('/services/<service_id>/notifications/<message_type>', methods=['GET', 'POST'])
@@ -212,6 +252,7 @@ def view_notifications(service_id, message_type):
 
 @main.route('/services/<service_id>/notifications/<message_type>.json', methods=['GET', 'POST'])
 @user_has_permissions('view_activity', admin_override=True)
+@with_etag
 def get_notifications_as_json(service_id, message_type):
     return jsonify(get_notifications(
         service_id, message_type, status_override=request.args.get('status')
@@ -230,14 +271,29 @@ def get_notifications(service_id, message_type, status_override=None):
     filter_args = _parse_filter_args(request.args)
     filter_args['status'] = _set_status_filters(filter_args)
     if request.path.endswith('csv'):
+        csv_args = dict(
+            service_id=service_id,
+            page=page,
+            page_size=5000,
+            template_type=[message_type],
+            status=filter_args.get('status'),
+            limit_days=current_app.config['ACTIVITY_STATS_LIMIT_DAYS']
+        )
+        export_store = get_export_store()
+        if export_store:
+            # new notifications keep arriving, so an export is only reused for a few minutes - long enough to
+            # resume a download that failed part way through
+            snapshot = int(time() // current_app.config['CSV_EXPORT_SNAPSHOT_SECONDS'])
+            return send_export(
+                export_store,
+                service_id,
+                get_export_id(snapshot=snapshot, **csv_args),
+                partial(generate_notifications_csv, **csv_args),
+                'notifications.csv',
+            )
         return Response(
-            generate_notifications_csv(
-                service_id=service_id,
-                page=page,
-                page_size=5000,
-                template_type=[message_type],
-                status=filter_args.get('status'),
-                limit_days=current_app.config['ACTIVITY_STATS_LIMIT_DAYS']
+            stream_with_context(
+                generate_notifications_csv(**csv_args)
             ),
             mimetype='text/csv',
             headers={
@@ -278,9 +334,9 @@ def get_notifications(service_id, message_type, status_override=None):
         ),
         'notifications': render_template(
             'views/activity/notifications.html',
-            notifications=list(add_preview_of_content_to_notifications(
+            notifications=add_preview_of_content_to_notifications(
                 notifications['notifications']
-            )),
+            ),
             page=page,
             prev_page=prev_page,
             next_page=next_page,
@@ -362,12 +418,40 @@ def _get_job_counts(job):
     ]
 
 
-def get_job_partials(job, template):
+def _get_finished_job_notifications(service_id, job_id, template_id, status, ttl):
+    # one index per template, so redacting the template can throw away the personalisation of all its jobs at once.
+    # Each entry keeps its own expiry, so adding another job doesn't keep the older ones for longer
+    index_key = 'service-{}-template-{}-finished-jobs'.format(service_id, template_id)
+    now = time()
+    finished_jobs = {
+        key: entry for key, entry in (shared_cache.get(index_key) or {}).items()
+        if entry['expires_at'] > now
+    }
+    notifications_key = '{}-{}'.format(job_id, ','.join(status))
+    if notifications_key in finished_jobs:
+        return finished_jobs[notifications_key]['notifications']
+
+    notifications = notification_api_client.get_notifications_for_service(service_id, job_id, status=status)
+    if len(finished_jobs) >= FINISHED_JOBS_INDEX_MAX_ENTRIES:
+        finished_jobs = {}
+    finished_jobs[notifications_key] = {'notifications': notifications, 'expires_at': now + ttl}
+    shared_cache.set(index_key, finished_jobs, ttl_in_seconds=ttl)
+    return notifications
+
+
+def _job_is_finished(job):
+    return job.get('notification_count', 0) == (
+        job.get('notifications_delivered', 0) + job.get('notifications_failed', 0)
+    )
+
+
+def get_job_partials(job, template, notifications=None):
     filter_args = _parse_filter_args(request.args)
     filter_args['status'] = _set_status_filters(filter_args)
-    notifications = notification_api_client.get_notifications_for_service(
-        job['service'], job['id'], status=filter_args['status']
-    )
+    if notifications is None:
+        notifications = notification_api_client.get_notifications_for_service(
+            job['service'], job['id'], status=filter_args['status']
+        )
 
     if template['template_type'] == 'letter':
         counts = render_template(
@@ -386,9 +470,7 @@ def get_job_partials(job, template):
         'counts': counts,
         'notifications': render_template(
             'partials/jobs/notifications.html',
-            notifications=list(
-                add_preview_of_content_to_notifications(notifications['notifications'])
-            ),
+            notifications=add_preview_of_content_to_notifications(notifications['notifications']),
             more_than_one_page=bool(notifications.get('links', {}).get('next')),
             percentage_complete=(job['notifications_requested'] / job['notification_count'] * 100),
             download_link=url_for(
@@ -410,29 +492,32 @@ def get_job_partials(job, template):
 
 
 def add_preview_of_content_to_notifications(notifications):
+    """
+    Adds a preview of each notification's content (an SMS's message, or an email or letter's subject).
+
+    Notifications on a page mostly share a template, so each version of a template is only made into a `Template`
+    once, with just the personalisation swapped in for each notification.
+    """
+    start = monotonic()
+    templates = {}
 
     for notification in notifications:
 
         if notification['template'].get('redact_personalisation'):
             notification['personalisation'] = {}
 
+        template_key = (notification['template']['id'], notification['template'].get('version'))
+        if template_key not in templates:
+            templates[template_key] = (
+                Template if notification['template']['template_type'] == 'sms' else WithSubjectTemplate
+            )(notification['template'], redact_missing_personalisation=True)
+        template = templates[template_key]
+        template.values = notification['personalisation']
+
         if notification['template']['template_type'] == 'sms':
-            yield dict(
-                preview_of_content=str(Template(
-                    notification['template'],
-                    notification['personalisation'],
-                    redact_missing_personalisation=True,
-                )),
-                **notification
-            )
+            notification['preview_of_content'] = str(template)
         else:
-            yield dict(
-                preview_of_content=(
-                    WithSubjectTemplate(
-                        notification['template'],
-                        notification['personalisation'],
-                        redact_missing_personalisation=True,
-                    ).subject
-                ),
-                **notification
-            )
+            notification['preview_of_content'] = template.subject
+
+    current_app.statsd_client.timing('notification-previews', monotonic() - start)
+    return notifications
@@ -25,6 +25,7 @@ from app.utils import (
     FAILURE_STATUSES,
     SENDING_STATUSES,
     DELIVERED_STATUSES,
+    with_etag,
 )
 
 
@@ -109,6 +110,7 @@ def view_letter_notification_as_image(service_id, notification_id):
 
 @main.route("/services/<service_id>/notification/<notification_id>.json")
 @user_has_permissions('view_activity', admin_override=True)
+@with_etag
 def view_notification_updates(service_id, notification_id):
     return jsonify(**get_single_notification_partials(
         notification_api_client.get_notification(service_id, notification_id)
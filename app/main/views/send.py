@@ -1,7 +1,6 @@
 import itertools
 from string import ascii_uppercase
 
-from contextlib import suppress
 from zipfile import BadZipFile
 from xlrd.biffh import XLRDError
 from werkzeug.routing import RequestRedirect
@@ -33,20 +32,24 @@ from app.main.forms import (
     ChooseTimeForm,
     get_placeholder_form_instance
 )
+from app.main.recipients_summary import RecipientsSummary, get_fingerprint
 from app.main.s3_client import (
     s3upload,
-    s3download
+    s3download,
+    s3download_recipients_summary,
+    s3upload_recipients_summary,
 )
 from app import job_api_client, service_api_client, current_service, user_api_client, notification_api_client
+from app import spreadsheet_converter
 from app.utils import (
     user_has_permissions,
-    get_errors_for_csv,
     Spreadsheet,
     get_help_argument,
     get_template,
     email_or_sms_not_enabled,
 )
 from app.template_previews import TemplatePreview, get_page_count_for_letter
+from app.spreadsheet_converter import SpreadsheetConversionTimeout
 
 
 def get_page_headings(template_type):
@@ -122,7 +125,7 @@ def send_messages(service_id, template_id):
         try:
             upload_id = s3upload(
                 service_id,
-                Spreadsheet.from_file(form.file.data, filename=form.file.data.filename).as_dict,
+                spreadsheet_converter.from_file(form.file.data, filename=form.file.data.filename).as_stream_dict,
                 current_app.config['AWS_REGION']
             )
             session['upload_data'] = {
@@ -137,6 +140,10 @@ def send_messages(service_id, template_id):
             flash('Couldn’t read {}. Try using a different file format.'.format(
                 form.file.data.filename
             ))
+        except SpreadsheetConversionTimeout:
+            flash('{} is too big to read. Try saving it as a CSV file.'.format(
+                form.file.data.filename
+            ))
 
     column_headings = first_column_headings[template.template_type] + list(template.placeholders)
 
@@ -235,6 +242,7 @@ def send_test_step(service_id, template_id, step_index):
     db_template = service_api_client.get_service_template(service_id, template_id)['data']
 
     if not session.get('send_test_letter_page_count'):
+        # stays empty, so the next step asks again, if the template preview service can't say yet
         session['send_test_letter_page_count'] = get_page_count_for_letter(db_template)
 
     template = get_template(
@@ -373,13 +381,13 @@ def _check_messages(service_id, template_type, upload_id, letters_as_pdf=False):
     statistics = service_api_client.get_detailed_service_for_today(service_id)['data']['statistics']
     remaining_messages = (current_service['message_limit'] - sum(stat['requested'] for stat in statistics.values()))
 
-    contents = s3download(service_id, upload_id)
+    db_template = service_api_client.get_service_template(
+        service_id,
+        session['upload_data'].get('template_id')
+    )['data']
 
     template = get_template(
-        service_api_client.get_service_template(
-            service_id,
-            session['upload_data'].get('template_id')
-        )['data'],
+        db_template,
         current_service,
         show_recipient=True,
         letter_preview_url=url_for(
@@ -390,18 +398,19 @@ def _check_messages(service_id, template_type, upload_id, letters_as_pdf=False):
             filetype='png',
         ) if not letters_as_pdf else None
     )
-    recipients = RecipientCSV(
-        contents,
-        template_type=template.template_type,
-        placeholders=template.placeholders,
-        max_initial_rows_shown=50,
-        max_errors_shown=50,
-        whitelist=itertools.chain.from_iterable(
+    recipients = get_recipients_summary(
+        service_id,
+        upload_id,
+        db_template,
+        template,
+        whitelist=list(itertools.chain.from_iterable(
             [user.name, user.mobile_number, user.email_address] for user in users
-        ) if current_service['restricted'] else None,
-        remaining_messages=remaining_messages,
+        )) if current_service['restricted'] else None,
         international_sms='international_sms' in current_service['permissions'],
+        service_name=current_service['name'],
+        sms_sender=current_service['sms_sender'],
     )
+    recipients.remaining_messages = remaining_messages
 
     if request.args.get('from_test'):
         # only happens if generating a letter preview test
@@ -411,28 +420,24 @@ def _check_messages(service_id, template_type, upload_id, letters_as_pdf=False):
         back_link = url_for('.send_messages', service_id=service_id, template_id=template.id)
         choose_time_form = ChooseTimeForm()
 
-    with suppress(StopIteration):
-        first_recipient = None
-        template.values = next(recipients.rows)
+    first_recipient = None
+    if recipients.first_row is not None:
+        template.values = recipients.first_row
         first_recipient = template.values.get(
             Columns.make_key(recipients.recipient_column_headers[0]),
             ''
         )
 
-    session['upload_data']['notification_count'] = len(list(recipients.rows))
+    session['upload_data']['notification_count'] = len(recipients)
     session['upload_data']['valid'] = not recipients.has_errors
     return dict(
         recipients=recipients,
         first_recipient=first_recipient,
         template=template,
         errors=recipients.has_errors,
-        row_errors=get_errors_for_csv(recipients, template.template_type),
+        row_errors=recipients.row_errors,
         count_of_recipients=session['upload_data']['notification_count'],
-        count_of_displayed_recipients=(
-            len(list(recipients.initial_annotated_rows_with_errors))
-            if any(recipients.rows_with_errors) and not recipients.missing_column_headers else
-            len(list(recipients.initial_annotated_rows))
-        ),
+        count_of_displayed_recipients=recipients.count_of_displayed_recipients,
         original_file_name=session['upload_data'].get('original_file_name'),
         upload_id=upload_id,
         form=CsvUploadForm(),
@@ -443,6 +448,42 @@ def _check_messages(service_id, template_type, upload_id, letters_as_pdf=False):
     )
 
 
+def get_recipients_summary(
+    service_id, upload_id, db_template, template, whitelist, international_sms, service_name, sms_sender
+):
+    """
+    Checks an uploaded file, or re-uses the summary saved last time it was checked if nothing it depends on has
+    changed since.
+    """
+    fingerprint = get_fingerprint(db_template, whitelist, international_sms, service_name, sms_sender)
+    save_summary = current_app.config['SAVE_RECIPIENTS_SUMMARY']
+
+    if save_summary:
+        saved_summary = s3download_recipients_summary(service_id, upload_id)
+        summary = RecipientsSummary.from_json(saved_summary) if saved_summary else None
+        if summary and summary.fingerprint == fingerprint:
+            return summary
+
+    summary = RecipientsSummary.from_recipients(
+        RecipientCSV(
+            s3download(service_id, upload_id),
+            template_type=template.template_type,
+            placeholders=template.placeholders,
+            max_initial_rows_shown=50,
+            max_errors_shown=50,
+            whitelist=whitelist,
+            international_sms=international_sms,
+        ),
+        template.template_type,
+        fingerprint,
+    )
+
+    if save_summary:
+        s3upload_recipients_summary(service_id, upload_id, summary.to_json())
+
+    return summary
+
+
 @main.route("/services/<service_id>/<template_type>/check/<upload_id>", methods=['GET'])
 @login_required
 @user_has_permissions('send_texts', 'send_emails', 'send_letters')
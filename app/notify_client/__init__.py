@@ -1,8 +1,19 @@
+import json
+import logging
+import urllib.parse
+from copy import deepcopy
+from time import monotonic
+
+import requests
 from flask_login import current_user
-from flask import has_request_context, request, abort
+from flask import current_app, g, has_request_context, request, abort
+from notifications_python_client.authentication import create_jwt_token
 from notifications_python_client.base import BaseAPIClient
+from notifications_python_client.errors import HTTPError, InvalidResponse
 from notifications_python_client.version import __version__
 
+logger = logging.getLogger(__name__)
+
 
 def _attach_current_user(data):
     return dict(
@@ -11,7 +22,42 @@ def _attach_current_user(data):
     )
 
 
+def clear_request_cache(exception=None):
+    g.pop('api_request_cache', None)
+
+
+def _get_request_cache():
+    if not has_request_context():
+        return None
+    return g.setdefault('api_request_cache', {})
+
+
+def _record_request_cache_stat(outcome):
+    current_app.statsd_client.incr('api-request-cache.{}.{}'.format(request.endpoint, outcome))
+
+
+def _paths_overlap(first, second):
+    first, second = (
+        [segment for segment in url.split('?')[0].split('/') if segment]
+        for url in (first, second)
+    )
+    shortest = min(len(first), len(second))
+    return first[:shortest] == second[:shortest]
+
+
 class NotifyAdminAPIClient(BaseAPIClient):
+
+    connection_pool = None
+
+    def init_app(self, application):
+        # this file is imported in app/__init__.py before the connection pool is initialised
+        from app import api_connection_pool
+
+        self.base_url = application.config['API_HOST_NAME']
+        self.service_id = application.config['ADMIN_CLIENT_USER_NAME']
+        self.api_key = application.config['ADMIN_CLIENT_SECRET']
+        self.connection_pool = api_connection_pool
+
     def generate_headers(self, api_token):
         headers = {
             "Content-type": "application/json",
@@ -37,14 +83,85 @@ class NotifyAdminAPIClient(BaseAPIClient):
         if current_service and not current_service['active'] and not current_user.platform_admin:
             abort(403)
 
-    def post(self, *args, **kwargs):
+    def request(self, method, url, data=None, params=None):
+        """
+        The same as BaseAPIClient.request, except that it goes through this process's pooled session, with timeouts
+        and retries, rather than opening a new connection each time.
+        """
+        if self.connection_pool is None:
+            return super().request(method, url, data=data, params=params)
+
+        logger.debug("API request {} {}".format(method, url))
+
+        api_token = create_jwt_token(self.api_key, self.service_id)
+        url = urllib.parse.urljoin(str(self.base_url), str(url))
+
+        start_time = monotonic()
+        try:
+            response = self.connection_pool.session.request(
+                method,
+                url,
+                headers=self.generate_headers(api_token),
+                data=json.dumps(data),
+                params=params,
+                timeout=self.connection_pool.timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            api_error = HTTPError.create(e)
+            logger.error("API {} request on {} failed with {} '{}'".format(
+                method, url, api_error.status_code, api_error.message
+            ))
+            raise api_error
+        finally:
+            logger.debug("API {} request on {} finished in {}".format(method, url, monotonic() - start_time))
+
+        if response.status_code == 204:
+            return
+        try:
+            return response.json()
+        except ValueError:
+            raise InvalidResponse(response, message="No JSON response object could be decoded")
+
+    def get(self, url, params=None):
+        """
+        GET requests are remembered for the rest of the request, so asking for the same resource twice while
+        rendering a page only goes to the API once. Callers are given their own copy of the response, because
+        plenty of them modify what they get back.
+        """
+        cache = _get_request_cache()
+        if cache is None:
+            return super().get(url, params=params)
+
+        key = (self.base_url, url, json.dumps(params, sort_keys=True, default=str))
+        if key in cache:
+            _record_request_cache_stat('hit')
+            return deepcopy(cache[key])
+
+        _record_request_cache_stat('miss')
+        response = super().get(url, params=params)
+        cache[key] = deepcopy(response)
+        return response
+
+    def invalidate_request_cache(self, url):
+        cache = _get_request_cache()
+        if not cache:
+            return
+        for key in list(cache):
+            if _paths_overlap(key[1], url):
+                cache.pop(key, None)
+
+    def post(self, url, *args, **kwargs):
         self.check_inactive_service()
-        return super().post(*args, **kwargs)
+        self.invalidate_request_cache(url)
+        return super().post(url, *args, **kwargs)
 
-    def put(self, *args, **kwargs):
+    def put(self, url, *args, **kwargs):
         self.check_inactive_service()
-        return super().put(*args, **kwargs)
+        self.invalidate_request_cache(url)
+        return super().put(url, *args, **kwargs)
 
-    def delete(self, *args, **kwargs):
+    def delete(self, url, *args, **kwargs):
         self.check_inactive_service()
-        return super().delete(*args, **kwargs)
+        self.invalidate_request_cache(url)
+        return super().delete(url, *args, **kwargs)
@@ -7,11 +7,6 @@ class BillingAPIClient(NotifyAdminAPIClient):
     def __init__(self):
         super().__init__("a" * 73, "b")
 
-    def init_app(self, application):
-        self.base_url = application.config['API_HOST_NAME']
-        self.service_id = application.config['ADMIN_CLIENT_USER_NAME']
-        self.api_key = application.config['ADMIN_CLIENT_SECRET']
-
     def get_billable_units(self, service_id, year):
         return self.get(
             '/service/{0}/billing/monthly-usage'.format(service_id),
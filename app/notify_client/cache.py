@@ -0,0 +1,70 @@
+from functools import wraps
+from inspect import signature
+
+from flask import current_app
+
+
+def _make_key(key_format, client_method, args, kwargs):
+    arguments = signature(client_method).bind(*args, **kwargs)
+    arguments.apply_defaults()
+    return key_format.format(**arguments.arguments)
+
+
+def set(key_format, ttl_in_seconds):
+    """
+    Cache what a client method returns in the shared cache, under a key built from the method's arguments, eg
+
+        @cache.set('service-{service_id}', ttl_in_seconds=300)
+        def get_service(self, service_id):
+    """
+    def _set(client_method):
+
+        @wraps(client_method)
+        def new_client_method(client_instance, *args, **kwargs):
+            # app/__init__.py imports the clients before the shared cache exists
+            from app import shared_cache
+
+            if not shared_cache.enabled:
+                return client_method(client_instance, *args, **kwargs)
+
+            key = _make_key(key_format, client_method, (client_instance,) + args, kwargs)
+            cached = shared_cache.get(key)
+            if cached is not None:
+                current_app.statsd_client.incr('api-cache.{}.hit'.format(client_method.__name__))
+                return cached
+
+            current_app.statsd_client.incr('api-cache.{}.miss'.format(client_method.__name__))
+            response = client_method(client_instance, *args, **kwargs)
+            shared_cache.set(key, response, ttl_in_seconds=ttl_in_seconds)
+            return response
+
+        return new_client_method
+
+    return _set
+
+
+def delete(*key_formats):
+    """
+    Remove the cached copies of whatever a client method changes, eg
+
+        @cache.delete('service-{service_id}')
+        def update_service(self, service_id, **kwargs):
+    """
+    def _delete(client_method):
+
+        @wraps(client_method)
+        def new_client_method(client_instance, *args, **kwargs):
+            from app import shared_cache
+
+            try:
+                return client_method(client_instance, *args, **kwargs)
+            finally:
+                # even if the API errored, the write might have happened
+                shared_cache.delete(*(
+                    _make_key(key_format, client_method, (client_instance,) + args, kwargs)
+                    for key_format in key_formats
+                ))
+
+        return new_client_method
+
+    return _delete
@@ -0,0 +1,138 @@
+import os
+from threading import Lock
+from time import monotonic
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+
+class ApiConnectionPool(object):
+    """
+        Holds one `requests.Session` per process, shared by every API client,
+        so calls to the API reuse kept-alive connections instead of paying for
+        a new TCP and TLS handshake each time.
+
+        GETs are retried with backoff if the connection fails or the API
+        returns a 502, 503 or 504. Other methods are only retried if a
+        connection couldn't be made, so the request was never sent.
+    """
+
+    def __init__(self):
+        self.stats = ConnectionPoolStats()
+        self._session = None
+        self._pid = None
+        self._lock = Lock()
+
+    def init_app(self, application):
+        self.maxsize = application.config['API_POOL_MAXSIZE']
+        self.block = application.config['API_POOL_BLOCK']
+        self.timeout = (application.config['API_CONNECT_TIMEOUT'], application.config['API_READ_TIMEOUT'])
+        self.retries = application.config['API_GET_RETRIES']
+        self.backoff_factor = application.config['API_RETRY_BACKOFF_FACTOR']
+        self.stats.statsd_client = application.statsd_client
+
+    @property
+    def session(self):
+        # sockets can't be shared with the processes gunicorn forks, so each worker opens its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.stats.reset()
+                    self._session = self._new_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = _InstrumentedAdapter(
+            self.stats,
+            pool_maxsize=self.maxsize,
+            pool_block=self.block,
+            max_retries=Retry(
+                total=self.retries,
+                backoff_factor=self.backoff_factor,
+                status_forcelist=(502, 503, 504),
+                method_whitelist=frozenset(['GET']),
+                raise_on_status=False,
+            ),
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+
+class ConnectionPoolStats(object):
+    """
+        Counts, for this process, how many requests were sent over a
+        connection from the pool, how many of those needed a new connection
+        and how long requests spent waiting for a free connection.
+    """
+
+    def __init__(self):
+        self.statsd_client = None
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.new_connections = 0
+            self.wait_seconds = 0
+
+    def record_checkout(self, wait_seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += wait_seconds
+        if self.statsd_client:
+            self.statsd_client.timing('api-connection-pool.wait', wait_seconds)
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+        if self.statsd_client:
+            self.statsd_client.incr('api-connection-pool.new-connection')
+
+    @property
+    def reuse_ratio(self):
+        if not self.checkouts:
+            return None
+        return 1 - (self.new_connections / self.checkouts)
+
+    def as_dict(self):
+        return {
+            'pid': os.getpid(),
+            'checkouts': self.checkouts,
+            'new_connections': self.new_connections,
+            'reuse_ratio': self.reuse_ratio,
+            'wait_seconds': self.wait_seconds,
+        }
+
+
+class _InstrumentedPoolMixin(object):
+    stats = None
+
+    def _get_conn(self, timeout=None):
+        start = monotonic()
+        conn = super()._get_conn(timeout=timeout)
+        self.stats.record_checkout(monotonic() - start)
+        return conn
+
+    def _new_conn(self):
+        self.stats.record_new_connection()
+        return super()._new_conn()
+
+
+class _InstrumentedAdapter(HTTPAdapter):
+
+    def __init__(self, stats, **kwargs):
+        # HTTPAdapter.__init__ calls init_poolmanager, so this has to be set first
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_class.__name__, (_InstrumentedPoolMixin, pool_class), {'stats': self.stats})
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
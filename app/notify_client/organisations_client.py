@@ -1,4 +1,4 @@
-from app.notify_client import NotifyAdminAPIClient
+from app.notify_client import NotifyAdminAPIClient, cache
 
 
 class OrganisationsClient(NotifyAdminAPIClient):
@@ -6,20 +6,19 @@ class OrganisationsClient(NotifyAdminAPIClient):
     def __init__(self):
         super().__init__("a" * 73, "b")
 
-    def init_app(self, app):
-        self.base_url = app.config['API_HOST_NAME']
-        self.service_id = app.config['ADMIN_CLIENT_USER_NAME']
-        self.api_key = app.config['ADMIN_CLIENT_SECRET']
-
+    @cache.set('organisation-{id}', ttl_in_seconds=3600)
     def get_organisation(self, id):
         return self.get(url='/organisation/{}'.format(id))
 
+    @cache.set('organisations', ttl_in_seconds=3600)
     def get_organisations(self):
         return self.get(url='/organisation')['organisations']
 
+    @cache.set('letter-organisations', ttl_in_seconds=3600)
     def get_letter_organisations(self):
         return self.get(url='/dvla_organisations')
 
+    @cache.delete('organisations')
     def create_organisation(self, logo, name, colour):
         data = {
             "logo": logo,
@@ -28,6 +27,7 @@ class OrganisationsClient(NotifyAdminAPIClient):
         }
         return self.post(url="/organisation", data=data)
 
+    @cache.delete('organisations', 'organisation-{org_id}')
     def update_organisation(self, org_id, logo, name, colour):
         data = {
             "logo": logo,
@@ -1,21 +1,18 @@
 
-from app.notify_client import _attach_current_user, NotifyAdminAPIClient
+from app.notify_client import _attach_current_user, NotifyAdminAPIClient, cache
 
 
 class ProviderClient(NotifyAdminAPIClient):
     def __init__(self):
         super().__init__("a" * 73, "b")
 
-    def init_app(self, app):
-        self.base_url = app.config['API_HOST_NAME']
-        self.service_id = app.config['ADMIN_CLIENT_USER_NAME']
-        self.api_key = app.config['ADMIN_CLIENT_SECRET']
-
+    @cache.set('providers', ttl_in_seconds=3600)
     def get_all_providers(self):
         return self.get(
             url='/provider-details'
         )
 
+    @cache.set('provider-{provider_id}', ttl_in_seconds=3600)
     def get_provider_by_id(self, provider_id):
         return self.get(
             url='/provider-details/{}'.format(provider_id)
@@ -26,6 +23,7 @@ class ProviderClient(NotifyAdminAPIClient):
             url='/provider-details/{}/versions'.format(provider_id)
         )
 
+    @cache.delete('providers', 'provider-{provider_id}')
     def update_provider(self, provider_id, priority):
         data = {
             "priority": priority
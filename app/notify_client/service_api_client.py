@@ -2,7 +2,7 @@ from __future__ import unicode_literals
 
 from flask import url_for
 from app.utils import BrowsableItem
-from app.notify_client import _attach_current_user, NotifyAdminAPIClient
+from app.notify_client import _attach_current_user, NotifyAdminAPIClient, cache
 from . import notification_api_client
 
 
@@ -12,11 +12,8 @@ class ServiceAPIClient(NotifyAdminAPIClient):
     def __init__(self):
         super().__init__("a" * 73, "b")
 
-    def init_app(self, application):
-        self.base_url = application.config['API_HOST_NAME']
-        self.service_id = application.config['ADMIN_CLIENT_USER_NAME']
-        self.api_key = application.config['ADMIN_CLIENT_SECRET']
-
+    # the user who creates a service is given permissions for it
+    @cache.delete('user-{user_id}')
     def create_service(self, service_name, message_limit, restricted, user_id, email_from):
         """
         Create a service and return the json.
@@ -32,6 +29,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         data = _attach_current_user(data)
         return self.post("/service", data)['data']['id']
 
+    @cache.set('service-{service_id}', ttl_in_seconds=3600)
     def get_service(self, service_id):
         return self._get_service(service_id, detailed=False, today_only=False)
 
@@ -71,6 +69,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         params_dict['only_active'] = True
         return self.get_services(params_dict)
 
+    @cache.delete('service-{service_id}')
     def update_service(
         self,
         service_id,
@@ -107,15 +106,19 @@ class ServiceAPIClient(NotifyAdminAPIClient):
     def update_service_with_properties(self, service_id, properties):
         return self.update_service(service_id, **properties)
 
+    @cache.delete('service-{service_id}')
     def archive_service(self, service_id):
         return self.post('/service/{}/archive'.format(service_id), data=None)
 
+    @cache.delete('service-{service_id}')
     def suspend_service(self, service_id):
         return self.post('/service/{}/suspend'.format(service_id), data=None)
 
+    @cache.delete('service-{service_id}')
     def resume_service(self, service_id):
         return self.post('/service/{}/resume'.format(service_id), data=None)
 
+    @cache.delete('service-{service_id}', 'user-{user_id}')
     def remove_user_from_service(self, service_id, user_id):
         """
         Remove a user from a service
@@ -126,6 +129,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         data = _attach_current_user({})
         return self.delete(endpoint, data)
 
+    @cache.delete('service-{service_id}-templates')
     def create_service_template(self, name, type_, content, service_id, subject=None, process_type='normal'):
         """
         Create a service template.
@@ -145,6 +149,11 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         endpoint = "/service/{0}/template".format(service_id)
         return self.post(endpoint, data)
 
+    @cache.delete(
+        'service-{service_id}-templates',
+        'service-{service_id}-template-{id_}-version-None',
+        'service-{service_id}-template-{id_}-page-counts',
+    )
     def update_service_template(self, id_, name, type_, content, service_id, subject=None, process_type=None):
         """
         Update a service template.
@@ -168,6 +177,13 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         endpoint = "/service/{0}/template/{1}".format(service_id, id_)
         return self.post(endpoint, data)
 
+    @cache.delete(
+        'service-{service_id}-templates',
+        'service-{service_id}-template-{id_}-version-None',
+        'service-{service_id}-template-{id_}-page-counts',
+        # the job page keeps the notifications of finished jobs, personalisation and all, by template
+        'service-{service_id}-template-{id_}-finished-jobs',
+    )
     def redact_service_template(self, service_id, id_):
         return self.post(
             "/service/{}/template/{}".format(service_id, id_),
@@ -176,6 +192,8 @@ class ServiceAPIClient(NotifyAdminAPIClient):
             ),
         )
 
+    # keyed by service too, so a template can't be fetched from the cache through another service's URL
+    @cache.set('service-{service_id}-template-{template_id}-version-{version}', ttl_in_seconds=3600)
     def get_service_template(self, service_id, template_id, version=None, *params):
         """
         Retrieve a service template.
@@ -197,6 +215,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         )
         return self.get(endpoint, *params)
 
+    @cache.set('service-{service_id}-templates', ttl_in_seconds=3600)
     def get_service_templates(self, service_id, *params):
         """
         Retrieve all templates for service.
@@ -205,6 +224,11 @@ class ServiceAPIClient(NotifyAdminAPIClient):
             service_id=service_id)
         return self.get(endpoint, *params)
 
+    @cache.delete(
+        'service-{service_id}-templates',
+        'service-{service_id}-template-{template_id}-version-None',
+        'service-{service_id}-template-{template_id}-page-counts',
+    )
     def delete_service_template(self, service_id, template_id):
         """
         Set a service template's archived flag to True
@@ -240,6 +264,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
     def get_whitelist(self, service_id):
         return self.get(url='/service/{}/whitelist'.format(service_id))
 
+    @cache.delete('service-{service_id}')
     def update_whitelist(self, service_id, data):
         return self.put(url='/service/{}/whitelist'.format(service_id), data=data)
 
@@ -264,6 +289,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
             '/service/{}/inbound-sms/summary'.format(service_id)
         )
 
+    @cache.delete('service-{service_id}')
     def create_service_inbound_api(self, service_id, url, bearer_token, user_id):
         data = {
             "url": url,
@@ -272,6 +298,7 @@ class ServiceAPIClient(NotifyAdminAPIClient):
         }
         return self.post("/service/{}/inbound-api".format(service_id), data)
 
+    @cache.delete('service-{service_id}')
     def update_service_inbound_api(self, service_id, url, bearer_token, user_id, inbound_api_id):
         data = {
             "url": url,
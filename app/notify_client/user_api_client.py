@@ -3,7 +3,7 @@ import uuid
 from flask import session
 from notifications_python_client.errors import HTTPError
 
-from app.notify_client import NotifyAdminAPIClient
+from app.notify_client import NotifyAdminAPIClient, cache
 from app.notify_client.models import User
 
 ALLOWED_ATTRIBUTES = {
@@ -12,15 +12,17 @@ ALLOWED_ATTRIBUTES = {
     'mobile_number'
 }
 
+# short, because other instances of the app can change a user (for example signing them in somewhere else, which
+# changes their `current_session_id`) without the change reaching a cache local to this instance
+USER_TTL = 60
+
 
 class UserApiClient(NotifyAdminAPIClient):
     def __init__(self):
         super().__init__("a" * 73, "b")
 
     def init_app(self, app):
-        self.base_url = app.config['API_HOST_NAME']
-        self.service_id = app.config['ADMIN_CLIENT_USER_NAME']
-        self.api_key = app.config['ADMIN_CLIENT_SECRET']
+        super().init_app(app)
         self.max_failed_login_count = app.config["MAX_FAILED_LOGIN_COUNT"]
 
     def register_user(self, name, email_address, mobile_number, password):
@@ -34,9 +36,11 @@ class UserApiClient(NotifyAdminAPIClient):
         return User(user_data['data'], max_failed_login_count=self.max_failed_login_count)
 
     def get_user(self, id):
-        url = "/user/{}".format(id)
-        user_data = self.get(url)
-        return User(user_data['data'], max_failed_login_count=self.max_failed_login_count)
+        return User(self.get_user_data(id)['data'], max_failed_login_count=self.max_failed_login_count)
+
+    @cache.set('user-{user_id}', ttl_in_seconds=USER_TTL)
+    def get_user_data(self, user_id):
+        return self.get("/user/{}".format(user_id))
 
     def get_user_by_email(self, email_address):
         user_data = self.get('/user/email', params={'email': email_address})
@@ -56,12 +60,14 @@ class UserApiClient(NotifyAdminAPIClient):
             users.append(User(user, max_failed_login_count=self.max_failed_login_count))
         return users
 
+    @cache.delete('user-{user.id}')
     def update_user(self, user):
         data = user.serialize()
         url = "/user/{}".format(user.id)
         user_data = self.put(url, data=data)
         return User(user_data['data'], max_failed_login_count=self.max_failed_login_count)
 
+    @cache.delete('user-{user_id}')
     def update_user_attribute(self, user_id, **kwargs):
         data = dict(kwargs)
         disallowed_attributes = set(data.keys()) - ALLOWED_ATTRIBUTES
@@ -75,17 +81,20 @@ class UserApiClient(NotifyAdminAPIClient):
         user_data = self.post(url, data=data)
         return User(user_data['data'], max_failed_login_count=self.max_failed_login_count)
 
+    @cache.delete('user-{user_id}')
     def reset_failed_login_count(self, user_id):
         url = "/user/{}/reset-failed-login-count".format(user_id)
         user_data = self.post(url, data={})
         return User(user_data['data'], max_failed_login_count=self.max_failed_login_count)
 
+    @cache.delete('user-{user_id}')
     def update_password(self, user_id, password):
         data = {"_password": password}
         url = "/user/{}/update-password".format(user_id)
         user_data = self.post(url, data=data)
         return User(user_data['data'], max_failed_login_count=self.max_failed_login_count)
 
+    @cache.delete('user-{user_id}')
     def verify_password(self, user_id, password):
         try:
             url = "/user/{}/verify/password".format(user_id)
@@ -111,6 +120,8 @@ class UserApiClient(NotifyAdminAPIClient):
         endpoint = '/user/{0}/email-already-registered'.format(user_id)
         self.post(endpoint, data=data)
 
+    # signing in with a code gives the user a new `current_session_id`
+    @cache.delete('user-{user_id}')
     def check_verify_code(self, user_id, code, code_type):
         data = {'code_type': code_type, 'code': code}
         endpoint = '/user/{}/verify/code'.format(user_id)
@@ -133,12 +144,14 @@ class UserApiClient(NotifyAdminAPIClient):
         resp = self.get(endpoint)
         return [User(data) for data in resp['data']]
 
+    @cache.delete('service-{service_id}', 'user-{user_id}')
     def add_user_to_service(self, service_id, user_id, permissions):
         endpoint = '/service/{}/users/{}'.format(service_id, user_id)
         data = [{'permission': x} for x in permissions]
         resp = self.post(endpoint, data=data)
         return User(resp['data'], max_failed_login_count=self.max_failed_login_count)
 
+    @cache.delete('user-{user_id}')
     def set_user_permissions(self, user_id, service_id, permissions):
         data = [{'permission': x} for x in permissions]
         endpoint = '/user/{}/service/{}/permission'.format(user_id, service_id)
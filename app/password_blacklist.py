@@ -0,0 +1,92 @@
+import hashlib
+import mmap
+import os
+from threading import Lock
+
+
+class PasswordBlacklist(object):
+    """
+        Checks passwords against our list of commonly used passwords and,
+        if `PASSWORD_BLACKLIST_FILE` is set, a much bigger list of breached
+        passwords.
+
+        Neither list is loaded until the first password is checked. The
+        bigger list is a file of sorted SHA-1 hashes (made with
+        `scripts/build_password_blacklist.py`) which is memory-mapped and
+        binary searched, so it can have millions of entries without being
+        read into every worker's memory.
+
+        Usage:
+
+            if password in password_blacklist:
+                ...
+    """
+
+    hash_size = hashlib.sha1().digest_size
+
+    def __init__(self):
+        self.filename = None
+        self._common_passwords = None
+        self._hashes = None
+        self._lock = Lock()
+
+    def init_app(self, application):
+        self.filename = application.config['PASSWORD_BLACKLIST_FILE']
+
+    def __contains__(self, password):
+        return password in self.common_passwords or self._in_file(password)
+
+    @property
+    def common_passwords(self):
+        if self._common_passwords is None:
+            # only imported when needed, so workers that never check a password never load it
+            from app.main._blacklisted_passwords import blacklisted_passwords
+            self._common_passwords = frozenset(blacklisted_passwords)
+        return self._common_passwords
+
+    @property
+    def hashes(self):
+        if self._hashes is None and self.filename:
+            with self._lock:
+                if self._hashes is None:
+                    with open(self.filename, 'rb') as hashes_file:
+                        # an empty file can't be memory-mapped
+                        hashes = b''
+                        if os.fstat(hashes_file.fileno()).st_size:
+                            hashes = mmap.mmap(hashes_file.fileno(), 0, access=mmap.ACCESS_READ)
+                    # only set once it's ready - other threads read it without taking the lock
+                    self._hashes = hashes
+        return self._hashes
+
+    def _in_file(self, password):
+        hashes = self.hashes
+        if not hashes:
+            return False
+        password_hash = hash_password(password)
+        low, high = 0, len(hashes) // self.hash_size
+        while low < high:
+            middle = (low + high) // 2
+            offset = middle * self.hash_size
+            candidate = hashes[offset:offset + self.hash_size]
+            if candidate == password_hash:
+                return True
+            if candidate < password_hash:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+
+def hash_password(password):
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+
+def write_hashes_file(hashes, filename):
+    """
+    Write `hashes` (made with `hash_password`) to `filename`, sorted and without duplicates, for `PasswordBlacklist`.
+    """
+    hashes = sorted(set(hashes))
+    with open(filename, 'wb') as hashes_file:
+        for password_hash in hashes:
+            hashes_file.write(password_hash)
+    return len(hashes)
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Event, Lock
+from time import monotonic, sleep, time
+
+
+def get_preview_key(**kwargs):
+    """
+    Identifies a preview by everything sent to the template preview service to make it, so identical previews share
+    a key and anything that changes the preview changes the key.
+    """
+    return hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class _PendingRender(object):
+
+    def __init__(self):
+        self.done = Event()
+        self.preview = None
+
+
+class PreviewCache(object):
+    """
+        Keeps letter previews (PNGs, PDFs and page counts) rendered by the
+        template preview service, so looking at the same version of a
+        letter again doesn't mean rendering it again.
+
+        There are two tiers: up to `PREVIEW_CACHE_MEMORY_BYTES` of previews
+        in this process's memory, and up to `PREVIEW_CACHE_DISK_BYTES` in
+        `PREVIEW_CACHE_DIRECTORY`, which every worker on the machine shares.
+        Each throws away its least recently used previews when it's full.
+        Setting either size to 0 switches that tier off.
+
+        Previews with personalisation in them are only ever kept in memory -
+        pass `on_disk=False` for those. The directory is only readable by the
+        user the app runs as, and previews in it are thrown away after
+        `max_age` seconds, used or not.
+
+        If the same preview is asked for again while it's being rendered,
+        the second request waits for the first one's result, rather than
+        rendering it too. Only successful renders are kept.
+
+        Usage:
+
+            content, status_code, headers = preview_cache.get_or_render(key, render, on_disk=values is None)
+    """
+
+    # how long, in seconds, to wait for someone else's render before rendering it ourselves
+    lock_timeout = 30
+    poll_interval = 0.1
+    # how long, in seconds, previews are kept on disk
+    max_age = 24 * 60 * 60
+    # how often, in seconds, each worker checks the size of the directory. It can go over its size in between
+    eviction_interval = 60
+
+    def __init__(self):
+        self.memory_bytes = 0
+        self.directory = None
+        self.disk_bytes = 0
+        self.statsd_client = None
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._pending = {}
+        self._lock = Lock()
+        self._next_eviction = 0
+
+    def init_app(self, application):
+        self.memory_bytes = application.config['PREVIEW_CACHE_MEMORY_BYTES']
+        self.directory = application.config['PREVIEW_CACHE_DIRECTORY']
+        self.disk_bytes = application.config['PREVIEW_CACHE_DISK_BYTES'] if self.directory else 0
+        self.statsd_client = application.statsd_client
+
+    @property
+    def enabled(self):
+        return bool(self.memory_bytes or self.disk_bytes)
+
+    def get_or_render(self, key, render, on_disk=True):
+        """
+        Return the preview cached under `key`, or else what `render()` returns - a tuple of content, status code and
+        headers - caching it for next time if it's a successful render.
+        """
+        if not self.enabled:
+            return render()
+
+        preview = self.get(key, on_disk=on_disk)
+        if preview is not None:
+            return preview
+
+        with self._lock:
+            pending = self._pending.get(key)
+            rendering = pending is None
+            if rendering:
+                pending = self._pending[key] = _PendingRender()
+
+        if not rendering:
+            if pending.done.wait(self.lock_timeout) and pending.preview is not None:
+                self._incr('coalesced')
+                return pending.preview
+            return render()
+
+        try:
+            pending.preview = self._render_once(key, render, on_disk)
+            return pending.preview
+        finally:
+            pending.done.set()
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _render_once(self, key, render, on_disk):
+        # other workers can't see our pending renders, so use a lock file to stop them rendering the same preview
+        if not (self.disk_bytes and on_disk):
+            return self._render(key, render, on_disk)
+
+        lock_path = self._path(key) + '.lock'
+        self._make_directory()
+        if _modified_before(lock_path, time() - self.lock_timeout):
+            # left behind by a worker that died while rendering
+            _remove(lock_path)
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return self._wait_for_render(key, render, lock_path)
+        try:
+            return self._render(key, render, on_disk)
+        finally:
+            _remove(lock_path)
+
+    def _wait_for_render(self, key, render, lock_path):
+        waited_until = monotonic() + self.lock_timeout
+        while monotonic() < waited_until and os.path.exists(lock_path):
+            sleep(self.poll_interval)
+        preview = self._get_from_disk(key)
+        if preview is not None:
+            self._incr('coalesced')
+            return preview
+        return self._render(key, render, on_disk=True)
+
+    def _render(self, key, render, on_disk):
+        self._incr('miss')
+        content, status_code, headers = render()
+        preview = (content, status_code, list(headers))
+        if status_code == 200:
+            self.set(key, preview, on_disk=on_disk)
+        return preview
+
+    def get(self, key, on_disk=True):
+        with self._lock:
+            preview = self._memory.get(key)
+            if preview is not None:
+                self._memory.move_to_end(key)
+        if preview is not None:
+            self._incr('memory-hit')
+            return preview
+
+        if not on_disk:
+            return None
+        preview = self._get_from_disk(key)
+        if preview is not None:
+            self._incr('disk-hit')
+            self._set_in_memory(key, preview)
+        return preview
+
+    def set(self, key, preview, on_disk=True):
+        self._set_in_memory(key, preview)
+        if on_disk:
+            self._set_on_disk(key, preview)
+
+    def _set_in_memory(self, key, preview):
+        size = len(preview[0])
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= len(self._memory.pop(key)[0])
+            self._memory[key] = preview
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted[0])
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _make_directory(self):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        # in case it was made with a wider mode before. This fails if someone else made it, which is what we want
+        os.chmod(self.directory, 0o700)
+
+    def _get_from_disk(self, key):
+        if not self.disk_bytes:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as preview_file:
+                status_code, headers, expires_at = json.loads(preview_file.readline().decode('utf-8'))
+                if expires_at <= time():
+                    _remove(path)
+                    return None
+                content = preview_file.read()
+            # the modified time is when the preview was last used, for eviction
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return content, status_code, [tuple(header) for header in headers]
+
+    def _set_on_disk(self, key, preview):
+        if not self.disk_bytes:
+            return
+        content, status_code, headers = preview
+        self._make_directory()
+        # write to a temporary file and move it into place, so a half written preview is never read
+        with tempfile.NamedTemporaryFile(dir=self.directory, prefix='.', delete=False) as preview_file:
+            preview_file.write(json.dumps([status_code, headers, time() + self.max_age]).encode('utf-8') + b'\n')
+            preview_file.write(content)
+        os.replace(preview_file.name, self._path(key))
+
+        # going through the whole directory after every write would be slow once it's full
+        if time() >= self._next_eviction:
+            self._next_eviction = time() + self.eviction_interval
+            self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        # anything last used before this was written before it too, so is too old to keep
+        used_before = time() - self.max_age
+        previews = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.') or entry.name.endswith('.lock'):
+                # temporary files and lock files belong to renders that are still going
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < used_before:
+                _remove(entry.path)
+                continue
+            previews.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in previews)
+        for _, size, path in sorted(previews):
+            if total_size <= self.disk_bytes:
+                break
+            _remove(path)
+            total_size -= size
+
+    def _incr(self, outcome):
+        if self.statsd_client:
+            self.statsd_client.incr('template-preview-cache.{}'.format(outcome))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _modified_before(path, timestamp):
+    try:
+        return os.path.getmtime(path) < timestamp
+    except FileNotFoundError:
+        return False
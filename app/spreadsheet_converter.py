@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from threading import Lock
+from time import monotonic
+
+from app.utils import Spreadsheet
+
+
+class SpreadsheetConversionTimeout(Exception):
+    pass
+
+
+class SpreadsheetConverter(object):
+    """
+        Converts uploaded Excel and OpenDocument spreadsheets to CSV in a
+        small, per-process pool of separate processes.
+
+        Parsing these formats is slow and holds the GIL for as long as it
+        takes. Doing it in another process means a big spreadsheet can't
+        starve the rest of the web worker, and the conversion can be given up
+        on if it takes too long. CSV and TSV files are cheap to read, so they
+        are still converted in the web worker, a chunk at a time.
+
+        Errors reading the file, like `BadZipFile` or `XLRDError`, are raised
+        here just as if the file had been converted in this process. If the
+        pool can't be started, files are converted in this process instead.
+
+        Usage:
+
+            spreadsheet = spreadsheet_converter.from_file(upload, filename=upload.filename)
+    """
+
+    extensions = {'xlsx', 'xlsm', 'xls', 'ods'}
+
+    # how often, in seconds, to log that a conversion is still going
+    progress_interval = 5
+
+    # replace each conversion process after this many files, so memory the parsers hold on to is given back
+    tasks_per_process = 10
+
+    def __init__(self):
+        self.processes = 0
+        self.timeout = None
+        self._pool = None
+        self._pid = None
+        self._lock = Lock()
+
+    def init_app(self, application):
+        self.processes = application.config['SPREADSHEET_CONVERSION_PROCESSES']
+        self.timeout = application.config['SPREADSHEET_CONVERSION_TIMEOUT']
+        self.logger = application.logger
+        self.statsd_client = application.statsd_client
+
+    @property
+    def pool(self):
+        # a pool's worker processes belong to the process that started them, so each gunicorn worker starts its own.
+        # They're spawned rather than forked, so they don't inherit the web worker's sockets and threads.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = multiprocessing.get_context('spawn').Pool(
+                        self.processes,
+                        maxtasksperchild=self.tasks_per_process,
+                    )
+                    self._pid = os.getpid()
+        return self._pool
+
+    def restart(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.terminate()
+            self._pool = None
+            self._pid = None
+
+    def from_file(self, file_content, filename=''):
+        extension = Spreadsheet.get_extension(filename)
+
+        if not self.processes or extension not in self.extensions:
+            return Spreadsheet.from_file(file_content, filename)
+
+        # the conversion process is given the upload's filename rather than its contents, so a big upload isn't
+        # pickled and piped to it. Uploads are already spooled to disk, so this is one more copy of the file there
+        upload_filename = _make_temporary_file()
+        with open(upload_filename, 'wb') as upload:
+            shutil.copyfileobj(file_content, upload)
+        csv_filename = _make_temporary_file(suffix='.csv')
+
+        try:
+            try:
+                result = self.pool.apply_async(_convert_to_csv_file, (upload_filename, filename, csv_filename))
+            except OSError:
+                self.logger.exception('Couldn’t start spreadsheet conversion processes, converting in this process')
+                os.remove(csv_filename)
+                self.restart()
+                with open(upload_filename, 'rb') as upload:
+                    return Spreadsheet.from_file(BytesIO(upload.read()), filename)
+
+            try:
+                # this request still waits for the conversion, but the rest of the web worker doesn't
+                self._wait_for(result, filename, extension)
+            except BaseException:
+                os.remove(csv_filename)
+                raise
+        finally:
+            os.remove(upload_filename)
+
+        return Spreadsheet._from_csv_chunks(_read_and_remove(csv_filename, Spreadsheet.chunk_size), filename)
+
+    def _wait_for(self, result, filename, extension):
+        start = monotonic()
+        while True:
+            elapsed = monotonic() - start
+            if elapsed >= self.timeout:
+                # the conversion process can't be interrupted, only killed, so start a fresh pool without it
+                self.restart()
+                self.statsd_client.incr('spreadsheet-conversion.{}.timeout'.format(extension))
+                raise SpreadsheetConversionTimeout(
+                    'Converting {} took longer than {} seconds'.format(filename, self.timeout)
+                )
+            try:
+                result.get(timeout=min(self.progress_interval, self.timeout - elapsed))
+            except multiprocessing.TimeoutError:
+                self.logger.info('Still converting {} after {:.0f} seconds'.format(filename, monotonic() - start))
+            else:
+                self.statsd_client.timing('spreadsheet-conversion.{}'.format(extension), monotonic() - start)
+                return
+
+
+def _make_temporary_file(suffix=''):
+    # only readable by the user the app runs as
+    file_descriptor, temporary_filename = tempfile.mkstemp(suffix=suffix)
+    os.close(file_descriptor)
+    return temporary_filename
+
+
+def _convert_to_csv_file(upload_filename, filename, csv_filename):
+    # runs in a conversion process
+    with open(upload_filename, 'rb') as upload, open(csv_filename, 'wb') as csv_file:
+        shutil.copyfileobj(Spreadsheet.from_file(upload, filename).as_stream(), csv_file)
+
+
+def _read_and_remove(csv_filename, chunk_size):
+    try:
+        with open(csv_filename, encoding='utf-8', newline='') as csv_file:
+            for chunk in iter(lambda: csv_file.read(chunk_size), ''):
+                yield chunk
+    finally:
+        os.remove(csv_filename)
@@ -0,0 +1,41 @@
+from whitenoise import WhiteNoise
+
+
+class StaticFiles(WhiteNoise):
+    """
+        Serves files in app/static before a request reaches Flask, so static
+        files skip sessions, CSRF, loading the current service and the
+        no-store headers every page gets.
+
+        A URL carrying the fingerprint `asset_fingerprinter` gives the file
+        is cached for as long as possible, since a new version of the file
+        gets a new URL. Other URLs are only cached for `max_age` seconds.
+
+        If there's a `.gz` or `.br` copy of a file next to it (written by
+        `python -m whitenoise.compress app/static` at build time) it's sent
+        to browsers that accept that encoding.
+    """
+
+    def __init__(self, application, asset_fingerprinter, root, prefix, **kwargs):
+        super().__init__(application, root, prefix, **kwargs)
+        self.asset_fingerprinter = asset_fingerprinter
+        self.prefix = '/{}/'.format(prefix.strip('/'))
+
+    def serve(self, static_file, environ, start_response):
+        if not self.is_fingerprinted(environ):
+            return super().serve(static_file, environ, start_response)
+
+        def start_response_immutable(status, headers):
+            headers = [(key, value) for key, value in headers if key != 'Cache-Control']
+            headers.append(('Cache-Control', 'max-age={}, public, immutable'.format(self.FOREVER)))
+            return start_response(status, headers)
+
+        return super().serve(static_file, environ, start_response_immutable)
+
+    def is_fingerprinted(self, environ):
+        query_string = environ.get('QUERY_STRING')
+        if not query_string:
+            return False
+        path = environ['PATH_INFO']
+        asset_path = path[len(self.prefix):]
+        return self.asset_fingerprinter.get_url(asset_path) == path + '?' + query_string
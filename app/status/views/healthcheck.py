@@ -1,5 +1,5 @@
 from flask import jsonify, request
-from app import (version, status_api_client)
+from app import (version, status_api_client, api_connection_pool)
 from app.status import status
 from notifications_python_client.errors import HTTPError
 
@@ -18,4 +18,5 @@ def show_status():
             api=api_status,
             travis_commit=version.__travis_commit__,
             travis_build_number=version.__travis_job_number__,
-            build_time=version.__time__), 200
+            build_time=version.__time__,
+            api_connection_pool=api_connection_pool.stats.as_dict()), 200
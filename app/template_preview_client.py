@@ -0,0 +1,194 @@
+import os
+import struct
+import zlib
+from functools import lru_cache
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitBreaker(object):
+    """
+        Stops calling a service that keeps failing, so requests fail fast
+        instead of each waiting for it to time out.
+
+        After `failure_threshold` failures in a row the breaker opens and
+        every call is refused. Once it's been open for `reset_timeout`
+        seconds a single call is let through to try the service again: if
+        it works the breaker closes, if it fails the breaker opens again.
+        Calls made while that one is going are refused.
+
+        Every change of state is counted in statsd as
+        `<name>.circuit-breaker.<state>`.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, statsd_client=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.statsd_client = statsd_client
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._lock = Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # also lets another call through if the last one to try the service never said how it went
+            if monotonic() >= self._opened_at + self.reset_timeout:
+                self._opened_at = monotonic()
+                self._change_state(self.HALF_OPEN)
+                return True
+        self._incr('rejected')
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self._change_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self._opened_at = monotonic()
+                self._change_state(self.OPEN)
+
+    def _change_state(self, state):
+        self.state = state
+        self._incr(state)
+
+    def _incr(self, outcome):
+        if self.statsd_client:
+            self.statsd_client.incr('{}.circuit-breaker.{}'.format(self.name, outcome))
+
+
+class TemplatePreviewClient(object):
+    """
+        Talks to the template preview service, which renders letters as
+        PNGs, PDFs and page counts.
+
+        Each worker keeps a pool of connections to the service and sends
+        at most `TEMPLATE_PREVIEW_MAX_CONCURRENCY` requests at once, each
+        with a connect and read timeout. If the service keeps failing or
+        timing out, a circuit breaker stops calling it for a while, so a
+        slow preview service can't tie up every worker.
+
+        When the service can't be used, previews come back with a 503 and,
+        for PNGs, a blank page in place of the letter.
+
+        Usage:
+
+            content, status_code, headers = template_preview_client.preview('png', data, page=1)
+    """
+
+    name = 'template-preview'
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(self.name)
+        self._session = None
+        self._pid = None
+        self._lock = Lock()
+
+    def init_app(self, application):
+        self.base_url = application.config['TEMPLATE_PREVIEW_API_HOST']
+        self.api_key = application.config['TEMPLATE_PREVIEW_API_KEY']
+        self.timeout = (
+            application.config['TEMPLATE_PREVIEW_CONNECT_TIMEOUT'],
+            application.config['TEMPLATE_PREVIEW_READ_TIMEOUT'],
+        )
+        self.max_concurrency = application.config['TEMPLATE_PREVIEW_MAX_CONCURRENCY']
+        self.queue_timeout = application.config['TEMPLATE_PREVIEW_QUEUE_TIMEOUT']
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_threshold=application.config['TEMPLATE_PREVIEW_FAILURE_THRESHOLD'],
+            reset_timeout=application.config['TEMPLATE_PREVIEW_RESET_TIMEOUT'],
+            statsd_client=application.statsd_client,
+        )
+        self._semaphore = BoundedSemaphore(self.max_concurrency)
+        self.logger = application.logger
+        self.statsd_client = application.statsd_client
+
+    @property
+    def session(self):
+        # sockets can't be shared with the processes gunicorn forks, so each worker opens its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._session = requests.Session()
+                    adapter = HTTPAdapter(pool_maxsize=self.max_concurrency)
+                    self._session.mount('http://', adapter)
+                    self._session.mount('https://', adapter)
+                    self._pid = os.getpid()
+        return self._session
+
+    def preview(self, filetype, data, page=None):
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            self.statsd_client.incr('{}.queue-full'.format(self.name))
+            return self.unavailable(filetype)
+        try:
+            if not self.breaker.allow_request():
+                return self.unavailable(filetype)
+            start = monotonic()
+            try:
+                resp = self.session.post(
+                    '{}/preview.{}{}'.format(self.base_url, filetype, '?page={}'.format(page) if page else ''),
+                    json=data,
+                    headers={'Authorization': 'Token {}'.format(self.api_key)},
+                    timeout=self.timeout,
+                )
+            except requests.RequestException:
+                self.logger.exception('Template preview service failed to render {}'.format(filetype))
+                self.breaker.record_failure()
+                return self.unavailable(filetype)
+            finally:
+                self.statsd_client.timing('{}.{}'.format(self.name, filetype), monotonic() - start)
+        finally:
+            self._semaphore.release()
+
+        if resp.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return (resp.content, resp.status_code, resp.headers.items())
+
+    @staticmethod
+    def unavailable(filetype):
+        if filetype == 'png':
+            return (get_placeholder_png(), 503, [('Content-Type', 'image/png'), ('Cache-Control', 'no-store')])
+        return (b'', 503, [('Cache-Control', 'no-store')])
+
+
+@lru_cache(maxsize=1)
+def get_placeholder_png(width=595, height=842, shade=0xf8):
+    """
+    A blank, A4 shaped, greyscale PNG to show where a letter would be. It's made here, rather than being an asset, so
+    it can't be missing when the preview service is.
+    """
+    def chunk(chunk_type, chunk_data):
+        return (
+            struct.pack('>I', len(chunk_data)) +
+            chunk_type +
+            chunk_data +
+            struct.pack('>I', zlib.crc32(chunk_type + chunk_data) & 0xffffffff)
+        )
+
+    # each row starts with a 0, meaning its pixels aren't filtered
+    rows = (b'\x00' + bytes([shade]) * width) * height
+    return (
+        b'\x89PNG\r\n\x1a\n' +
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)) +
+        chunk(b'IDAT', zlib.compress(rows, 9)) +
+        chunk(b'IEND', b'')
+    )
@@ -1,7 +1,11 @@
-from flask import current_app, json
-import requests
+from flask import json
 
-from app import current_service
+from app import current_service, preview_cache, shared_cache, template_preview_client
+from app.preview_cache import get_preview_key
+
+PAGE_COUNT_TTL = 7 * 24 * 60 * 60
+# when a template's index has this many page counts, start it again rather than let it grow
+PAGE_COUNT_INDEX_MAX_ENTRIES = 100
 
 
 class TemplatePreview:
@@ -13,16 +17,12 @@ class TemplatePreview:
             'values': values,
             'dvla_org_id': current_service['dvla_organisation'],
         }
-        resp = requests.post(
-            '{}/preview.{}{}'.format(
-                current_app.config['TEMPLATE_PREVIEW_API_HOST'],
-                filetype,
-                '?page={}'.format(page) if page else '',
-            ),
-            json=data,
-            headers={'Authorization': 'Token {}'.format(current_app.config['TEMPLATE_PREVIEW_API_KEY'])}
+        return preview_cache.get_or_render(
+            get_preview_key(filetype=filetype, page=page, **data),
+            lambda: template_preview_client.preview(filetype, data, page=page),
+            # previews with personalisation in aren't written to disk
+            on_disk=values is None,
         )
-        return (resp.content, resp.status_code, resp.headers.items())
 
     @classmethod
     def from_utils_template(cls, template, filetype, page=None):
@@ -35,11 +35,44 @@ class TemplatePreview:
 
 
 def get_page_count_for_letter(template, values=None):
+    """
+    Returns None for templates that aren't letters, and while the template preview service can't say how many pages
+    a letter has, so a count that's only a guess is never remembered.
+    """
 
     if template['template_type'] != 'letter':
         return None
 
-    page_count, _, _ = TemplatePreview.from_database_object(template, 'json', values)
-    page_count = json.loads(page_count.decode('utf-8'))['count']
+    if not shared_cache.enabled:
+        return _render_page_count(template, values)
+
+    # one index per template, so changing the template can throw away the page counts of all its versions at once
+    index_key = get_page_count_index_key(template['service'], template['id'])
+    page_counts = shared_cache.get(index_key) or {}
+    page_count_key = '{}-{}'.format(template['version'], get_preview_key(
+        values=values,
+        letter_contact_block=current_service['letter_contact_block'],
+        dvla_org_id=current_service['dvla_organisation'],
+    ))
+    if page_count_key in page_counts:
+        return page_counts[page_count_key]
 
+    page_count = _render_page_count(template, values)
+    if page_count is None:
+        return None
+    if len(page_counts) >= PAGE_COUNT_INDEX_MAX_ENTRIES:
+        page_counts = {}
+    page_counts[page_count_key] = page_count
+    shared_cache.set(index_key, page_counts, ttl_in_seconds=PAGE_COUNT_TTL)
     return page_count
+
+
+def get_page_count_index_key(service_id, template_id):
+    return 'service-{}-template-{}-page-counts'.format(service_id, template_id)
+
+
+def _render_page_count(template, values):
+    page_count, status_code, _ = TemplatePreview.from_database_object(template, 'json', values)
+    if status_code != 200:
+        return None
+    return json.loads(page_count.decode('utf-8'))['count']
@@ -1,9 +1,11 @@
 import re
 import csv
+import codecs
 import pytz
-from io import StringIO
+from io import BufferedReader, BytesIO, RawIOBase, StringIO
+from itertools import chain
 from os import path
-from functools import wraps
+from functools import lru_cache, wraps
 import unicodedata
 from urllib.parse import urlparse
 from collections import namedtuple
@@ -15,6 +17,7 @@ import ago
 from flask import (
     abort,
     current_app,
+    make_response,
     redirect,
     request,
     session,
@@ -92,6 +95,29 @@ def redirect_to_sign_in(f):
     return wrapped
 
 
+def with_etag(view):
+    """
+    Tag a view's response with a hash of its content, and send an empty 304 instead if the browser says it already
+    has that content. For the JSON endpoints pages poll for updates, which usually haven't changed since last time.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        response.add_etag()
+        # werkzeug's make_conditional only answers GETs, but the activity page polls with a POST, to keep the
+        # phone number or email address it's searching for out of the URL
+        if request.if_none_match.contains_weak(response.get_etag()[0]):
+            response.status_code = 304
+        current_app.statsd_client.incr('etag.{}.{}'.format(
+            request.endpoint,
+            'not-modified' if response.status_code == 304 else 'modified',
+        ))
+        return response
+    return wrapped
+
+
 def get_errors_for_csv(recipients, template_type):
 
     errors = []
@@ -125,34 +151,48 @@ def get_errors_for_csv(recipients, template_type):
 
 
 def generate_notifications_csv(**kwargs):
+    """
+    Yields a CSV of notifications, a chunk of about `CSV_EXPORT_CHUNK_SIZE` characters at a time.
+    """
     from app import notification_api_client
+    from app.notify_client import clear_request_cache
 
+    chunk_size = current_app.config['CSV_EXPORT_CHUNK_SIZE']
     if 'page' not in kwargs:
         kwargs['page'] = 1
-    fieldnames = ['Row number', 'Recipient', 'Template', 'Type', 'Job', 'Status', 'Time']
-    yield ','.join(fieldnames) + '\n'
-
-    while kwargs['page']:
-        notifications_resp = notification_api_client.get_notifications_for_service(**kwargs)
-        notifications = notifications_resp['notifications']
-        for notification in notifications:
-            values = [
-                notification['row_number'],
-                notification['recipient'],
-                notification['template_name'],
-                notification['template_type'],
-                notification['job_name'],
-                notification['status'],
-                notification['created_at']
-            ]
-            line = ','.join(str(i) for i in values) + '\n'
-            yield line
-
-        if notifications_resp['links'].get('next'):
-            kwargs['page'] += 1
-        else:
-            return
-    raise Exception("Should never reach here")
+
+    with StringIO() as chunk:
+        output = csv.writer(chunk, lineterminator='\n')
+        # writerow returns how many characters it wrote, which is much quicker than asking the buffer
+        chunk_length = output.writerow(['Row number', 'Recipient', 'Template', 'Type', 'Job', 'Status', 'Time'])
+
+        while kwargs['page']:
+            notifications_resp = notification_api_client.get_notifications_for_service(**kwargs)
+            # each page is only read once, so there's no point remembering them all until the download finishes
+            clear_request_cache()
+
+            for notification in notifications_resp['notifications']:
+                chunk_length += output.writerow([
+                    notification['row_number'],
+                    notification['recipient'],
+                    notification['template_name'],
+                    notification['template_type'],
+                    notification['job_name'],
+                    notification['status'],
+                    notification['created_at']
+                ])
+                if chunk_length >= chunk_size:
+                    yield chunk.getvalue()
+                    chunk.seek(0)
+                    chunk.truncate()
+                    chunk_length = 0
+
+            if notifications_resp['links'].get('next'):
+                kwargs['page'] = int(kwargs['page']) + 1
+            else:
+                kwargs['page'] = None
+
+        yield chunk.getvalue()
 
 
 def get_page_from_request():
@@ -193,17 +233,56 @@ def email_safe(string, whitespace='.'):
 
 
 class Spreadsheet():
+    """
+    A CSV file, converted from whatever format was uploaded.
+
+    Files are converted lazily, a chunk at a time, so `as_stream()` can be
+    uploaded without the whole file ever being held in memory. Only the
+    first chunk is converted up front, so that files we can't read are
+    rejected straight away. `as_csv_data` holds the whole file as one string.
+    """
 
     allowed_file_extensions = ['csv', 'xlsx', 'xls', 'ods', 'xlsm', 'tsv']
 
-    def __init__(self, csv_data, filename=''):
+    # characters of CSV to convert at a time
+    chunk_size = 64 * 1024
+
+    def __init__(self, csv_data=None, filename='', csv_chunks=None):
         self.filename = filename
-        self.as_csv_data = csv_data
-        self.as_dict = {
+        self._csv_data = csv_data
+        self._csv_chunks = csv_chunks
+
+    @property
+    def as_csv_data(self):
+        if self._csv_data is None:
+            if self._csv_chunks is None:
+                raise RuntimeError('{} has already been streamed'.format(self.filename or 'Spreadsheet'))
+            self._csv_data = ''.join(self._csv_chunks)
+        return self._csv_data
+
+    @property
+    def as_dict(self):
+        return {
             'file_name': self.filename,
             'data': self.as_csv_data
         }
 
+    @property
+    def as_stream_dict(self):
+        return {
+            'file_name': self.filename,
+            'data': self.as_stream()
+        }
+
+    def as_stream(self):
+        """
+        Returns a binary file-like object of the UTF-8 encoded CSV, which can only be read once.
+        """
+        if self._csv_data is not None:
+            return BytesIO(self._csv_data.encode('utf-8'))
+        csv_chunks, self._csv_chunks = self._csv_chunks, None
+        return BufferedReader(_ChunkStream(csv_chunks), buffer_size=self.chunk_size)
+
     @classmethod
     def can_handle(cls, filename):
         return cls.get_extension(filename) in cls.allowed_file_extensions
@@ -214,16 +293,55 @@ class Spreadsheet():
 
     @staticmethod
     def normalise_newlines(file_content):
-        return '\r\n'.join(file_content.read().decode('utf-8').splitlines())
+        return ''.join(Spreadsheet._normalised_chunks(file_content))
 
     @classmethod
-    def from_rows(cls, rows, filename=''):
+    def _normalised_chunks(cls, file_content):
+        """
+        Reads a UTF-8 encoded file a chunk at a time, and yields it as text with every line ending (anything
+        `str.splitlines` splits on) replaced by a CRLF, and no line ending at the end of the file.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        pending = ''
+        started = False
+        while True:
+            chunk = file_content.read(cls.chunk_size)
+            pending += decoder.decode(chunk, final=not chunk)
+            # the last line might carry on in the next chunk - even if it ends with a CR, the next chunk could
+            # start with an LF - so keep it back until the end of the file
+            lines = pending.splitlines(True)
+            last_line = lines[-1] if chunk and lines else ''
+            complete, pending = pending[:len(pending) - len(last_line)], last_line
+            if complete:
+                text = '\r\n'.join(complete.splitlines())
+                yield '\r\n' + text if started else text
+                started = True
+            if not chunk:
+                return
+
+    @classmethod
+    def _csv_chunks_from_rows(cls, rows):
         with StringIO() as converted:
             output = csv.writer(converted)
-
             for row in rows:
                 output.writerow(row)
-            return cls(converted.getvalue(), filename)
+                if converted.tell() >= cls.chunk_size:
+                    yield converted.getvalue()
+                    converted.seek(0)
+                    converted.truncate()
+            yield converted.getvalue()
+
+    @classmethod
+    def _from_csv_chunks(cls, csv_chunks, filename):
+        # convert the first chunk now, so any errors reading the file are raised here rather than part way through
+        # an upload
+        csv_chunks = iter(csv_chunks)
+        first_chunk = next(csv_chunks, '')
+        return cls(filename=filename, csv_chunks=chain([first_chunk], csv_chunks))
+
+    @classmethod
+    def from_rows(cls, rows, filename=''):
+        return cls(filename=filename, csv_chunks=cls._csv_chunks_from_rows(rows))
 
     @classmethod
     def from_dict(cls, dictionary, filename=''):
@@ -239,19 +357,45 @@ class Spreadsheet():
         extension = cls.get_extension(filename)
 
         if extension == 'csv':
-            return cls(Spreadsheet.normalise_newlines(file_content), filename)
+            return cls._from_csv_chunks(cls._normalised_chunks(file_content), filename)
 
         if extension == 'tsv':
             file_content = StringIO(
                 Spreadsheet.normalise_newlines(file_content))
 
-        instance = cls.from_rows(
-            pyexcel.iget_array(
-                file_type=extension,
-                file_stream=file_content),
-            filename)
-        pyexcel.free_resources()
-        return instance
+        def csv_chunks():
+            try:
+                yield from cls._csv_chunks_from_rows(pyexcel.iget_array(
+                    file_type=extension,
+                    file_stream=file_content))
+            finally:
+                pyexcel.free_resources()
+
+        return cls._from_csv_chunks(csv_chunks(), filename)
+
+
+class _ChunkStream(RawIOBase):
+    """
+    A read-only, unseekable file of UTF-8 encoded bytes, taken from an iterator of strings.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks).encode('utf-8')
+            except StopIteration:
+                return 0
+        length = min(len(buffer), len(self._buffer))
+        buffer[:length] = self._buffer[:length]
+        self._buffer = self._buffer[length:]
+        return length
 
 
 def get_help_argument():
@@ -295,7 +439,8 @@ def get_template(
             return LetterImageTemplate(
                 template,
                 image_url=letter_preview_url,
-                page_count=int(page_count),
+                # the page count is None while the template preview service can't say, so show one page until it can
+                page_count=int(page_count or 1),
             )
         else:
             return LetterPreviewTemplate(
@@ -361,8 +506,29 @@ def get_letter_timings(upload_time):
     )
 
 
+# how the API formats timestamps, eg `2018-01-01T12:00:00.000000+00:00` or `2018-01-01 12:00:00.000000`
+API_TIMESTAMP_FORMAT = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?(?:Z|[+-]\d{2}:?\d{2})?$'
+)
+
+
+@lru_cache(maxsize=4096)
 def gmt_timezones(date):
-    date = dateutil.parser.parse(date)
+    """
+    Takes a UTC timestamp, as a string, and returns it as a datetime in UK time.
+
+    Pages format the same timestamps many times over, with several filters, so conversions are cached. Timestamps in
+    the format the API uses are parsed without going through `dateutil`.
+    """
+    match = API_TIMESTAMP_FORMAT.match(date)
+    if match:
+        year, month, day, hour, minute, second, microsecond = match.groups()
+        date = datetime(
+            int(year), int(month), int(day), int(hour), int(minute), int(second),
+            int((microsecond or '0').ljust(6, '0')),
+        )
+    else:
+        date = dateutil.parser.parse(date)
     forced_utc = date.replace(tzinfo=pytz.utc)
     return forced_utc.astimezone(pytz.timezone('Europe/London'))
 
@@ -0,0 +1,91 @@
+"""
+Compares how long the date and time template filters take to format the timestamps on a page the way they used to
+(parsing every timestamp with `dateutil`, every time a filter needed it) and with conversions cached.
+
+The page is faked as a table of `--rows` notifications, each showing when it was created and updated, as on the job
+and activity pages.
+
+Usage:
+    python scripts/benchmark_date_filters.py [--rows 50] [--pages 100]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from time import monotonic
+from unittest.mock import patch
+
+import dateutil
+import pytz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('NOTIFY_ENVIRONMENT', 'test')
+
+from app import (  # noqa
+    format_date,
+    format_datetime_relative,
+    format_datetime_short,
+    format_delta,
+    format_time,
+)
+from app.utils import gmt_timezones  # noqa
+
+
+def gmt_timezones_without_caching(date):
+    # how gmt_timezones used to work
+    date = dateutil.parser.parse(date)
+    forced_utc = date.replace(tzinfo=pytz.utc)
+    return forced_utc.astimezone(pytz.timezone('Europe/London'))
+
+
+def fake_page(rows):
+    now = datetime.utcnow()
+    return [
+        {
+            'created_at': (now - timedelta(minutes=row * 7)).isoformat() + '+00:00',
+            'updated_at': (now - timedelta(minutes=row * 7 - 2)).isoformat() + '+00:00',
+        }
+        for row in range(rows)
+    ]
+
+
+def render(page):
+    for notification in page:
+        format_datetime_relative(notification['created_at'])
+        format_datetime_short(notification['created_at'])
+        format_delta(notification['updated_at'])
+        format_date(notification['created_at'])
+        format_time(notification['updated_at'])
+
+
+def measure(page, number_of_pages):
+    gmt_timezones.cache_clear()
+    start = monotonic()
+    render(page)
+    first_page = monotonic() - start
+    # pages are polled, so the same timestamps get formatted over and over
+    start = monotonic()
+    for _ in range(number_of_pages - 1):
+        render(page)
+    return first_page, (monotonic() - start) / max(number_of_pages - 1, 1)
+
+
+def main(rows, number_of_pages):
+    page = fake_page(rows)
+
+    print('{:<20} {:>16} {:>24}'.format('', 'first page (ms)', 'each page after (ms)'))
+    for name, patched_gmt_timezones in (
+        ('without caching', gmt_timezones_without_caching),
+        ('cached', gmt_timezones),
+    ):
+        with patch('app.gmt_timezones', patched_gmt_timezones):
+            first_page, each_page_after = measure(page, number_of_pages)
+        print('{:<20} {:>16.2f} {:>24.2f}'.format(name, first_page * 1000, each_page_after * 1000))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=100)
+    arguments = parser.parse_args()
+    main(arguments.rows, arguments.pages)
@@ -0,0 +1,107 @@
+"""
+Compares the peak memory and time taken to convert an uploaded spreadsheet to CSV and read it out for uploading to
+S3, the way we used to (as one string) and streamed a part at a time.
+
+Each file in tests/spreadsheet_files is first scaled up to 250,000 rows, or as many as its format allows.
+
+Usage:
+    python scripts/benchmark_spreadsheet_upload.py [--rows 100000]
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import tracemalloc
+from io import StringIO
+from itertools import chain, cycle, islice
+from time import monotonic
+
+import pyexcel
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import Spreadsheet  # noqa
+
+SPREADSHEET_FILES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'spreadsheet_files')
+MAX_ROWS = {'xls': 65535}
+PART_SIZE = 8 * 1024 * 1024
+
+
+def scale_up(filename, rows, directory):
+    extension = Spreadsheet.get_extension(filename)
+    with open(os.path.join(SPREADSHEET_FILES, filename), 'rb') as original:
+        header, *body = Spreadsheet.from_file(original, filename).as_csv_data.splitlines()
+    rows = min(rows, MAX_ROWS.get(extension, rows))
+    scaled_filename = os.path.join(directory, 'scaled.{}'.format(extension))
+    pyexcel.save_as(
+        array=[row.split(',') for row in chain([header], islice(cycle(body), rows))],
+        dest_file_name=scaled_filename,
+    )
+    return scaled_filename, rows
+
+
+def measure(convert, filename):
+    # tracing allocations slows them down, so time a separate run
+    start = monotonic()
+    with open(filename, 'rb') as upload:
+        convert(upload, filename)
+    elapsed = monotonic() - start
+
+    tracemalloc.start()
+    with open(filename, 'rb') as upload:
+        convert(upload, filename)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def convert_whole(upload, filename):
+    # how Spreadsheet.from_file and s3upload used to handle an upload
+    extension = Spreadsheet.get_extension(filename)
+    if extension == 'csv':
+        csv_data = '\r\n'.join(upload.read().decode('utf-8').splitlines())
+    else:
+        if extension == 'tsv':
+            upload = StringIO('\r\n'.join(upload.read().decode('utf-8').splitlines()))
+        with StringIO() as converted:
+            output = csv.writer(converted)
+            for row in pyexcel.iget_array(file_type=extension, file_stream=upload):
+                output.writerow(row)
+            csv_data = converted.getvalue()
+        pyexcel.free_resources()
+    csv_data.encode('utf-8')
+
+
+def convert_streamed(upload, filename):
+    stream = Spreadsheet.from_file(upload, filename).as_stream()
+    while stream.read(PART_SIZE):
+        pass
+
+
+def main(rows):
+    print('{:<40} {:>8} {:>10} {:>14} {:>14} {:>10} {:>10}'.format(
+        'file', 'rows', 'size (MB)', 'whole (MB)', 'streamed (MB)', 'whole (s)', 'streamed (s)'
+    ))
+    for filename in sorted(os.listdir(SPREADSHEET_FILES)):
+        if not Spreadsheet.can_handle(filename):
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            scaled_filename, scaled_rows = scale_up(filename, rows, directory)
+            whole_peak, whole_time = measure(convert_whole, scaled_filename)
+            streamed_peak, streamed_time = measure(convert_streamed, scaled_filename)
+            print('{:<40} {:>8} {:>10.1f} {:>14.1f} {:>14.1f} {:>10.2f} {:>10.2f}'.format(
+                filename,
+                scaled_rows,
+                os.path.getsize(scaled_filename) / 1024 / 1024,
+                whole_peak / 1024 / 1024,
+                streamed_peak / 1024 / 1024,
+                whole_time,
+                streamed_time,
+            ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=250000)
+    main(parser.parse_args().rows)
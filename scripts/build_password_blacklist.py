@@ -0,0 +1,38 @@
+"""
+Builds the file of breached password hashes that `PASSWORD_BLACKLIST_FILE` points to.
+
+The input is a text file with one password on each line or, with `--sha1`, one SHA-1 hash of a password on each line
+in hex (anything after a `:` on the line, like the counts in Pwned Passwords downloads, is ignored).
+
+Usage:
+    python scripts/build_password_blacklist.py passwords.txt password-blacklist.sha1 [--sha1]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.password_blacklist import hash_password, write_hashes_file  # noqa
+
+
+def read_hashes(input_file, already_hashed):
+    for line in input_file:
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+        if already_hashed:
+            yield bytes.fromhex(line.split(':')[0])
+        else:
+            yield hash_password(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--sha1', action='store_true', help='the input is hex SHA-1 hashes, not passwords')
+    arguments = parser.parse_args()
+    with open(arguments.input, encoding='utf-8', errors='replace') as input_file:
+        count = write_hashes_file(read_hashes(input_file, arguments.sha1), arguments.output)
+    print('Wrote {} hashes to {}'.format(count, arguments.output))
@@ -0,0 +1,19 @@
+"""
+Writes the fingerprint of every file in app/static to app/static/asset-manifest.json, so the app can build asset
+URLs without reading and hashing the files itself. Run it after `npm run build` has put the assets there.
+
+Usage:
+    python scripts/generate_asset_manifest.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.asset_fingerprinter import ASSET_MANIFEST_PATH, AssetFingerprinter  # noqa
+
+
+if __name__ == '__main__':
+    os.chdir(os.path.join(os.path.dirname(__file__), '..'))
+    fingerprints = AssetFingerprinter().write_manifest(ASSET_MANIFEST_PATH)
+    print('Wrote fingerprints of {} assets to {}'.format(len(fingerprints), ASSET_MANIFEST_PATH))
@@ -253,7 +253,7 @@ def notification_json(
 
     data = {
         'notifications': [{
-            'id': uuid.uuid4(),
+            'id': str(uuid.uuid4()),
             'to': to,
             'template': template,
             'job': job_payload,
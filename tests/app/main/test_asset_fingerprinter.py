@@ -1,4 +1,5 @@
 # coding=utf-8
+import hashlib
 import os
 
 from unittest import mock
@@ -8,12 +9,12 @@ from app.asset_fingerprinter import AssetFingerprinter
 
 class TestAssetFingerprint(object):
     def test_url_format(self, mocker):
-        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_contents')
-        get_file_content_mock.return_value = """
+        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_chunks')
+        get_file_content_mock.return_value = ["""
             body {
                 font-family: nta;
             }
-        """
+        """.encode('utf-8')]
         asset_fingerprinter = AssetFingerprinter(
             asset_root='/suppliers/static/'
         )
@@ -27,23 +28,23 @@ class TestAssetFingerprint(object):
         )
 
     def test_building_file_path(self, mocker):
-        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_contents')
-        get_file_content_mock.return_value = """
+        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_chunks')
+        get_file_content_mock.return_value = ["""
             document.write('Hello world!');
-        """
+        """.encode('utf-8')]
         fingerprinter = AssetFingerprinter()
         fingerprinter.get_url('javascripts/application.js')
-        fingerprinter.get_asset_file_contents.assert_called_with(
+        fingerprinter.get_asset_file_chunks.assert_called_with(
             'app/static/javascripts/application.js'
         )
 
     def test_hashes_are_consistent(self, mocker):
-        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_contents')
-        get_file_content_mock.return_value = """
+        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_chunks')
+        get_file_content_mock.return_value = ["""
             body {
                 font-family: nta;
             }
-        """
+        """.encode('utf-8')]
         asset_fingerprinter = AssetFingerprinter()
         assert (
             asset_fingerprinter.get_asset_fingerprint('application.css') ==
@@ -53,29 +54,29 @@ class TestAssetFingerprint(object):
     def test_hashes_are_different_for_different_files(
         self, mocker
     ):
-        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_contents')
+        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_chunks')
         asset_fingerprinter = AssetFingerprinter()
-        get_file_content_mock.return_value = """
+        get_file_content_mock.return_value = ["""
             body {
                 font-family: nta;
             }
-        """
+        """.encode('utf-8')]
         css_hash = asset_fingerprinter.get_asset_fingerprint('application.css')
-        get_file_content_mock.return_value = """
+        get_file_content_mock.return_value = ["""
             document.write('Hello world!');
-        """
+        """.encode('utf-8')]
         js_hash = asset_fingerprinter.get_asset_fingerprint('application.js')
         assert (
             js_hash != css_hash
         )
 
     def test_hash_gets_cached(self, mocker):
-        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_contents')
-        get_file_content_mock.return_value = """
+        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_chunks')
+        get_file_content_mock.return_value = ["""
             body {
                 font-family: nta;
             }
-        """
+        """.encode('utf-8')]
         fingerprinter = AssetFingerprinter()
         assert (
             fingerprinter.get_url('application.css') ==
@@ -88,12 +89,58 @@ class TestAssetFingerprint(object):
             fingerprinter.get_url('application.css') ==
             'a1a1a1'
         )
-        fingerprinter.get_asset_file_contents.assert_called_once_with(
+        fingerprinter.get_asset_file_chunks.assert_called_once_with(
             'app/static/application.css'
         )
 
+    def test_hash_matches_whole_file(self, mocker):
+        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_chunks')
+        get_file_content_mock.return_value = [b'body {', b' font-family: nta; ', b'}']
+        chunked_hash = AssetFingerprinter().get_asset_fingerprint('application.css')
+        get_file_content_mock.return_value = [b'body { font-family: nta; }']
+        assert chunked_hash == AssetFingerprinter().get_asset_fingerprint('application.css')
+
 
 class TestAssetFingerprintWithUnicode(object):
     def test_can_read_self(self):
         string_with_unicode_character = 'Ralph’s apostrophe'
         AssetFingerprinter(filesystem_path='tests/app/main/').get_url('test_asset_fingerprinter.py')
+
+
+class TestAssetFingerprintWithBinaryFile(object):
+    def test_can_read_binary_file(self):
+        assert AssetFingerprinter(
+            filesystem_path='tests/spreadsheet_files/'
+        ).get_url('excel 2007.xlsx').startswith('/static/excel 2007.xlsx?')
+
+
+class TestAssetManifest(object):
+    def test_manifest_is_written_for_every_file(self, tmpdir):
+        tmpdir.join('stylesheets').mkdir().join('main.css').write('body { font-family: nta; }')
+        tmpdir.join('images').mkdir().join('crown.gif').write_binary(b'GIF89a\xff')
+        manifest_path = str(tmpdir.join('asset-manifest.json'))
+
+        AssetFingerprinter(filesystem_path=str(tmpdir) + '/').write_manifest(manifest_path)
+
+        assert AssetFingerprinter.read_manifest(manifest_path) == {
+            'images/crown.gif': AssetFingerprinter().get_asset_fingerprint(str(tmpdir.join('images', 'crown.gif'))),
+            'stylesheets/main.css': '3688a0580abd589cfc9b05ef7e3ac5ea',
+        }
+
+    def test_urls_come_from_manifest_without_reading_assets(self, tmpdir, mocker):
+        manifest_path = tmpdir.join('asset-manifest.json')
+        manifest_path.write('{"stylesheets/main.css": "a1a1a1"}')
+        get_file_content_mock = mocker.patch.object(AssetFingerprinter, 'get_asset_file_chunks')
+        get_file_content_mock.return_value = [b'document.write(\'Hello world!\');']
+
+        fingerprinter = AssetFingerprinter(manifest_path=str(manifest_path))
+
+        assert fingerprinter.get_url('stylesheets/main.css') == '/static/stylesheets/main.css?a1a1a1'
+        assert not get_file_content_mock.called
+        assert fingerprinter.get_url('javascripts/main.js') == (
+            '/static/javascripts/main.js?' + hashlib.md5(b'document.write(\'Hello world!\');').hexdigest()
+        )
+        get_file_content_mock.assert_called_once_with('app/static/javascripts/main.js')
+
+    def test_missing_manifest_is_ignored(self, tmpdir):
+        assert AssetFingerprinter.read_manifest(str(tmpdir.join('asset-manifest.json'))) == {}
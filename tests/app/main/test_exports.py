@@ -0,0 +1,163 @@
+import hashlib
+import io
+from unittest.mock import Mock
+
+import pytest
+from werkzeug.http import quote_etag
+
+from app.main.exports import LocalExportStore, get_export_id, send_export
+
+CSV = 'Row number,Recipient\n1,07700900986\n2,07700900987\n'
+ETAG = quote_etag(hashlib.sha256(CSV.encode('utf-8')).hexdigest())
+
+
+@pytest.fixture
+def store(tmpdir):
+    return LocalExportStore(str(tmpdir.join('exports')))
+
+
+@pytest.fixture
+def generate_csv():
+    return Mock(side_effect=lambda: iter([CSV[:20], CSV[20:]]))
+
+
+@pytest.fixture
+def saved_store(store):
+    store.save('1234', 'abcd', io.BytesIO(CSV.encode('utf-8')), hashlib.sha256(CSV.encode('utf-8')).hexdigest())
+    return store
+
+
+def _send(app_, store, generate_csv, headers=None):
+    with app_.test_request_context(headers=headers or {}):
+        response = send_export(store, '1234', 'abcd', generate_csv, 'export.csv')
+        return response, b''.join(response.response).decode('utf-8')
+
+
+def test_export_is_streamed_and_saved_then_reused(app_, store, generate_csv, mocker):
+    mock_incr = mocker.patch('app.statsd_client.incr')
+
+    first_response, first_body = _send(app_, store, generate_csv)
+    second_response, second_body = _send(app_, store, generate_csv)
+
+    assert first_body == second_body == CSV
+    assert first_response.status_code == second_response.status_code == 200
+    assert first_response.is_streamed
+    assert 'ETag' not in first_response.headers
+    assert 'Accept-Ranges' not in first_response.headers
+    assert first_response.headers['Content-Disposition'] == 'inline; filename="export.csv"'
+    assert second_response.headers['Content-Length'] == str(len(CSV))
+    assert second_response.headers['ETag'] == ETAG
+    assert second_response.headers['Accept-Ranges'] == 'bytes'
+    assert second_response.headers['Content-Disposition'] == 'inline; filename="export.csv"'
+    assert generate_csv.call_count == 1
+    assert mock_incr.call_args_list == [mocker.call('csv-export.saved'), mocker.call('csv-export.reused')]
+
+
+def test_export_is_sent_before_it_has_all_been_made(app_, store):
+    made = []
+
+    def generate_csv():
+        for chunk in (CSV[:20], CSV[20:]):
+            made.append(chunk)
+            yield chunk
+
+    with app_.test_request_context():
+        response = send_export(store, '1234', 'abcd', generate_csv, 'export.csv')
+        body = iter(response.response)
+        assert next(body) == CSV[:20].encode('utf-8')
+        assert made == [CSV[:20]]
+        assert store.get_details('1234', 'abcd') is None
+        assert b''.join(body) == CSV[20:].encode('utf-8')
+
+    assert store.get_details('1234', 'abcd') == (len(CSV), hashlib.sha256(CSV.encode('utf-8')).hexdigest())
+
+
+def test_abandoned_download_isnt_saved(app_, store, generate_csv):
+    with app_.test_request_context():
+        response = send_export(store, '1234', 'abcd', generate_csv, 'export.csv')
+        body = iter(response.response)
+        next(body)
+        response.close()
+
+    assert store.get_details('1234', 'abcd') is None
+
+
+def test_export_is_still_sent_if_it_cant_be_saved(app_, store, generate_csv, mocker):
+    mocker.patch.object(store, 'save', side_effect=OSError)
+    mock_incr = mocker.patch('app.statsd_client.incr')
+
+    response, body = _send(app_, store, generate_csv)
+
+    assert response.status_code == 200
+    assert body == CSV
+    assert mock_incr.called is False
+
+
+@pytest.mark.parametrize('headers', [
+    {'Range': 'bytes=0-9'},
+    {'If-None-Match': ETAG},
+])
+def test_whole_export_is_sent_the_first_time(app_, store, generate_csv, headers):
+    response, body = _send(app_, store, generate_csv, headers)
+
+    assert response.status_code == 200
+    assert body == CSV
+
+
+@pytest.mark.parametrize('headers, expected_body, expected_content_range', [
+    ({'Range': 'bytes=0-9'}, CSV[:10], 'bytes 0-9/{}'.format(len(CSV))),
+    ({'Range': 'bytes=10-'}, CSV[10:], 'bytes 10-{}/{}'.format(len(CSV) - 1, len(CSV))),
+    ({'Range': 'bytes=-5'}, CSV[-5:], 'bytes {}-{}/{}'.format(len(CSV) - 5, len(CSV) - 1, len(CSV))),
+    ({'Range': 'bytes=0-9', 'If-Range': ETAG}, CSV[:10], 'bytes 0-9/{}'.format(len(CSV))),
+])
+def test_part_of_an_export_can_be_downloaded(
+    app_, saved_store, generate_csv, headers, expected_body, expected_content_range
+):
+    response, body = _send(app_, saved_store, generate_csv, headers)
+
+    assert response.status_code == 206
+    assert body == expected_body
+    assert response.headers['Content-Range'] == expected_content_range
+    assert response.headers['Content-Length'] == str(len(expected_body))
+    assert generate_csv.called is False
+
+
+@pytest.mark.parametrize('headers', [
+    {'Range': 'bytes=0-9', 'If-Range': '"a different export"'},
+    {'Range': 'bytes=0-4,10-14'},
+    {'Range': 'not a range'},
+])
+def test_whole_export_is_sent_if_range_cant_be_used(app_, saved_store, generate_csv, headers):
+    response, body = _send(app_, saved_store, generate_csv, headers)
+
+    assert response.status_code == 200
+    assert body == CSV
+
+
+def test_range_outside_export_is_refused(app_, saved_store, generate_csv):
+    response, body = _send(app_, saved_store, generate_csv, {'Range': 'bytes=1000-'})
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */{}'.format(len(CSV))
+    assert body == ''
+
+
+def test_export_isnt_sent_if_browser_already_has_it(app_, saved_store, generate_csv):
+    response, body = _send(app_, saved_store, generate_csv, {'If-None-Match': ETAG})
+
+    assert response.status_code == 304
+    assert body == ''
+
+
+def test_empty_export(app_, store):
+    _send(app_, store, lambda: iter(['']))
+    response, body = _send(app_, store, lambda: iter(['']))
+
+    assert response.status_code == 200
+    assert response.headers['Content-Length'] == '0'
+    assert body == ''
+
+
+def test_export_id_depends_on_everything_about_the_export():
+    assert get_export_id(job_id='1', status=['sending']) == get_export_id(status=['sending'], job_id='1')
+    assert get_export_id(job_id='1', status=['sending']) != get_export_id(job_id='1', status=['failed'])
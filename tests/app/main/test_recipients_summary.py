@@ -0,0 +1,135 @@
+import pytest
+from notifications_utils.recipients import RecipientCSV
+
+from app.main.recipients_summary import RecipientsSummary, get_fingerprint
+from tests import template_json
+
+CSV = """
+    phone number,name,colour
+    07700900986,Jo,red
+    07700900987,,blue
+    not a number,Sam,green
+    07700900988,Alex,yellow
+"""
+
+
+@pytest.fixture
+def summary():
+    return RecipientsSummary.from_recipients(
+        RecipientCSV(CSV, template_type='sms', placeholders=['name']),
+        'sms',
+        'fingerprint',
+    )
+
+
+def test_summary_describes_the_file(summary):
+    assert len(summary) == 4
+    assert summary.column_headers == ['phone number', 'name', 'colour']
+    assert summary.recipient_column_headers == ['phone number']
+    assert summary.missing_column_headers == []
+    assert summary.row_errors == ['fix 1 phone number', 'enter missing data in 1 row']
+    assert summary.rows_with_errors == {1, 2}
+    assert summary.first_row['name'] == 'Jo'
+
+
+def test_only_rows_with_errors_are_displayed_if_the_first_row_is_the_only_one_with_an_error():
+    summary = RecipientsSummary.from_recipients(
+        RecipientCSV('phone number\nnot a number\n07700900986\n07700900987', template_type='sms'),
+        'sms',
+        'fingerprint',
+    )
+
+    assert summary.rows_with_errors == {0}
+    assert summary.count_of_displayed_recipients == 1
+
+
+def test_file_with_too_many_rows_is_still_counted(mocker):
+    mocker.patch.object(RecipientCSV, 'max_rows', 2)
+
+    summary = RecipientsSummary.from_recipients(
+        RecipientCSV('phone number\n07700900986\n07700900987\n07700900988', template_type='sms'),
+        'sms',
+        'fingerprint',
+    )
+
+    assert len(summary) == 3
+    assert summary.max_rows == 2
+    assert summary.too_many_rows is True
+    assert summary.has_errors_other_than_message_limit is True
+
+
+def test_file_with_no_rows():
+    summary = RecipientsSummary.from_recipients(
+        RecipientCSV('phone number\n', template_type='sms'),
+        'sms',
+        'fingerprint',
+    )
+
+    assert len(summary) == 0
+    assert summary.first_row is None
+    assert summary.too_many_rows is False
+
+
+@pytest.mark.parametrize('remaining_messages, expected_more_rows_than_can_send', [
+    (3, True),
+    (4, False),
+])
+def test_message_limit_is_applied_after_summarising(
+    remaining_messages,
+    expected_more_rows_than_can_send,
+):
+    summary = RecipientsSummary.from_recipients(
+        RecipientCSV('phone number\n07700900986\n07700900987\n07700900988\n07700900989', template_type='sms'),
+        'sms',
+        'fingerprint',
+    )
+    summary.remaining_messages = remaining_messages
+
+    assert summary.more_rows_than_can_send == expected_more_rows_than_can_send
+    assert summary.has_errors == expected_more_rows_than_can_send
+
+
+def test_summary_survives_being_saved(summary):
+    saved = RecipientsSummary.from_json(summary.to_json())
+
+    for attribute in (
+        'fingerprint', 'row_count', 'max_rows', 'too_many_rows', 'column_headers', 'recipient_column_headers',
+        'missing_column_headers', 'has_recipient_columns', 'allowed_to_send_to',
+        'has_errors_other_than_message_limit', 'row_errors', 'rows_with_errors', 'count_of_displayed_recipients',
+    ):
+        assert getattr(saved, attribute) == getattr(summary, attribute)
+
+    assert saved.first_row['Name'] == 'Jo'
+    for saved_rows, rows in (
+        (saved.initial_annotated_rows, summary.initial_annotated_rows),
+        (saved.initial_annotated_rows_with_errors, summary.initial_annotated_rows_with_errors),
+    ):
+        assert [row['index'] for row in saved_rows] == [row['index'] for row in rows]
+        for column in ('phone number', 'name'):
+            assert [row['columns'][column] for row in saved_rows] == [row['columns'][column] for row in rows]
+
+
+def test_summaries_saved_by_other_versions_are_ignored(summary, mocker):
+    saved = summary.to_json()
+    mocker.patch.object(RecipientsSummary, 'version', RecipientsSummary.version + 1)
+    assert RecipientsSummary.from_json(saved) is None
+
+
+@pytest.mark.parametrize('changes', [
+    {'db_template': template_json('1234', '5678', version=2)},
+    {'db_template': template_json('1234', '5678', content='((name))')},
+    {'whitelist': ['07700900986', 'test@example.gov.uk']},
+    {'international_sms': True},
+    {'service_name': 'Renamed service'},
+    {'sms_sender': 'elevenchars'},
+])
+def test_fingerprint_changes_if_anything_checking_depends_on_changes(changes):
+    arguments = dict(
+        db_template=template_json('1234', '5678'),
+        whitelist=['07700900986'],
+        international_sms=False,
+        service_name='service one',
+        sms_sender='GOVUK',
+    )
+    assert get_fingerprint(**arguments) == get_fingerprint(**arguments)
+    assert get_fingerprint(**dict(arguments, **changes)) != get_fingerprint(**arguments)
@@ -1,8 +1,13 @@
 from collections import namedtuple
+from io import BytesIO
 from unittest.mock import call
+import botocore
 import pytest
 
 from app.main.s3_client import (
+    s3upload,
+    s3download_recipients_summary,
+    s3upload_recipients_summary,
     upload_logo,
     persist_logo,
     delete_temp_file,
@@ -93,3 +98,63 @@ def test_does_not_delete_non_temp_file(client, mocker, fake_uuid):
 
     assert mocked_delete_s3_object.called_with_args(filename)
     assert str(error.value) == 'Not a temp file: {}'.format(filename)
+
+
+def test_s3upload_uploads_csv_data(client, mocker):
+    mocker.patch('uuid.uuid4', return_value=upload_id)
+    mocked_s3_upload = mocker.patch('app.main.s3_client.utils_s3upload')
+    mocked_resource = mocker.patch('app.main.s3_client.resource')
+
+    assert s3upload('1234', {'data': 'foo,bar'}, region) == upload_id
+
+    mocked_s3_upload.assert_called_once_with(
+        filedata='foo,bar',
+        region=region,
+        bucket_name='test-notifications-csv-upload',
+        file_location='service-1234-notify/test_uuid.csv',
+    )
+    assert not mocked_resource.called
+
+
+def test_s3upload_streams_file_objects_in_parts(client, mocker):
+    mocker.patch('uuid.uuid4', return_value=upload_id)
+    mocked_s3_upload = mocker.patch('app.main.s3_client.utils_s3upload')
+    mocked_resource = mocker.patch('app.main.s3_client.resource')
+    fileobj = BytesIO(b'foo,bar')
+
+    s3upload('1234', {'data': fileobj}, region)
+
+    assert not mocked_s3_upload.called
+    mocked_resource.assert_called_once_with('s3', region_name=region)
+    mocked_resource.return_value.Object.assert_called_once_with(
+        'test-notifications-csv-upload',
+        'service-1234-notify/test_uuid.csv',
+    )
+    upload_fileobj = mocked_resource.return_value.Object.return_value.upload_fileobj
+    assert upload_fileobj.call_args[0] == (fileobj,)
+    assert upload_fileobj.call_args[1]['Config'].multipart_chunksize == 8 * 1024 * 1024
+
+
+def test_s3download_recipients_summary_returns_none_if_not_saved_yet(client, mocker):
+    mocked_get_s3_object = mocker.patch('app.main.s3_client.get_s3_object')
+    mocked_get_s3_object.return_value.get.side_effect = botocore.exceptions.ClientError(
+        {'Error': {'Code': 'NoSuchKey'}}, 'GetObject'
+    )
+
+    assert s3download_recipients_summary('1234', upload_id) is None
+    mocked_get_s3_object.assert_called_once_with(
+        'test-notifications-csv-upload',
+        'service-1234-notify/test_uuid.summary.json',
+    )
+
+
+def test_s3upload_recipients_summary_saves_next_to_the_upload(client, mocker):
+    mocked_get_s3_object = mocker.patch('app.main.s3_client.get_s3_object')
+
+    s3upload_recipients_summary('1234', upload_id, '{}')
+
+    mocked_get_s3_object.assert_called_once_with(
+        'test-notifications-csv-upload',
+        'service-1234-notify/test_uuid.summary.json',
+    )
+    assert mocked_get_s3_object.return_value.put.call_args[1]['Body'] == b'{}'
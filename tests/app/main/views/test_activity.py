@@ -135,6 +135,26 @@ def test_can_show_notifications(
     assert json_content.keys() == {'counts', 'notifications'}
 
 
+def test_polling_a_search_gets_nothing_if_nothing_has_changed(
+    logged_in_client,
+    service_one,
+    mock_get_notifications,
+    mock_get_detailed_service,
+):
+    url = url_for('main.get_notifications_as_json', service_id=service_one['id'], message_type='sms')
+    first_response = logged_in_client.post(url, data={'to': '07123456789'})
+    second_response = logged_in_client.post(
+        url,
+        data={'to': '07123456789'},
+        headers={'If-None-Match': first_response.headers['ETag']},
+    )
+
+    assert first_response.status_code == 200
+    assert second_response.status_code == 304
+    assert second_response.get_data() == b''
+    assert mock_get_notifications.call_args[1]['to'] == '07123456789'
+
+
 def test_shows_message_when_no_notifications(
     client_request,
     mock_get_detailed_service,
@@ -14,7 +14,8 @@ from app.main.views.dashboard import (
     get_free_paid_breakdown_for_billable_units,
     aggregate_status_types,
     format_template_stats_to_list,
-    get_tuples_of_financial_years
+    get_tuples_of_financial_years,
+    group_inbound_messages,
 )
 
 from tests import validate_route_permission, validate_route_permission_with_client
@@ -226,6 +227,64 @@ def test_anyone_can_see_inbox(
     )
 
 
+def test_inbox_is_paged(
+    logged_in_client,
+    service_one,
+    mock_get_service_templates_when_no_templates_exist,
+    mock_get_jobs,
+    mock_get_detailed_service,
+    mock_get_template_statistics,
+    mock_get_usage,
+    mocker,
+):
+    service_one['permissions'] = ['inbound_sms']
+    mocker.patch('app.service_api_client.get_inbound_sms', return_value=[
+        {
+            'id': str(index),
+            'user_number': '07900900{:03}'.format(index),
+            'content': 'message-{}'.format(index),
+            'created_at': '2018-01-01T12:00:00.000000+00:00',
+        }
+        for index in range(60)
+    ])
+
+    first_page = BeautifulSoup(logged_in_client.get(url_for(
+        'main.inbox', service_id=SERVICE_ONE_ID,
+    )).data.decode('utf-8'), 'html.parser')
+    second_page = BeautifulSoup(logged_in_client.get(url_for(
+        'main.inbox', service_id=SERVICE_ONE_ID, page=2,
+    )).data.decode('utf-8'), 'html.parser')
+
+    assert len(first_page.select('tbody tr')) == 50
+    assert len(second_page.select('tbody tr')) == 10
+    assert normalize_spaces(second_page.select('tbody tr')[0].text).startswith('07900 900050 message-50')
+    assert first_page.select_one('a[rel=next]')['href'] == url_for('main.inbox', service_id=SERVICE_ONE_ID, page=2)
+    assert not first_page.select('a[rel=previous]')
+    assert second_page.select_one('a[rel=previous]')['href'] == url_for(
+        'main.inbox', service_id=SERVICE_ONE_ID, page=1
+    )
+    assert not second_page.select('a[rel=next]')
+    assert normalize_spaces(second_page.select('.table-show-more-link')) == '60 messages from 60 users'
+
+
+def _inbound_message(id, user_number):
+    return {'id': id, 'user_number': user_number}
+
+
+def test_group_inbound_messages_keeps_latest_message_from_each_user():
+    messages = [
+        _inbound_message('4', '07900900001'),
+        _inbound_message('3', '+447900900002'),
+        _inbound_message('2', '07900 900001'),
+        _inbound_message('1', '07900900002'),
+    ]
+
+    assert group_inbound_messages(messages) == [
+        ('07900 900001', messages[0]),
+        ('07900 900002', messages[1]),
+    ]
+
+
 def test_view_inbox_updates(
     logged_in_client,
     service_one,
@@ -648,6 +707,28 @@ def test_aggregate_template_stats():
     assert expected[1]['template_type'] == 'sms'
 
 
+def test_service_dashboard_only_fetches_the_current_service_once(
+    logged_in_client,
+    mocker,
+    service_one,
+    mock_get_service_templates,
+    mock_get_template_statistics,
+    mock_get_detailed_service,
+    mock_get_jobs,
+    mock_get_usage,
+    mock_get_inbound_sms_summary,
+    mock_get_yearly_sms_unit_count_and_cost
+):
+    mock_get_service = mocker.patch('app.service_api_client.get_service', return_value={'data': service_one})
+    mock_incr = mocker.patch('app.statsd_client.incr')
+
+    response = logged_in_client.get(url_for('main.service_dashboard', service_id=SERVICE_ONE_ID))
+
+    assert response.status_code == 200
+    mock_get_service.assert_called_once_with(SERVICE_ONE_ID)
+    mock_incr.assert_any_call('current-service.fetched.main.service_dashboard')
+
+
 def test_service_dashboard_updates_gets_dashboard_totals(
     mocker,
     logged_in_client,
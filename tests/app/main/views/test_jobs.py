@@ -6,8 +6,12 @@ import pytest
 from flask import url_for
 from bs4 import BeautifulSoup
 
-from app.main.views.jobs import get_time_left, get_status_filters
-from tests import notification_json
+from notifications_utils.template import Template, WithSubjectTemplate
+
+from app import service_api_client
+from app.cache import LocalCache
+from app.main.views.jobs import add_preview_of_content_to_notifications, get_time_left, get_status_filters
+from tests import job_json, notification_json, template_json
 from tests.conftest import SERVICE_ONE_ID, normalize_spaces
 from freezegun import freeze_time
 
@@ -116,6 +120,73 @@ def test_should_show_page_for_one_job(
     )
 
 
+@pytest.mark.parametrize('notifications_delivered, expected_exports_generated, expected_accept_ranges', [
+    (0, 2, None),
+    (1, 1, 'bytes'),
+])
+def test_csv_of_finished_job_is_only_generated_once(
+    logged_in_client,
+    service_one,
+    active_user_with_permissions,
+    mock_get_service_template,
+    mocker,
+    fake_uuid,
+    app_,
+    tmpdir,
+    notifications_delivered,
+    expected_exports_generated,
+    expected_accept_ranges,
+):
+    mocker.patch.dict(app_.config, {'CSV_EXPORT_STORAGE': 'local', 'CSV_EXPORT_LOCAL_DIRECTORY': str(tmpdir)})
+    job = job_json(service_one['id'], active_user_with_permissions, job_id=fake_uuid)
+    job['notifications_delivered'] = notifications_delivered
+    mocker.patch('app.job_api_client.get_job', return_value={'data': job})
+    mock_generate_csv = mocker.patch(
+        'app.main.views.jobs.generate_notifications_csv',
+        side_effect=lambda **kwargs: iter(['Row number,Recipient\n', '1,07700900986\n']),
+    )
+
+    url = url_for('main.view_job_csv', service_id=service_one['id'], job_id=fake_uuid)
+    responses = [logged_in_client.get(url) for _ in range(2)]
+
+    assert [response.get_data(as_text=True) for response in responses] == 2 * ['Row number,Recipient\n1,07700900986\n']
+    assert responses[1].headers.get('Accept-Ranges') == expected_accept_ranges
+    assert mock_generate_csv.call_count == expected_exports_generated
+
+
+def test_csv_of_finished_job_can_be_resumed(
+    logged_in_client,
+    service_one,
+    active_user_with_permissions,
+    mock_get_service_template,
+    mocker,
+    fake_uuid,
+    app_,
+    tmpdir,
+):
+    mocker.patch.dict(app_.config, {'CSV_EXPORT_STORAGE': 'local', 'CSV_EXPORT_LOCAL_DIRECTORY': str(tmpdir)})
+    job = job_json(service_one['id'], active_user_with_permissions, job_id=fake_uuid)
+    job['notifications_delivered'] = 1
+    mocker.patch('app.job_api_client.get_job', return_value={'data': job})
+    mocker.patch(
+        'app.main.views.jobs.generate_notifications_csv',
+        side_effect=lambda **kwargs: iter(['Row number,Recipient\n', '1,07700900986\n']),
+    )
+
+    url = url_for('main.view_job_csv', service_id=service_one['id'], job_id=fake_uuid)
+    # the first download is streamed as it's made, so only downloads of the saved copy can be resumed
+    logged_in_client.get(url)
+    second_response = logged_in_client.get(url)
+    resumed_response = logged_in_client.get(url, headers={
+        'Range': 'bytes=21-',
+        'If-Range': second_response.headers['ETag'],
+    })
+
+    assert resumed_response.status_code == 206
+    assert resumed_response.get_data(as_text=True) == '1,07700900986\n'
+    assert resumed_response.headers['Content-Range'] == 'bytes 21-34/35'
+
+
 def test_get_jobs_should_tell_user_if_more_than_one_page(
     logged_in_client,
     fake_uuid,
@@ -320,6 +391,126 @@ def test_should_show_updates_for_one_job_as_json(
     assert 'Sent by Test User on 1 January at midnight' in content['status']
 
 
+def test_updates_for_one_job_are_empty_if_nothing_has_changed(
+    logged_in_client,
+    service_one,
+    mock_get_notifications,
+    mock_get_service_template,
+    mock_get_job,
+    fake_uuid,
+):
+    url = url_for('main.view_job_updates', service_id=service_one['id'], job_id=fake_uuid)
+    first_response = logged_in_client.get(url)
+    second_response = logged_in_client.get(url, headers={'If-None-Match': first_response.headers['ETag']})
+
+    assert first_response.status_code == 200
+    assert second_response.status_code == 304
+    assert second_response.get_data() == b''
+
+
+@pytest.fixture
+def local_shared_cache(mocker):
+    return mocker.patch('app.shared_cache.backend', LocalCache())
+
+
+def test_updates_for_one_job_are_shared_between_polls(
+    logged_in_client,
+    service_one,
+    mock_get_notifications,
+    mock_get_service_template,
+    mock_get_job,
+    local_shared_cache,
+    fake_uuid,
+):
+    responses = [
+        logged_in_client.get(url_for('main.view_job_updates', service_id=service_one['id'], job_id=fake_uuid))
+        for _ in range(2)
+    ]
+
+    assert responses[0].get_data() == responses[1].get_data()
+    assert mock_get_job.call_count == 1
+    assert mock_get_notifications.call_count == 1
+
+
+@pytest.mark.parametrize('notifications_delivered, expected_calls_to_api', [
+    (0, 2),
+    (1, 1),
+])
+def test_finished_jobs_are_only_fetched_once(
+    logged_in_client,
+    service_one,
+    active_user_with_permissions,
+    mock_get_notifications,
+    mock_get_service_template,
+    local_shared_cache,
+    mocker,
+    fake_uuid,
+    notifications_delivered,
+    expected_calls_to_api,
+):
+    job = job_json(service_one['id'], active_user_with_permissions, job_id=fake_uuid)
+    job['notifications_delivered'] = notifications_delivered
+    mock_get_job = mocker.patch('app.job_api_client.get_job', return_value={'data': job})
+
+    for _ in range(2):
+        response = logged_in_client.get(
+            url_for('main.view_job_updates', service_id=service_one['id'], job_id=fake_uuid)
+        )
+        assert response.status_code == 200
+        # as if the next poll came after the shared update had expired
+        local_shared_cache.delete('service-{}-job-{}-partials-None'.format(service_one['id'], fake_uuid))
+
+    assert mock_get_job.call_count == expected_calls_to_api
+    assert mock_get_notifications.call_count == expected_calls_to_api
+
+
+def test_finished_jobs_are_fetched_again_once_their_template_is_redacted(
+    logged_in_client,
+    service_one,
+    active_user_with_permissions,
+    mock_get_notifications,
+    mock_get_service_template,
+    local_shared_cache,
+    mocker,
+    fake_uuid,
+):
+    job = job_json(service_one['id'], active_user_with_permissions, job_id=fake_uuid)
+    job['notifications_delivered'] = 1
+    mocker.patch('app.job_api_client.get_job', return_value={'data': job})
+    mocker.patch('app.notify_client.service_api_client._attach_current_user', side_effect=lambda data: data)
+    mocker.patch.object(service_api_client, 'post')
+
+    for _ in range(2):
+        logged_in_client.get(url_for('main.view_job_updates', service_id=service_one['id'], job_id=fake_uuid))
+        local_shared_cache.delete('service-{}-job-{}-partials-None'.format(service_one['id'], fake_uuid))
+        service_api_client.redact_service_template(service_one['id'], job['template'])
+
+    assert mock_get_notifications.call_count == 2
+
+
+def test_finished_jobs_are_fetched_again_once_they_have_been_kept_for_long_enough(
+    logged_in_client,
+    service_one,
+    active_user_with_permissions,
+    mock_get_notifications,
+    mock_get_service_template,
+    local_shared_cache,
+    mocker,
+    fake_uuid,
+):
+    job = job_json(service_one['id'], active_user_with_permissions, job_id=fake_uuid)
+    job['notifications_delivered'] = 1
+    mocker.patch('app.job_api_client.get_job', return_value={'data': job})
+    mock_time = mocker.patch('app.main.views.jobs.time', return_value=1000)
+
+    for now in (1000, 1000 + 60 * 60):
+        mock_time.return_value = now
+        logged_in_client.get(url_for('main.view_job_updates', service_id=service_one['id'], job_id=fake_uuid))
+        local_shared_cache.delete('service-{}-job-{}-partials-None'.format(service_one['id'], fake_uuid))
+
+    assert mock_get_notifications.call_count == 2
+
+
 @pytest.mark.parametrize(
     "job_created_at, expected_message", [
         ("2016-01-10 11:09:00.000000+00:00", "Data available for 7 days"),
@@ -331,3 +522,33 @@ def test_should_show_updates_for_one_job_as_json(
 @freeze_time("2016-01-10 12:00:00.000000")
 def test_time_left(job_created_at, expected_message):
     assert get_time_left(job_created_at) == expected_message
+
+
+def test_previews_of_content_only_make_each_template_version_once(app_, mocker):
+    mock_template = mocker.patch('app.main.views.jobs.Template', wraps=Template)
+    mock_with_subject_template = mocker.patch('app.main.views.jobs.WithSubjectTemplate', wraps=WithSubjectTemplate)
+    mock_timing = mocker.patch('app.statsd_client.timing')
+    sms_template = template_json(SERVICE_ONE_ID, '1', content='Hello ((name))')
+    new_sms_template = template_json(SERVICE_ONE_ID, '1', content='Hi ((name))', version=2)
+    email_template = template_json(SERVICE_ONE_ID, '2', type_='email', subject='Your ((thing))')
+    notifications = [
+        {'template': sms_template, 'personalisation': {'name': 'Jo'}},
+        {'template': sms_template, 'personalisation': {'name': 'Bo'}},
+        {'template': new_sms_template, 'personalisation': {'name': 'Mo'}},
+        {'template': email_template, 'personalisation': {'thing': 'order'}},
+        {'template': email_template, 'personalisation': {'thing': 'refund'}},
+    ]
+
+    assert [
+        notification['preview_of_content']
+        for notification in add_preview_of_content_to_notifications(notifications)
+    ] == [
+        'Hello Jo',
+        'Hello Bo',
+        'Hi Mo',
+        'Your order',
+        'Your refund',
+    ]
+    assert mock_template.call_count == 2
+    assert mock_with_subject_template.call_count == 1
+    mock_timing.assert_called_once_with('notification-previews', mocker.ANY)
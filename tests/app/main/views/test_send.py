@@ -14,6 +14,7 @@ from notifications_python_client.errors import HTTPError
 from notifications_utils.template import LetterPreviewTemplate, LetterImageTemplate
 from notifications_utils.recipients import RecipientCSV
 
+from app.spreadsheet_converter import SpreadsheetConversionTimeout
 from tests import validate_route_permission, validate_route_permission_with_client
 from tests.conftest import (
     mock_get_service_template,
@@ -105,6 +106,30 @@ def test_upload_files_in_different_formats(
         ) in response.get_data(as_text=True)
 
 
+def test_upload_spreadsheet_that_takes_too_long_to_convert(
+    logged_in_client,
+    service_one,
+    mocker,
+    mock_get_service_template,
+    mock_s3_upload,
+    fake_uuid,
+):
+    mocker.patch(
+        'app.main.views.send.spreadsheet_converter.from_file',
+        side_effect=SpreadsheetConversionTimeout,
+    )
+
+    response = logged_in_client.post(
+        url_for('main.send_messages', service_id=service_one['id'], template_id=fake_uuid),
+        data={'file': (BytesIO(b'a very big spreadsheet'), 'big.xlsx')},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 200
+    assert not mock_s3_upload.called
+    assert 'big.xlsx is too big to read. Try saving it as a CSV file.' in response.get_data(as_text=True)
+
+
 def test_upload_csvfile_with_errors_shows_check_page_with_errors(
     logged_in_client,
     service_one,
@@ -298,6 +323,39 @@ def test_upload_valid_csv_shows_file_contents(
         assert normalize_spaces(str(page.select('table tbody td')[index])) == cell
 
 
+def test_upload_check_and_start_job(
+    logged_in_client,
+    mocker,
+    service_one,
+    mock_get_service_template_with_placeholders,
+    mock_s3_upload,
+    mock_get_users_by_service,
+    mock_get_detailed_service_for_today,
+    mock_create_job,
+    fake_uuid,
+):
+    mocker.patch('app.main.views.send.s3download', return_value="""
+        phone number,name,thing,thing,thing
+        07700900986, Jo,  foo,  foo,  foo
+    """)
+
+    # the check page marks the upload as valid by changing a dict inside the session, which has to be saved
+    response = logged_in_client.post(
+        url_for('main.send_messages', service_id=SERVICE_ONE_ID, template_id=fake_uuid),
+        data={'file': (BytesIO(''.encode('utf-8')), 'valid.csv')},
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+
+    response = logged_in_client.post(
+        url_for('main.start_job', service_id=SERVICE_ONE_ID, upload_id=fake_uuid),
+        data={'scheduled_for': ''},
+    )
+
+    assert response.status_code == 302
+    mock_create_job.assert_called_once_with(fake_uuid, SERVICE_ONE_ID, fake_uuid, 'valid.csv', 1, scheduled_for='')
+
+
 def test_send_test_doesnt_show_file_contents(
     logged_in_client,
     mocker,
@@ -775,6 +833,38 @@ def test_send_test_caches_page_count(
         assert session['send_test_letter_page_count'] == 99
 
 
+def test_send_test_doesnt_cache_page_count_while_it_isnt_known(
+    logged_in_client,
+    mocker,
+    service_one,
+    mock_login,
+    mock_get_service,
+    mock_get_service_letter_template,
+    fake_uuid,
+):
+    mock_page_count = mocker.patch('app.main.views.send.get_page_count_for_letter', side_effect=[None, 2])
+    url = url_for(
+        'main.send_test',
+        service_id=service_one['id'],
+        template_id=fake_uuid,
+    )
+
+    response = logged_in_client.get(url, follow_redirects=True)
+    assert response.status_code == 200
+    with logged_in_client.session_transaction() as session:
+        assert session['send_test_letter_page_count'] is None
+
+    logged_in_client.get(url_for(
+        'main.send_test_step',
+        service_id=service_one['id'],
+        template_id=fake_uuid,
+        step_index=0,
+    ))
+    with logged_in_client.session_transaction() as session:
+        assert session['send_test_letter_page_count'] == 2
+    assert mock_page_count.call_count == 2
+
+
 def test_send_test_indicates_optional_address_columns(
     logged_in_client,
     mocker,
@@ -1977,3 +2067,89 @@ def test_send_notification_shows_email_error_in_trial_mode(
     assert normalize_spaces(page.select('.banner-dangerous p')[0].text) == (
         'In trial mode you can only send to yourself and members of your team'
     )
+
+
+def test_check_messages_saves_and_reuses_summary_of_file(
+    logged_in_client,
+    mock_get_users_by_service,
+    mock_get_service,
+    mock_get_service_template,
+    mock_has_permissions,
+    mock_get_detailed_service_for_today,
+    fake_uuid,
+    mocker,
+    app_,
+):
+    mocker.patch.dict(app_.config, {'SAVE_RECIPIENTS_SUMMARY': True})
+    saved_summaries = {}
+    mocker.patch(
+        'app.main.views.send.s3download_recipients_summary',
+        side_effect=lambda service_id, upload_id: saved_summaries.get(upload_id),
+    )
+    mocker.patch(
+        'app.main.views.send.s3upload_recipients_summary',
+        side_effect=lambda service_id, upload_id, summary_json: saved_summaries.update({upload_id: summary_json}),
+    )
+    mock_s3_download = mocker.patch(
+        'app.main.views.send.s3download',
+        return_value='phone number\n07700900986\n07700900986',
+    )
+
+    for _ in range(2):
+        with logged_in_client.session_transaction() as session:
+            session['upload_data'] = {'template_id': fake_uuid, 'original_file_name': 'valid.csv'}
+        response = logged_in_client.get(url_for(
+            'main.check_messages',
+            service_id=fake_uuid,
+            template_type='sms',
+            upload_id=fake_uuid,
+        ))
+        assert response.status_code == 200
+        page = BeautifulSoup(response.data.decode('utf-8'), 'html.parser')
+        assert page.select_one('input[type=submit]')['value'].strip() == 'Send 2 text messages'
+
+    assert list(saved_summaries) == [fake_uuid]
+    mock_s3_download.assert_called_once_with(fake_uuid, fake_uuid)
+
+
+def test_check_messages_ignores_summary_for_a_different_template_version(
+    logged_in_client,
+    mock_get_users_by_service,
+    mock_get_service,
+    mock_get_service_template,
+    mock_has_permissions,
+    mock_get_detailed_service_for_today,
+    fake_uuid,
+    mocker,
+    app_,
+):
+    from app.main.recipients_summary import RecipientsSummary
+    from notifications_utils.recipients import RecipientCSV
+
+    mocker.patch.dict(app_.config, {'SAVE_RECIPIENTS_SUMMARY': True})
+    mocker.patch(
+        'app.main.views.send.s3download_recipients_summary',
+        return_value=RecipientsSummary.from_recipients(
+            RecipientCSV('phone number\n07700900986', template_type='sms'),
+            'sms',
+            'fingerprint of an older template',
+        ).to_json(),
+    )
+    mock_s3_upload_summary = mocker.patch('app.main.views.send.s3upload_recipients_summary')
+    mock_s3_download = mocker.patch(
+        'app.main.views.send.s3download',
+        return_value='phone number\n07700900986\n07700900986',
+    )
+
+    with logged_in_client.session_transaction() as session:
+        session['upload_data'] = {'template_id': fake_uuid, 'original_file_name': 'valid.csv'}
+    response = logged_in_client.get(url_for(
+        'main.check_messages',
+        service_id=fake_uuid,
+        template_type='sms',
+        upload_id=fake_uuid,
+    ))
+
+    assert response.status_code == 200
+    assert mock_s3_download.called
+    assert mock_s3_upload_summary.called
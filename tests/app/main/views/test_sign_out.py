@@ -39,3 +39,17 @@ def test_sign_out_user(
         'main.index', _external=True)
     with logged_in_client.session_transaction() as session:
         assert session.get('user_id') is None
+
+
+def test_sign_out_doesnt_fetch_the_current_service(
+    logged_in_client,
+    mocker,
+):
+    mock_get_service = mocker.patch('app.service_api_client.get_service')
+    mock_incr = mocker.patch('app.statsd_client.incr')
+
+    response = logged_in_client.get(url_for('main.sign_out'))
+
+    assert response.status_code == 302
+    assert mock_get_service.called is False
+    mock_incr.assert_any_call('current-service.skipped.main.sign_out')
@@ -0,0 +1,184 @@
+import inspect
+
+import pytest
+
+from app.cache import LocalCache
+from app.notify_client.organisations_client import OrganisationsClient
+from app.notify_client.service_api_client import ServiceAPIClient
+
+
+@pytest.fixture
+def shared_cache(mocker):
+    return mocker.patch('app.shared_cache.backend', LocalCache())
+
+
+def test_get_is_only_called_once_while_cached(shared_cache, mocker):
+    mock_get = mocker.patch.object(OrganisationsClient, 'get', return_value={'organisations': ['org']})
+    client = OrganisationsClient()
+
+    assert client.get_organisations() == ['org']
+    assert client.get_organisations() == ['org']
+
+    assert mock_get.call_count == 1
+
+
+def test_different_arguments_are_cached_separately(shared_cache, mocker):
+    mock_get = mocker.patch.object(OrganisationsClient, 'get', side_effect=lambda url: {'url': url})
+    client = OrganisationsClient()
+
+    assert client.get_organisation('1') == {'url': '/organisation/1'}
+    assert client.get_organisation(id='2') == {'url': '/organisation/2'}
+    assert client.get_organisation('1') == {'url': '/organisation/1'}
+
+    assert mock_get.call_count == 2
+
+
+def test_hits_and_misses_are_counted(shared_cache, mocker):
+    mocker.patch.object(OrganisationsClient, 'get', return_value={})
+    mock_incr = mocker.patch('app.statsd_client.incr')
+    client = OrganisationsClient()
+
+    client.get_letter_organisations()
+    client.get_letter_organisations()
+
+    assert [call[0][0] for call in mock_incr.call_args_list] == [
+        'api-cache.get_letter_organisations.miss',
+        'api-cache.get_letter_organisations.hit',
+    ]
+
+
+def test_nothing_is_cached_if_the_shared_cache_is_switched_off(mocker):
+    mock_get = mocker.patch.object(OrganisationsClient, 'get', return_value={'organisations': []})
+    client = OrganisationsClient()
+
+    client.get_organisations()
+    client.get_organisations()
+
+    assert mock_get.call_count == 2
+
+
+def test_update_organisation_invalidates_cached_organisations(shared_cache, mocker):
+    mock_get = mocker.patch.object(OrganisationsClient, 'get', return_value={'organisations': []})
+    mocker.patch.object(OrganisationsClient, 'post')
+    client = OrganisationsClient()
+
+    client.get_organisations()
+    client.get_organisation('1')
+    client.update_organisation('1', logo='a.png', name='a', colour='red')
+    client.get_organisations()
+    client.get_organisation('1')
+
+    assert mock_get.call_count == 4
+
+
+def test_update_service_invalidates_cached_service(shared_cache, mocker):
+    mocker.patch('app.notify_client.current_user', id='1')
+    mock_get = mocker.patch.object(ServiceAPIClient, 'get', return_value={'data': {'name': 'foo'}})
+    mocker.patch.object(ServiceAPIClient, 'post')
+    client = ServiceAPIClient()
+
+    client.get_service('1234')
+    client.update_service('1234', name='bar')
+    client.get_service('1234')
+
+    assert mock_get.call_count == 2
+
+
+def test_update_service_template_invalidates_cached_templates(shared_cache, mocker):
+    mocker.patch('app.notify_client.current_user', id='1')
+    mock_get = mocker.patch.object(ServiceAPIClient, 'get', return_value={'data': {}})
+    mocker.patch.object(ServiceAPIClient, 'post')
+    client = ServiceAPIClient()
+
+    client.get_service_templates('1234')
+    client.get_service_template('1234', '5678')
+    client.get_service_template('1234', '5678', version=1)
+    client.update_service_template('5678', 'name', 'sms', 'content', '1234')
+    client.get_service_templates('1234')
+    client.get_service_template('1234', '5678')
+    client.get_service_template('1234', '5678', version=1)
+
+    # old versions of a template never change, so stay cached
+    assert mock_get.call_count == 5
+
+
+# every method that changes a service, and which of the cached GETs below it has to make fetch again
+SERVICE_WRITES = [
+    ('update_service', {'name': 'bar'}, {'service'}),
+    ('update_service_with_properties', {'properties': {'name': 'bar'}}, {'service'}),
+    ('archive_service', {}, {'service'}),
+    ('suspend_service', {}, {'service'}),
+    ('resume_service', {}, {'service'}),
+    ('remove_user_from_service', {'user_id': '1'}, {'service'}),
+    ('update_whitelist', {'data': {}}, {'service'}),
+    ('create_service_inbound_api', {'url': 'https://example.gov.uk', 'bearer_token': 'a' * 10, 'user_id': '1'}, {
+        'service',
+    }),
+    ('update_service_inbound_api', {
+        'url': 'https://example.gov.uk', 'bearer_token': 'a' * 10, 'user_id': '1', 'inbound_api_id': '9',
+    }, {'service'}),
+    ('create_service_template', {'name': 'name', 'type_': 'sms', 'content': 'content'}, {'templates'}),
+    ('update_service_template', {'id_': '5678', 'name': 'name', 'type_': 'sms', 'content': 'content'}, {
+        'templates', 'template',
+    }),
+    ('redact_service_template', {'id_': '5678'}, {'templates', 'template'}),
+    ('delete_service_template', {'template_id': '5678'}, {'templates', 'template'}),
+]
+
+
+def test_every_write_to_a_service_is_checked_against_the_cache():
+    writes = {
+        name for name, method in inspect.getmembers(ServiceAPIClient, inspect.isfunction)
+        if 'service_id' in inspect.signature(method).parameters and not name.startswith(('_', 'get_', 'is_'))
+    }
+    assert writes == {write for write, _, _ in SERVICE_WRITES}
+
+
+@pytest.mark.parametrize('write, arguments, expected_refetched', SERVICE_WRITES)
+def test_writes_to_a_service_invalidate_what_they_change(shared_cache, mocker, write, arguments, expected_refetched):
+    mocker.patch('app.notify_client.current_user', id='1')
+    mock_get = mocker.patch.object(ServiceAPIClient, 'get', return_value={'data': {}})
+    for method in ('post', 'put', 'delete'):
+        mocker.patch.object(ServiceAPIClient, method, return_value={'data': {}})
+    client = ServiceAPIClient()
+    cached_gets = {
+        'service': lambda: client.get_service('1234'),
+        'templates': lambda: client.get_service_templates('1234'),
+        'template': lambda: client.get_service_template('1234', '5678'),
+    }
+    for get in cached_gets.values():
+        get()
+
+    getattr(client, write)(service_id='1234', **arguments)
+
+    refetched = set()
+    for name, get in cached_gets.items():
+        calls_before = mock_get.call_count
+        get()
+        if mock_get.call_count > calls_before:
+            refetched.add(name)
+    assert refetched == expected_refetched
+
+
+def test_templates_are_cached_separately_for_each_service(shared_cache, mocker):
+    mock_get = mocker.patch.object(ServiceAPIClient, 'get', side_effect=lambda url: {'url': url})
+    client = ServiceAPIClient()
+
+    client.get_service_template('1234', '5678')
+
+    # the API checks the template belongs to the service, so the other service's request has to reach it
+    assert client.get_service_template('abcd', '5678') == {'url': '/service/abcd/template/5678'}
+    assert mock_get.call_count == 2
+
+
+def test_cache_is_invalidated_even_if_the_write_fails(shared_cache, mocker):
+    mock_get = mocker.patch.object(OrganisationsClient, 'get', return_value={'organisations': []})
+    mocker.patch.object(OrganisationsClient, 'post', side_effect=ValueError)
+    client = OrganisationsClient()
+
+    client.get_organisations()
+    with pytest.raises(ValueError):
+        client.create_organisation(logo='a.png', name='a', colour='red')
+    client.get_organisations()
+
+    assert mock_get.call_count == 2
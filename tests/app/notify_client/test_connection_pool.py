@@ -0,0 +1,123 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import ANY, Mock
+
+import pytest
+import requests
+from notifications_python_client.errors import HTTPError
+
+from app.notify_client import NotifyAdminAPIClient
+from app.notify_client.connection_pool import ApiConnectionPool
+
+SAMPLE_API_KEY = '{}-{}'.format('a' * 36, 's' * 36)
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"data": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    server = HTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def connection_pool(app_):
+    connection_pool = ApiConnectionPool()
+    connection_pool.init_app(app_)
+    return connection_pool
+
+
+@pytest.fixture
+def api_client(connection_pool):
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'http://api')
+    api_client.connection_pool = connection_pool
+    return api_client
+
+
+def test_every_client_shares_the_app_connection_pool(app_):
+    from app import api_connection_pool, service_api_client, user_api_client
+
+    assert service_api_client.connection_pool is api_connection_pool
+    assert user_api_client.connection_pool is api_connection_pool
+
+
+def test_session_is_reused_within_a_process(connection_pool):
+    assert connection_pool.session is connection_pool.session
+
+
+def test_each_process_gets_its_own_session(connection_pool, mocker):
+    first_session = connection_pool.session
+    mocker.patch('app.notify_client.connection_pool.os.getpid', return_value=-1)
+    assert connection_pool.session is not first_session
+
+
+def test_session_is_configured_from_app_config(app_, connection_pool):
+    adapter = connection_pool.session.get_adapter('https://api')
+
+    assert adapter._pool_maxsize == app_.config['API_POOL_MAXSIZE']
+    assert adapter._pool_block == app_.config['API_POOL_BLOCK']
+    assert adapter.max_retries.total == app_.config['API_GET_RETRIES']
+    assert adapter.max_retries.method_whitelist == {'GET'}
+    assert connection_pool.timeout == (app_.config['API_CONNECT_TIMEOUT'], app_.config['API_READ_TIMEOUT'])
+
+
+def test_requests_go_through_the_pooled_session_with_timeouts(api_client, connection_pool, mocker):
+    mock_request = mocker.patch.object(
+        connection_pool.session,
+        'request',
+        return_value=Mock(status_code=200, json=Mock(return_value={'data': 'ok'})),
+    )
+
+    assert api_client.request('GET', '/foo', params={'bar': 'baz'}) == {'data': 'ok'}
+
+    assert mock_request.call_args[0] == ('GET', 'http://api/foo')
+    assert mock_request.call_args[1]['params'] == {'bar': 'baz'}
+    assert mock_request.call_args[1]['timeout'] == connection_pool.timeout
+
+
+def test_connection_errors_are_raised_as_http_errors(api_client, connection_pool, mocker):
+    mocker.patch.object(connection_pool.session, 'request', side_effect=requests.ConnectTimeout)
+
+    with pytest.raises(HTTPError) as error:
+        api_client.request('GET', '/foo')
+
+    assert error.value.status_code == 503
+
+
+def test_connections_are_kept_alive_and_counted(api_server, connection_pool, mocker):
+    mock_incr = mocker.patch('app.statsd_client.incr')
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, api_server)
+    api_client.connection_pool = connection_pool
+
+    for _ in range(3):
+        assert api_client.request('GET', '/') == {'data': 'ok'}
+
+    assert connection_pool.stats.as_dict() == {
+        'pid': ANY,
+        'checkouts': 3,
+        'new_connections': 1,
+        'reuse_ratio': pytest.approx(2 / 3),
+        'wait_seconds': ANY,
+    }
+    mock_incr.assert_called_once_with('api-connection-pool.new-connection')
+
+
+def test_reuse_ratio_is_none_before_any_requests(connection_pool):
+    assert connection_pool.stats.reuse_ratio is None
@@ -97,3 +97,110 @@ def test_generate_headers_sets_request_id_if_in_request_context(app_):
 
     assert set(headers.keys()) == {'Authorization', 'Content-type', 'User-agent', 'NotifyRequestID'}
     assert headers['NotifyRequestID'] == request_context.request.request_id
+
+
+def test_get_is_only_requested_once_per_request(app_):
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'base_url')
+
+    with app_.test_request_context():
+        with patch.object(api_client, 'request', return_value={'data': 'foo'}) as request:
+            first = api_client.get('/service/1234', params={'detailed': True})
+            second = api_client.get('/service/1234', params={'detailed': True})
+
+    assert first == second == {'data': 'foo'}
+    request.assert_called_once_with('GET', '/service/1234', params={'detailed': True})
+
+
+@pytest.mark.parametrize('first_params, second_params', [
+    (None, {'detailed': True}),
+    ({'detailed': True}, {'detailed': True, 'today_only': True}),
+])
+def test_get_with_different_params_is_requested_again(app_, first_params, second_params):
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'base_url')
+
+    with app_.test_request_context():
+        with patch.object(api_client, 'request', return_value={'data': 'foo'}) as request:
+            api_client.get('/service/1234', params=first_params)
+            api_client.get('/service/1234', params=second_params)
+
+    assert request.call_count == 2
+
+
+def test_get_returns_a_copy_of_the_cached_response(app_):
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'base_url')
+
+    with app_.test_request_context():
+        with patch.object(api_client, 'request', return_value={'data': {'name': 'foo'}}):
+            api_client.get('/service/1234')['data']['name'] = 'bar'
+            assert api_client.get('/service/1234') == {'data': {'name': 'foo'}}
+
+
+def test_get_is_not_cached_between_requests(app_):
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'base_url')
+
+    with patch.object(api_client, 'request', return_value={'data': 'foo'}) as request:
+        with app_.test_request_context():
+            api_client.get('/service/1234')
+        with app_.test_request_context():
+            api_client.get('/service/1234')
+
+    assert request.call_count == 2
+
+
+def test_get_is_not_cached_outside_a_request():
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'base_url')
+
+    with patch.object(api_client, 'request', return_value={'data': 'foo'}) as request:
+        api_client.get('/service/1234')
+        api_client.get('/service/1234')
+
+    assert request.call_count == 2
+
+
+@pytest.mark.parametrize('method', [
+    'put',
+    'post',
+    'delete'
+])
+@pytest.mark.parametrize('write_url, expected_requests_for', [
+    ('/service/1234', ['/service/1234', '/service/1234/template']),
+    ('/service/1234/template', ['/service/1234', '/service/1234/template']),
+    ('/service/1234/template/5678', ['/service/1234', '/service/1234/template']),
+    ('/service/12345', []),
+    ('/user/1234', []),
+])
+def test_writes_invalidate_overlapping_urls(app_, api_user_active, method, write_url, expected_requests_for):
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'base_url')
+
+    with app_.test_request_context() as request_context, app_.test_client() as client:
+        client.login(api_user_active)
+        request_context.service = None
+        with patch.object(api_client, 'request', return_value={'data': 'foo'}) as request:
+            api_client.get('/service/1234')
+            api_client.get('/service/1234/template')
+            request.reset_mock()
+
+            getattr(api_client, method)(write_url, 'data')
+            api_client.get('/service/1234')
+            api_client.get('/service/1234/template')
+
+    assert [
+        call[0][1] for call in request.call_args_list if call[0][0] == 'GET'
+    ] == expected_requests_for
+
+
+def test_request_cache_hits_and_misses_are_counted(app_, mocker):
+    api_client = NotifyAdminAPIClient(SAMPLE_API_KEY, 'base_url')
+    mock_incr = mocker.patch('app.statsd_client.incr')
+
+    with app_.test_request_context():
+        with patch.object(api_client, 'request', return_value={'data': 'foo'}):
+            api_client.get('/service/1234')
+            api_client.get('/service/1234')
+            api_client.get('/service/1234')
+
+    assert [call[0][0] for call in mock_incr.call_args_list] == [
+        'api-request-cache.main.index.miss',
+        'api-request-cache.main.index.hit',
+        'api-request-cache.main.index.hit',
+    ]
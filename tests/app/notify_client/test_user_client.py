@@ -1,5 +1,8 @@
 import pytest
 
+from app.cache import LocalCache
+from app.notify_client.models import User
+from app.notify_client.service_api_client import ServiceAPIClient
 from app.notify_client.user_api_client import UserApiClient
 
 
@@ -33,3 +36,71 @@ def test_client_updates_password_separately(mocker, api_user_active):
 
     client.update_password(api_user_active.id, expected_params['_password'])
     mock_update_password.assert_called_once_with(expected_url, data=expected_params)
+
+
+@pytest.fixture
+def cached_user_client(mocker):
+    mocker.patch('app.shared_cache.backend', LocalCache())
+    client = UserApiClient()
+    client.max_failed_login_count = 1  # doesn't matter for this test
+    return client
+
+
+def test_users_are_only_fetched_once_while_cached(cached_user_client, mocker, api_user_active):
+    mock_get = mocker.patch.object(UserApiClient, 'get', return_value={'data': {'id': api_user_active.id}})
+
+    first_user = cached_user_client.get_user(api_user_active.id)
+    second_user = cached_user_client.get_user(api_user_active.id)
+
+    assert isinstance(second_user, User)
+    assert first_user is not second_user
+    assert first_user.id == second_user.id == api_user_active.id
+    mock_get.assert_called_once_with('/user/{}'.format(api_user_active.id))
+
+
+@pytest.mark.parametrize('method, args', [
+    ('update_user_attribute', {'name': 'New name'}),
+    ('update_password', {'password': 'newpassword'}),
+    ('set_user_permissions', {'service_id': 'service', 'permissions': []}),
+    ('reset_failed_login_count', {}),
+    ('verify_password', {'password': 'password'}),
+    ('check_verify_code', {'code': '12345', 'code_type': 'sms'}),
+    ('add_user_to_service', {'service_id': 'service', 'permissions': []}),
+])
+def test_changing_a_user_removes_them_from_the_cache(cached_user_client, mocker, api_user_active, method, args):
+    mock_get = mocker.patch.object(UserApiClient, 'get', return_value={'data': {'id': api_user_active.id}})
+    mocker.patch.object(UserApiClient, 'post', return_value={'data': {'id': api_user_active.id}})
+    mocker.patch('app.notify_client.current_user', id='1')
+
+    cached_user_client.get_user(api_user_active.id)
+    getattr(cached_user_client, method)(user_id=api_user_active.id, **args)
+    cached_user_client.get_user(api_user_active.id)
+
+    assert mock_get.call_count == 2
+
+
+def test_user_can_use_a_service_straight_after_creating_it(cached_user_client, mocker, app_, api_user_active):
+    mocker.patch.object(UserApiClient, 'get', side_effect=[
+        {'data': {'id': api_user_active.id, 'permissions': {}}},
+        {'data': {'id': api_user_active.id, 'permissions': {'5678': ['manage_settings']}}},
+    ])
+    mocker.patch.object(ServiceAPIClient, 'post', return_value={'data': {'id': '5678'}})
+    mocker.patch('app.notify_client.current_user', id=api_user_active.id)
+
+    cached_user_client.get_user(api_user_active.id)
+    service_id = ServiceAPIClient().create_service('Test service', 1000, True, api_user_active.id, 'test.service')
+
+    with app_.test_request_context() as request_context:
+        request_context.request.view_args = {'service_id': service_id}
+        assert cached_user_client.get_user(api_user_active.id).has_permissions(['manage_settings'])
+
+
+def test_update_user_removes_them_from_the_cache(cached_user_client, mocker, api_user_active):
+    mock_get = mocker.patch.object(UserApiClient, 'get', return_value={'data': {'id': api_user_active.id}})
+    mocker.patch.object(UserApiClient, 'put', return_value={'data': {'id': api_user_active.id}})
+
+    cached_user_client.get_user(api_user_active.id)
+    cached_user_client.update_user(api_user_active)
+    cached_user_client.get_user(api_user_active.id)
+
+    assert mock_get.call_count == 2
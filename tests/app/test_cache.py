@@ -0,0 +1,262 @@
+import threading
+
+import pytest
+
+from app.cache import LocalCache, RedisCache, SharedCache
+
+
+class FakeRedis(object):
+
+    def __init__(self):
+        self.store = {}
+        self.expiries = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value.encode('utf-8')
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def eval(self, script, numkeys, key, value):
+        # stands in for RedisCache.delete_if_equal_script
+        if self.store.get(key) == value.encode('utf-8'):
+            self.delete(key)
+
+    def expire(self, key, seconds):
+        self.expiries[key] = seconds
+
+
+@pytest.fixture
+def shared_cache():
+    shared_cache = SharedCache()
+    shared_cache.backend = LocalCache()
+    return shared_cache
+
+
+def test_local_cache_gets_what_was_set():
+    cache = LocalCache()
+    cache.set('foo', 'bar')
+    assert cache.get('foo') == 'bar'
+    assert cache.get('baz') is None
+
+
+def test_local_cache_forgets_expired_entries(mocker):
+    mock_monotonic = mocker.patch('app.cache.monotonic', return_value=100)
+    cache = LocalCache()
+    cache.set('foo', 'bar', ex=10)
+
+    mock_monotonic.return_value = 109
+    assert cache.get('foo') == 'bar'
+
+    mock_monotonic.return_value = 110
+    assert cache.get('foo') is None
+    assert len(cache) == 0
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_local_cache_deletes_keys():
+    cache = LocalCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.delete('a', 'b', 'c')
+    assert len(cache) == 0
+
+
+def test_redis_cache_prefixes_keys():
+    redis = FakeRedis()
+    cache = RedisCache(redis)
+
+    cache.set('foo', 'bar', ex=10)
+    assert redis.store == {'notify-admin:foo': b'bar'}
+    assert cache.get('foo') == 'bar'
+
+    cache.delete('foo')
+    assert cache.get('foo') is None
+
+
+def test_local_cache_only_adds_keys_that_arent_set(mocker):
+    mock_monotonic = mocker.patch('app.cache.monotonic', return_value=100)
+    cache = LocalCache()
+
+    assert cache.add('foo', 'bar', ex=10)
+    assert not cache.add('foo', 'baz', ex=10)
+    assert cache.get('foo') == 'bar'
+
+    mock_monotonic.return_value = 110
+    assert cache.add('foo', 'baz', ex=10)
+    assert cache.get('foo') == 'baz'
+
+
+def test_redis_cache_only_adds_keys_that_arent_set():
+    cache = RedisCache(FakeRedis())
+
+    assert cache.add('foo', 'bar')
+    assert not cache.add('foo', 'baz')
+    assert cache.get('foo') == 'bar'
+
+
+def test_local_cache_touch_extends_time_to_live(mocker):
+    mock_monotonic = mocker.patch('app.cache.monotonic', return_value=100)
+    cache = LocalCache()
+    cache.set('foo', 'bar', ex=10)
+
+    mock_monotonic.return_value = 105
+    cache.touch('foo', ex=10)
+    cache.touch('baz', ex=10)
+
+    mock_monotonic.return_value = 114
+    assert cache.get('foo') == 'bar'
+    assert cache.get('baz') is None
+
+
+def test_redis_cache_touch_sets_expiry():
+    redis = FakeRedis()
+    cache = RedisCache(redis, prefix='notify-admin-session:')
+
+    cache.touch('foo', ex=10)
+
+    assert redis.expiries == {'notify-admin-session:foo': 10}
+
+
+def test_shared_cache_round_trips_json(shared_cache):
+    shared_cache.set('foo', {'data': [1, 2]})
+    assert shared_cache.get('foo') == {'data': [1, 2]}
+
+
+def test_shared_cache_returns_a_fresh_copy_each_time(shared_cache):
+    shared_cache.set('foo', {'data': [1, 2]})
+    shared_cache.get('foo')['data'].append(3)
+    assert shared_cache.get('foo') == {'data': [1, 2]}
+
+
+def test_shared_cache_does_nothing_if_switched_off(mocker):
+    shared_cache = SharedCache()
+    shared_cache.set('foo', 'bar')
+    assert shared_cache.get('foo') is None
+    assert not shared_cache.enabled
+
+
+def test_shared_cache_treats_backend_errors_as_a_miss(app_, shared_cache, mocker):
+    mocker.patch.object(shared_cache.backend, 'get', side_effect=ConnectionError)
+    mock_logger = mocker.patch.object(app_.logger, 'exception')
+
+    assert shared_cache.get('foo') is None
+    mock_logger.assert_called_once_with('Shared cache failed to get foo')
+
+
+@pytest.mark.parametrize('backend, expected_class', [
+    ('local', LocalCache),
+    (None, type(None)),
+])
+def test_shared_cache_picks_backend_from_config(app_, mocker, backend, expected_class):
+    mocker.patch.dict(app_.config, {'SHARED_CACHE_BACKEND': backend})
+    shared_cache = SharedCache()
+    shared_cache.init_app(app_)
+    assert isinstance(shared_cache.backend, expected_class)
+
+
+def test_shared_cache_rejects_unknown_backend(app_, mocker):
+    mocker.patch.dict(app_.config, {'SHARED_CACHE_BACKEND': 'memcached'})
+    with pytest.raises(ValueError):
+        SharedCache().init_app(app_)
+
+
+def test_get_or_set_only_fetches_on_a_miss(shared_cache):
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        return {'data': 'foo'}
+
+    assert shared_cache.get_or_set('foo', fetch, ttl_in_seconds=10) == {'data': 'foo'}
+    assert shared_cache.get_or_set('foo', fetch, ttl_in_seconds=10) == {'data': 'foo'}
+    assert len(fetched) == 1
+    assert shared_cache.get('foo:lock') is None
+
+
+def test_get_or_set_fetches_if_switched_off():
+    assert SharedCache().get_or_set('foo', lambda: 'bar', ttl_in_seconds=10) == 'bar'
+
+
+def test_get_or_set_shares_one_fetch_between_concurrent_misses(shared_cache):
+    fetch_started = threading.Event()
+    carry_on = threading.Event()
+    fetched = []
+
+    def slow_fetch():
+        fetched.append(True)
+        fetch_started.set()
+        carry_on.wait(1)
+        return 'bar'
+
+    first = threading.Thread(target=shared_cache.get_or_set, args=('foo', slow_fetch, 10))
+    first.start()
+    fetch_started.wait(1)
+
+    waiting_result = []
+    second = threading.Thread(target=lambda: waiting_result.append(
+        shared_cache.get_or_set('foo', slow_fetch, 10)
+    ))
+    second.start()
+    carry_on.set()
+    first.join()
+    second.join()
+
+    assert waiting_result == ['bar']
+    assert len(fetched) == 1
+
+
+def test_local_cache_only_deletes_keys_still_set_to_the_same_value():
+    cache = LocalCache()
+    cache.set('foo', 'bar')
+
+    cache.delete_if_equal('foo', 'baz')
+    assert cache.get('foo') == 'bar'
+    cache.delete_if_equal('foo', 'bar')
+    assert cache.get('foo') is None
+
+
+def test_redis_cache_deletes_keys_still_set_to_the_same_value_on_the_server():
+    redis = FakeRedis()
+    cache = RedisCache(redis)
+    cache.set('foo', 'bar')
+    redis.eval = lambda *args: redis.calls.append(args)
+    redis.calls = []
+
+    cache.delete_if_equal('foo', 'bar')
+
+    assert redis.calls == [(RedisCache.delete_if_equal_script, 1, 'notify-admin:foo', 'bar')]
+
+
+def test_get_or_set_doesnt_release_a_lock_someone_else_has_taken(shared_cache):
+    def slow_fetch():
+        # as if this took longer than the lock lasts, and another request took the lock in the meantime
+        shared_cache.backend.set('foo:lock', '"someone else"')
+        return 'bar'
+
+    assert shared_cache.get_or_set('foo', slow_fetch, ttl_in_seconds=10) == 'bar'
+    assert shared_cache.get('foo:lock') == 'someone else'
+
+
+def test_get_or_set_fetches_anyway_if_waiting_takes_too_long(shared_cache):
+    shared_cache.set('foo:lock', True)
+
+    assert shared_cache.get_or_set('foo', lambda: 'bar', ttl_in_seconds=10, lock_timeout=0.1) == 'bar'
@@ -0,0 +1,87 @@
+import threading
+from functools import partial
+
+import pytest
+from flask import g, request
+
+from app import current_service
+from app.executor import RequestContextExecutor
+from tests import service_json
+
+
+@pytest.fixture
+def executor(app_):
+    executor = RequestContextExecutor()
+    executor.init_app(app_)
+    return executor
+
+
+def test_run_concurrently_returns_results_by_name(executor, app_, mocker):
+    with app_.test_request_context():
+        results = executor.run_concurrently(
+            'foo',
+            one=lambda: 1,
+            two=partial(sum, [1, 1]),
+        )
+
+    assert results == {'one': 1, 'two': 2}
+
+
+def test_calls_run_on_worker_threads(executor, app_, mocker):
+    with app_.test_request_context():
+        results = executor.run_concurrently(
+            'foo',
+            thread=lambda: threading.current_thread(),
+        )
+
+    assert results['thread'] is not threading.current_thread()
+
+
+def test_calls_can_use_the_submitting_request_context(executor, app_):
+    with app_.test_request_context('/foo?bar=baz') as request_context:
+        request_context.service = service_json('1234')
+        g.something = 'shared'
+
+        results = executor.run_concurrently(
+            'foo',
+            arg=lambda: request.args['bar'],
+            service_id=lambda: current_service['id'],
+            g_value=lambda: g.something,
+        )
+
+    assert results == {'arg': 'baz', 'service_id': '1234', 'g_value': 'shared'}
+
+
+def test_exceptions_are_raised_in_the_calling_thread(executor, app_):
+    def _raise():
+        raise ValueError('oh no')
+
+    with app_.test_request_context(), pytest.raises(ValueError) as error:
+        executor.run_concurrently('foo', fine=lambda: 1, not_fine=_raise)
+
+    assert str(error.value) == 'oh no'
+
+
+def test_each_call_is_timed(executor, app_, mocker):
+    mock_timing = mocker.patch('app.statsd_client.timing')
+
+    with app_.test_request_context():
+        executor.run_concurrently('dashboard', one=lambda: 1, two=lambda: 2)
+
+    assert sorted(call[0][0] for call in mock_timing.call_args_list) == [
+        'dashboard.one',
+        'dashboard.two',
+    ]
+
+
+def test_calls_run_inline_if_pool_switched_off(executor, app_, mocker):
+    executor.max_workers = 0
+
+    with app_.test_request_context():
+        results = executor.run_concurrently(
+            'foo',
+            thread=lambda: threading.current_thread(),
+        )
+
+    assert results['thread'] is threading.current_thread()
+    assert executor._pool is None
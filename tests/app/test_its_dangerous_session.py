@@ -0,0 +1,249 @@
+import json
+
+import pytest
+from flask import Response
+from freezegun import freeze_time
+
+from app.cache import LocalCache
+from app.its_dangerous_session import ItsdangerousSessionInterface, ServerSideSessionInterface
+
+
+@pytest.fixture
+def backend():
+    return LocalCache()
+
+
+@pytest.fixture
+def session_interface(backend):
+    return ServerSideSessionInterface(backend)
+
+
+def _save(app_, session_interface, session, path='/'):
+    response = Response()
+    with app_.test_request_context(path):
+        session_interface.save_session(app_, session, response)
+    return response.headers.get('Set-Cookie')
+
+
+def _open(app_, session_interface, cookie):
+    headers = {'Cookie': cookie.split(';')[0]} if cookie else {}
+    with app_.test_request_context(headers=headers) as request_context:
+        return session_interface.open_session(app_, request_context.request)
+
+
+def test_only_session_id_is_kept_in_cookie(app_, session_interface, backend):
+    session = _open(app_, session_interface, None)
+    user_details = {'email': 'test@user.gov.uk', 'password': 'a' * 1000}
+    session['user_details'] = user_details
+
+    cookie = _save(app_, session_interface, session)
+
+    assert len(cookie) < 250
+    assert 'test@user.gov.uk' not in cookie
+    assert json.loads(backend.get(session.sid)) == {'user_details': user_details}
+    assert dict(_open(app_, session_interface, cookie)) == {'user_details': user_details}
+
+
+def test_session_is_only_loaded_when_used(app_, session_interface, backend, mocker):
+    session = _open(app_, session_interface, None)
+    session['service_id'] = '1234'
+    cookie = _save(app_, session_interface, session)
+    mock_get = mocker.patch.object(backend, 'get', wraps=backend.get)
+
+    session = _open(app_, session_interface, cookie)
+    assert not mock_get.called
+    assert not session.loaded
+
+    assert session['service_id'] == '1234'
+    assert 'service_id' in session
+    mock_get.assert_called_once_with(session.sid)
+    assert not session.modified
+
+
+def test_unmodified_session_is_not_written(app_, session_interface, backend, mocker):
+    session = _open(app_, session_interface, None)
+    session['service_id'] = '1234'
+    cookie = _save(app_, session_interface, session)
+    mock_set = mocker.patch.object(backend, 'set')
+    mock_touch = mocker.patch.object(backend, 'touch')
+
+    session = _open(app_, session_interface, cookie)
+    session.get('service_id')
+    refreshed_cookie = _save(app_, session_interface, session)
+
+    assert not mock_set.called
+    assert not mock_touch.called
+    assert refreshed_cookie is None
+
+
+def test_unmodified_session_is_extended_when_close_to_expiry(app_, session_interface, backend, mocker):
+    with freeze_time('2018-01-01 00:00:00'):
+        session = _open(app_, session_interface, None)
+        session['service_id'] = '1234'
+        cookie = _save(app_, session_interface, session)
+    mock_touch = mocker.patch.object(backend, 'touch')
+
+    with freeze_time('2018-01-01 19:30:00'):
+        session = _open(app_, session_interface, cookie)
+        refreshed_cookie = _save(app_, session_interface, session)
+        assert _open(app_, session_interface, refreshed_cookie).sid == session.sid
+
+    mock_touch.assert_called_once_with(session.sid, ex=app_.config['PERMANENT_SESSION_LIFETIME'])
+
+
+def test_new_empty_session_sets_no_cookie(app_, session_interface, backend):
+    session = _open(app_, session_interface, None)
+
+    assert _save(app_, session_interface, session) is None
+    assert len(backend) == 0
+
+
+def test_cleared_session_is_deleted(app_, session_interface, backend):
+    session = _open(app_, session_interface, None)
+    session['user_id'] = '1234'
+    cookie = _save(app_, session_interface, session)
+
+    session = _open(app_, session_interface, cookie)
+    session.clear()
+    cookie = _save(app_, session_interface, session)
+
+    assert 'notify_admin_session=;' in cookie
+    assert backend.get(session.sid) is None
+
+
+@pytest.mark.parametrize('signed_in_before, signed_in_after', [
+    ({}, {'user_id': '1234', 'current_session_id': 'abcd'}),
+    ({'user_id': '1234', 'current_session_id': 'abcd'}, {'remember': 'clear'}),
+    ({'user_id': '1234', 'current_session_id': 'abcd'}, {'user_id': '1234', 'current_session_id': 'efgh'}),
+    ({'user_id': '1234', 'current_session_id': 'abcd'}, {'user_id': '5678', 'current_session_id': 'efgh'}),
+])
+def test_session_gets_a_new_id_when_someone_signs_in_or_out(
+    app_, session_interface, backend, signed_in_before, signed_in_after
+):
+    session = _open(app_, session_interface, None)
+    session.update(signed_in_before, user_details={'email': 'test@user.gov.uk'})
+    cookie = _save(app_, session_interface, session)
+    old_sid = session.sid
+
+    session = _open(app_, session_interface, cookie)
+    for key in ('user_id', 'current_session_id'):
+        session.pop(key, None)
+    session.update(signed_in_after)
+    new_cookie = _save(app_, session_interface, session)
+
+    assert session.sid != old_sid
+    assert backend.get(old_sid) is None
+    assert dict(_open(app_, session_interface, cookie)) == {}
+    assert dict(_open(app_, session_interface, new_cookie)) == dict(
+        signed_in_after, user_details={'email': 'test@user.gov.uk'}
+    )
+
+
+def test_session_keeps_its_id_while_the_same_person_is_signed_in(app_, session_interface):
+    session = _open(app_, session_interface, None)
+    session.update(user_id='1234', current_session_id='abcd')
+    cookie = _save(app_, session_interface, session)
+    old_sid = session.sid
+
+    session = _open(app_, session_interface, cookie)
+    session['service_id'] = '5678'
+    _save(app_, session_interface, session)
+
+    assert session.sid == old_sid
+
+
+@pytest.mark.parametrize('cookie', [
+    'notify_admin_session=not-signed',
+    'notify_admin_session=',
+])
+def test_bad_cookie_gives_empty_session(app_, session_interface, cookie):
+    session = _open(app_, session_interface, cookie)
+
+    assert dict(session) == {}
+    assert session.sid is None
+
+
+def test_session_is_empty_if_backend_errors(app_, session_interface, backend, mocker):
+    session = _open(app_, session_interface, None)
+    session['user_id'] = '1234'
+    cookie = _save(app_, session_interface, session)
+    mocker.patch.object(backend, 'get', side_effect=ConnectionError)
+    mock_logger = mocker.patch.object(app_.logger, 'exception')
+
+    assert dict(_open(app_, session_interface, cookie)) == {}
+    mock_logger.assert_called_once_with('Couldn’t get session')
+
+
+@pytest.mark.parametrize('issued_at, modified, expected_cookie_set', [
+    ('2018-01-01 11:00:00', False, False),
+    ('2018-01-01 11:00:00', True, True),
+    ('2017-12-31 16:30:00', False, True),
+])
+def test_cookie_is_only_reissued_when_modified_or_close_to_expiry(
+    app_,
+    mocker,
+    issued_at,
+    modified,
+    expected_cookie_set,
+):
+    mock_incr = mocker.patch('app.statsd_client.incr')
+    session_interface = ItsdangerousSessionInterface()
+    with freeze_time(issued_at):
+        session = _open(app_, session_interface, None)
+        session['user_id'] = '1234'
+        cookie = _save(app_, session_interface, session)
+
+    with freeze_time('2018-01-01 12:00:00'):
+        session = _open(app_, session_interface, cookie)
+        if modified:
+            session['service_id'] = '5678'
+        mock_incr.reset_mock()
+        refreshed_cookie = _save(app_, session_interface, session, path='/services/5678/dashboard.json')
+
+    assert (refreshed_cookie is not None) == expected_cookie_set
+    mock_incr.assert_called_once_with(
+        'session-cookie.json.{}'.format('written' if expected_cookie_set else 'skipped')
+    )
+
+
+def test_cookie_is_reissued_when_something_inside_the_session_changes(app_):
+    session_interface = ItsdangerousSessionInterface()
+    session = _open(app_, session_interface, None)
+    session['upload_data'] = {'template_id': '1234'}
+    cookie = _save(app_, session_interface, session)
+
+    session = _open(app_, session_interface, cookie)
+    session['upload_data']['valid'] = True
+    assert not session.modified
+    refreshed_cookie = _save(app_, session_interface, session)
+
+    assert refreshed_cookie is not None
+    assert _open(app_, session_interface, refreshed_cookie)['upload_data'] == {'template_id': '1234', 'valid': True}
+
+
+def test_server_side_session_is_written_when_something_inside_it_changes(app_, session_interface):
+    session = _open(app_, session_interface, None)
+    session['placeholders'] = {}
+    cookie = _save(app_, session_interface, session)
+
+    session = _open(app_, session_interface, cookie)
+    session['placeholders']['name'] = 'Jo'
+    _save(app_, session_interface, session)
+
+    assert _open(app_, session_interface, cookie)['placeholders'] == {'name': 'Jo'}
+
+
+@pytest.mark.parametrize('path, expected_request_type', [
+    ('/static/stylesheets/main.css', 'static'),
+    ('/services/1234/jobs/5678.json', 'json'),
+    ('/services/1234', 'page'),
+])
+def test_cookies_written_are_counted_by_request_type(app_, mocker, path, expected_request_type):
+    mock_incr = mocker.patch('app.statsd_client.incr')
+    session_interface = ItsdangerousSessionInterface()
+    session = _open(app_, session_interface, None)
+    session['user_id'] = '1234'
+
+    _save(app_, session_interface, session, path=path)
+
+    mock_incr.assert_called_once_with('session-cookie.{}.written'.format(expected_request_type))
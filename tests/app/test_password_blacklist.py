@@ -0,0 +1,88 @@
+import mmap
+
+import pytest
+
+from app.password_blacklist import PasswordBlacklist, hash_password, write_hashes_file
+
+
+@pytest.fixture
+def hashes_file(tmpdir):
+    filename = str(tmpdir.join('password-blacklist.sha1'))
+    write_hashes_file(
+        (hash_password(password) for password in ['correcthorse', 'hunter22', 'Tr0ub4dor&3', 'hunter22']),
+        filename,
+    )
+    return filename
+
+
+@pytest.fixture
+def password_blacklist(app_, mocker, hashes_file):
+    mocker.patch.dict(app_.config, {'PASSWORD_BLACKLIST_FILE': hashes_file})
+    password_blacklist = PasswordBlacklist()
+    password_blacklist.init_app(app_)
+    return password_blacklist
+
+
+@pytest.mark.parametrize('password, expected_blacklisted', [
+    ('govuknotify', True),
+    ('correcthorse', True),
+    ('hunter22', True),
+    ('Tr0ub4dor&3', True),
+    ('Tr0ub4dor&4', False),
+    ('a password nobody else has used', False),
+])
+def test_checks_common_and_breached_passwords(password_blacklist, password, expected_blacklisted):
+    assert (password in password_blacklist) == expected_blacklisted
+
+
+def test_hashes_file_is_sorted_without_duplicates(hashes_file):
+    with open(hashes_file, 'rb') as hashes:
+        contents = hashes.read()
+
+    hashes = [contents[offset:offset + 20] for offset in range(0, len(contents), 20)]
+    assert len(hashes) == 3
+    assert hashes == sorted(hashes)
+
+
+def test_nothing_is_loaded_until_first_check(password_blacklist):
+    assert password_blacklist._common_passwords is None
+    assert password_blacklist._hashes is None
+
+    assert 'hunter22' in password_blacklist
+
+    assert 'govuknotify' in password_blacklist._common_passwords
+    assert len(password_blacklist._hashes) == 60
+
+
+def test_other_threads_dont_see_the_file_until_its_loaded(password_blacklist, mocker):
+    seen_while_loading = []
+    real_mmap = mmap.mmap
+
+    def load(*args, **kwargs):
+        # as if another thread checked a password while this one was loading the file
+        seen_while_loading.append(password_blacklist._hashes)
+        return real_mmap(*args, **kwargs)
+
+    mocker.patch('app.password_blacklist.mmap.mmap', side_effect=load)
+
+    assert 'hunter22' in password_blacklist
+    assert seen_while_loading == [None]
+
+
+def test_only_common_passwords_checked_without_file(app_):
+    password_blacklist = PasswordBlacklist()
+    password_blacklist.init_app(app_)
+
+    assert 'govuknotify' in password_blacklist
+    assert 'hunter22' not in password_blacklist
+    assert password_blacklist.hashes is None
+
+
+def test_empty_file(app_, mocker, tmpdir):
+    filename = str(tmpdir.join('password-blacklist.sha1'))
+    write_hashes_file([], filename)
+    mocker.patch.dict(app_.config, {'PASSWORD_BLACKLIST_FILE': filename})
+    password_blacklist = PasswordBlacklist()
+    password_blacklist.init_app(app_)
+
+    assert 'hunter22' not in password_blacklist
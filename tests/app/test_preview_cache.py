@@ -0,0 +1,199 @@
+import os
+import stat
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.preview_cache import PreviewCache, get_preview_key
+
+PNG = (b'\x89PNG', 200, [('Content-Type', 'image/png')])
+
+
+@pytest.fixture
+def preview_cache(tmpdir):
+    cache = PreviewCache()
+    cache.memory_bytes = 1024
+    cache.directory = str(tmpdir.join('previews'))
+    cache.disk_bytes = 1024
+    cache.statsd_client = Mock()
+    return cache
+
+
+def _counted_outcomes(preview_cache):
+    return [call[0][0] for call in preview_cache.statsd_client.incr.call_args_list]
+
+
+def test_preview_is_only_rendered_once(preview_cache):
+    render = Mock(return_value=PNG)
+
+    assert preview_cache.get_or_render('key', render) == PNG
+    assert preview_cache.get_or_render('key', render) == PNG
+
+    assert render.call_count == 1
+    assert _counted_outcomes(preview_cache) == [
+        'template-preview-cache.miss',
+        'template-preview-cache.memory-hit',
+    ]
+
+
+def test_preview_is_shared_between_workers_on_disk(preview_cache):
+    preview_cache.get_or_render('key', Mock(return_value=PNG))
+
+    other_worker = PreviewCache()
+    other_worker.memory_bytes = preview_cache.memory_bytes
+    other_worker.directory = preview_cache.directory
+    other_worker.disk_bytes = preview_cache.disk_bytes
+    other_worker.statsd_client = Mock()
+    render = Mock()
+
+    assert other_worker.get_or_render('key', render) == PNG
+    assert other_worker.get_or_render('key', render) == PNG
+
+    assert render.called is False
+    assert [call[0][0] for call in other_worker.statsd_client.incr.call_args_list] == [
+        'template-preview-cache.disk-hit',
+        'template-preview-cache.memory-hit',
+    ]
+
+
+def test_failed_render_is_not_kept(preview_cache):
+    render = Mock(return_value=(b'error', 500, []))
+
+    assert preview_cache.get_or_render('key', render) == (b'error', 500, [])
+    preview_cache.get_or_render('key', render)
+
+    assert render.call_count == 2
+    assert os.listdir(preview_cache.directory) == []
+
+
+def test_least_recently_used_previews_are_thrown_away(preview_cache):
+    preview_cache.memory_bytes = 100
+    preview_cache.disk_bytes = 0
+    for key in ('a', 'b', 'c'):
+        preview_cache.get_or_render(key, lambda: (b'x' * 40, 200, []))
+    render = Mock(return_value=(b'x' * 40, 200, []))
+
+    preview_cache.get_or_render('b', render)
+    preview_cache.get_or_render('c', render)
+    assert render.called is False
+
+    preview_cache.get_or_render('a', render)
+    assert render.call_count == 1
+
+
+def test_disk_is_kept_under_its_size(preview_cache):
+    preview_cache.memory_bytes = 0
+    preview_cache.disk_bytes = 250
+    preview_cache.eviction_interval = 0
+    for key in ('a', 'b', 'c', 'd'):
+        preview_cache.get_or_render(key, lambda: (b'x' * 80, 200, []))
+
+    assert sorted(os.listdir(preview_cache.directory)) == ['c', 'd']
+
+
+def test_disk_is_only_checked_for_its_size_every_so_often(preview_cache, mocker):
+    mock_time = mocker.patch('app.preview_cache.time', return_value=1000)
+    mock_evict = mocker.patch.object(preview_cache, '_evict_from_disk')
+
+    for now, key in ((1000, 'a'), (1030, 'b'), (1060, 'c')):
+        mock_time.return_value = now
+        preview_cache.get_or_render(key, Mock(return_value=PNG))
+
+    assert mock_evict.call_count == 2
+
+
+def test_previews_on_disk_are_thrown_away_once_theyre_too_old(preview_cache, mocker):
+    mock_time = mocker.patch('app.preview_cache.time', return_value=1000)
+    preview_cache.memory_bytes = 0
+    render = Mock(return_value=PNG)
+
+    preview_cache.get_or_render('key', render)
+    mock_time.return_value = 1000 + preview_cache.max_age
+    preview_cache.get_or_render('key', render)
+
+    assert render.call_count == 2
+
+
+def test_old_previews_are_thrown_away_when_the_disk_is_checked(preview_cache, mocker):
+    preview_cache.get_or_render('old', Mock(return_value=PNG))
+    old_enough = time.time() - preview_cache.max_age - 1
+    os.utime(os.path.join(preview_cache.directory, 'old'), (old_enough, old_enough))
+
+    preview_cache.get_or_render('new', Mock(return_value=PNG))
+    preview_cache._evict_from_disk()
+
+    assert os.listdir(preview_cache.directory) == ['new']
+
+
+def test_previews_with_personalisation_are_only_kept_in_memory(preview_cache):
+    render = Mock(return_value=PNG)
+
+    preview_cache.get_or_render('key', render, on_disk=False)
+    preview_cache.get_or_render('key', render, on_disk=False)
+
+    assert render.call_count == 1
+    assert not os.path.exists(preview_cache.directory)
+
+
+def test_only_the_app_can_read_previews_on_disk(preview_cache):
+    os.makedirs(preview_cache.directory, mode=0o755)
+
+    preview_cache.get_or_render('key', Mock(return_value=PNG))
+
+    assert stat.S_IMODE(os.stat(preview_cache.directory).st_mode) == 0o700
+
+
+def test_concurrent_renders_of_the_same_preview_are_coalesced(preview_cache):
+    preview_cache.disk_bytes = 0
+    rendering = threading.Event()
+    finish_rendering = threading.Event()
+
+    def slow_render():
+        rendering.set()
+        finish_rendering.wait(5)
+        return PNG
+
+    render = Mock(side_effect=slow_render)
+    results = []
+    first = threading.Thread(target=lambda: results.append(preview_cache.get_or_render('key', render)))
+    first.start()
+    rendering.wait(5)
+    second = threading.Thread(target=lambda: results.append(preview_cache.get_or_render('key', render)))
+    second.start()
+    finish_rendering.set()
+    first.join()
+    second.join()
+
+    assert results == [PNG, PNG]
+    assert render.call_count == 1
+
+
+def test_render_left_locked_by_another_worker_is_waited_for(preview_cache):
+    preview_cache.lock_timeout = 0
+    os.makedirs(preview_cache.directory)
+    open(os.path.join(preview_cache.directory, 'key.lock'), 'w').close()
+    render = Mock(return_value=PNG)
+
+    assert preview_cache.get_or_render('key', render) == PNG
+    assert render.call_count == 1
+
+
+def test_nothing_is_cached_if_both_tiers_are_switched_off(preview_cache):
+    preview_cache.memory_bytes = preview_cache.disk_bytes = 0
+    render = Mock(return_value=PNG)
+
+    preview_cache.get_or_render('key', render)
+    preview_cache.get_or_render('key', render)
+
+    assert render.call_count == 2
+
+
+def test_preview_key_depends_on_everything_about_the_preview():
+    key = get_preview_key(template={'id': '1', 'version': 1}, values=None, filetype='png', page='1')
+
+    assert key == get_preview_key(page='1', filetype='png', values=None, template={'version': 1, 'id': '1'})
+    assert key != get_preview_key(template={'id': '1', 'version': 2}, values=None, filetype='png', page='1')
+    assert key != get_preview_key(template={'id': '1', 'version': 1}, values=None, filetype='png', page='2')
+    assert key != get_preview_key(template={'id': '1', 'version': 1}, values={'a': 'b'}, filetype='png', page='1')
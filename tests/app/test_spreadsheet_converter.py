@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+from io import BytesIO
+from unittest.mock import ANY, Mock, PropertyMock
+from zipfile import BadZipFile
+
+import pytest
+
+from app.spreadsheet_converter import SpreadsheetConverter, SpreadsheetConversionTimeout
+
+EXCEL_FILE = os.path.join(os.path.dirname(__file__), '..', 'spreadsheet_files', 'excel 2007.xlsx')
+
+
+@pytest.fixture
+def converter(app_, mocker):
+    mocker.patch.dict(app_.config, {'SPREADSHEET_CONVERSION_PROCESSES': 1, 'SPREADSHEET_CONVERSION_TIMEOUT': 1})
+    converter = SpreadsheetConverter()
+    converter.init_app(app_)
+    converter.progress_interval = 0.1
+    yield converter
+    converter.restart()
+
+
+@pytest.fixture
+def mock_pool(converter, mocker):
+    return mocker.patch.object(SpreadsheetConverter, 'pool')
+
+
+def test_converts_excel_files_in_another_process(converter, mocker):
+    mock_timing = mocker.patch('app.statsd_client.timing')
+
+    with open(EXCEL_FILE, 'rb') as upload:
+        spreadsheet = converter.from_file(upload, filename='excel 2007.xlsx')
+
+    assert spreadsheet.as_csv_data.startswith('phone number,name,favourite colour,fruit\r\n')
+    mock_timing.assert_called_once_with('spreadsheet-conversion.xlsx', ANY)
+
+
+@pytest.mark.parametrize('filename', ['file.csv', 'file.tsv'])
+def test_converts_text_files_in_this_process(converter, mock_pool, filename):
+    spreadsheet = converter.from_file(BytesIO(b'phone number\n07700900986'), filename=filename)
+
+    assert spreadsheet.as_csv_data == 'phone number\r\n07700900986'
+    assert not mock_pool.apply_async.called
+
+
+def test_converts_in_this_process_if_switched_off(app_, mocker):
+    converter = SpreadsheetConverter()
+    converter.init_app(app_)
+    mock_from_file = mocker.patch('app.utils.Spreadsheet.from_file')
+
+    converter.from_file(BytesIO(b'foo'), filename='file.xlsx')
+
+    mock_from_file.assert_called_once_with(ANY, 'file.xlsx')
+
+
+def test_converts_in_this_process_if_pool_cant_start(converter, mocker):
+    mocker.patch.object(SpreadsheetConverter, 'pool', new_callable=PropertyMock, side_effect=OSError)
+    mock_from_file = mocker.patch('app.utils.Spreadsheet.from_file')
+
+    converter.from_file(BytesIO(b'foo'), filename='file.xlsx')
+
+    assert mock_from_file.call_args[0][0].read() == b'foo'
+
+
+def test_errors_reading_file_are_raised(converter, mock_pool):
+    mock_pool.apply_async.return_value.get.side_effect = BadZipFile
+
+    with pytest.raises(BadZipFile):
+        converter.from_file(BytesIO(b'not really excel'), filename='file.xlsx')
+
+
+def test_gives_up_and_replaces_pool_if_conversion_takes_too_long(converter, mock_pool, mocker):
+    mock_incr = mocker.patch('app.statsd_client.incr')
+    mock_pool.apply_async.return_value.get.side_effect = multiprocessing.TimeoutError
+    mock_restart = mocker.patch.object(SpreadsheetConverter, 'restart')
+
+    with pytest.raises(SpreadsheetConversionTimeout):
+        converter.from_file(BytesIO(b'a very big spreadsheet'), filename='file.xlsx')
+
+    assert mock_pool.apply_async.return_value.get.call_count > 1
+    mock_restart.assert_called_once_with()
+    mock_incr.assert_called_once_with('spreadsheet-conversion.xlsx.timeout')
+
+
+def test_conversion_process_is_given_the_uploads_filename_not_its_contents(converter, mock_pool):
+    uploads = []
+
+    def read_upload(function, args):
+        with open(args[0], 'rb') as upload:
+            uploads.append(upload.read())
+        with open(args[2], 'w') as csv_file:
+            csv_file.write('phone number\r\n07700900986')
+        return Mock()
+
+    mock_pool.apply_async.side_effect = read_upload
+
+    converter.from_file(BytesIO(b'a very big spreadsheet'), filename='file.xlsx')
+
+    assert uploads == [b'a very big spreadsheet']
+    assert not os.path.exists(mock_pool.apply_async.call_args[0][1][0])
+
+
+def test_temporary_file_is_removed_once_read(converter, mock_pool, mocker):
+    csv_filenames = []
+
+    def write_csv_file(function, args):
+        csv_filenames.append(args[2])
+        with open(args[2], 'w') as csv_file:
+            csv_file.write('phone number\r\n07700900986')
+        return Mock()
+
+    mock_pool.apply_async.side_effect = write_csv_file
+
+    spreadsheet = converter.from_file(BytesIO(b'foo'), filename='file.xlsx')
+    assert os.path.exists(csv_filenames[0])
+    assert spreadsheet.as_csv_data == 'phone number\r\n07700900986'
+    assert not os.path.exists(csv_filenames[0])
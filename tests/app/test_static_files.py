@@ -0,0 +1,69 @@
+import gzip
+
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+from app.asset_fingerprinter import AssetFingerprinter
+from app.static_files import StaticFiles
+
+
+@pytest.fixture
+def static_files(tmpdir):
+    tmpdir.join('stylesheets').mkdir().join('main.css').write('body { font-family: nta; }')
+    tmpdir.join('stylesheets', 'main.css.gz').write_binary(gzip.compress(b'body { font-family: nta; }'))
+
+    def application(environ, start_response):
+        start_response('200 OK', [])
+        return [b'from the app']
+
+    return Client(
+        StaticFiles(
+            application,
+            AssetFingerprinter(filesystem_path=str(tmpdir) + '/'),
+            root=str(tmpdir),
+            prefix='/static',
+        ),
+        BaseResponse,
+    )
+
+
+def test_fingerprinted_url_is_cached_forever(static_files):
+    response = static_files.get('/static/stylesheets/main.css?3688a0580abd589cfc9b05ef7e3ac5ea')
+
+    assert response.status_code == 200
+    assert response.data == b'body { font-family: nta; }'
+    assert response.headers['Cache-Control'] == 'max-age=315360000, public, immutable'
+
+
+@pytest.mark.parametrize('url', [
+    '/static/stylesheets/main.css',
+    '/static/stylesheets/main.css?an-old-fingerprint',
+])
+def test_url_without_current_fingerprint_is_cached_briefly(static_files, url):
+    response = static_files.get(url)
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'max-age=60, public'
+
+
+def test_compressed_copy_is_sent_if_accepted(static_files):
+    response = static_files.get('/static/stylesheets/main.css', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == b'body { font-family: nta; }'
+
+
+def test_other_requests_go_to_the_app(static_files):
+    assert static_files.get('/static/stylesheets/missing.css').data == b'from the app'
+
+
+def test_static_files_skip_flask(client, mocker):
+    mock_load_service = mocker.patch('app.service_api_client.get_service')
+
+    response = client.get('/static/images/email-template/crown-32px.gif')
+
+    assert response.status_code == 200
+    assert 'Set-Cookie' not in response.headers
+    assert 'X-Frame-Options' not in response.headers
+    assert not mock_load_service.called
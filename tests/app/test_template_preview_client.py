@@ -0,0 +1,146 @@
+import struct
+import zlib
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from app.template_preview_client import CircuitBreaker, TemplatePreviewClient, get_placeholder_png
+
+
+@pytest.fixture
+def preview_client(app_):
+    client = TemplatePreviewClient()
+    client.init_app(app_)
+    client.statsd_client = client.breaker.statsd_client = Mock()
+    return client
+
+
+def _breaker_states(statsd_client):
+    return [
+        call[0][0] for call in statsd_client.incr.call_args_list
+        if '.circuit-breaker.' in call[0][0]
+    ]
+
+
+def test_preview_is_requested_with_timeouts(preview_client, mocker):
+    mock_post = mocker.patch('requests.Session.post', return_value=Mock(
+        content=b'pdf', status_code=200, headers={'Content-Type': 'application/pdf'},
+    ))
+
+    content, status_code, headers = preview_client.preview('pdf', {'template': 'foo'}, page=2)
+
+    assert (content, status_code, list(headers)) == (b'pdf', 200, [('Content-Type', 'application/pdf')])
+    mock_post.assert_called_once_with(
+        'http://localhost:9999/preview.pdf?page=2',
+        json={'template': 'foo'},
+        headers={'Authorization': 'Token my-secret-key'},
+        timeout=(3.05, 15),
+    )
+    preview_client.statsd_client.timing.assert_called_once_with('template-preview.pdf', mocker.ANY)
+
+
+def test_session_is_reused(preview_client):
+    assert preview_client.session is preview_client.session
+
+
+@pytest.mark.parametrize('filetype, expected_content, expected_content_type', [
+    ('png', get_placeholder_png(), 'image/png'),
+    ('pdf', b'', None),
+    ('json', b'', None),
+])
+def test_placeholder_is_served_if_preview_service_cant_be_reached(
+    preview_client,
+    mocker,
+    filetype,
+    expected_content,
+    expected_content_type,
+):
+    mocker.patch('requests.Session.post', side_effect=requests.ConnectTimeout)
+
+    content, status_code, headers = preview_client.preview(filetype, {})
+
+    assert content == expected_content
+    assert status_code == 503
+    assert dict(headers).get('Content-Type') == expected_content_type
+    assert dict(headers)['Cache-Control'] == 'no-store'
+
+
+def test_breaker_opens_after_repeated_failures(preview_client, mocker):
+    mock_post = mocker.patch('requests.Session.post', return_value=Mock(content=b'', status_code=500, headers={}))
+
+    for _ in range(5):
+        assert preview_client.preview('png', {})[1] == 500
+    assert preview_client.preview('png', {})[1] == 503
+
+    assert mock_post.call_count == 5
+    assert preview_client.breaker.state == CircuitBreaker.OPEN
+    assert _breaker_states(preview_client.statsd_client) == [
+        'template-preview.circuit-breaker.open',
+        'template-preview.circuit-breaker.rejected',
+    ]
+
+
+def test_breaker_tries_the_service_again_after_a_while(preview_client, mocker):
+    mock_monotonic = mocker.patch('app.template_preview_client.monotonic', return_value=0)
+    for _ in range(5):
+        preview_client.breaker.record_failure()
+    mock_post = mocker.patch('requests.Session.post', return_value=Mock(content=b'png', status_code=200, headers={}))
+
+    mock_monotonic.return_value = 29
+    assert preview_client.preview('png', {})[1] == 503
+    mock_monotonic.return_value = 30
+    assert preview_client.preview('png', {})[1] == 200
+
+    assert mock_post.call_count == 1
+    assert preview_client.breaker.state == CircuitBreaker.CLOSED
+    assert _breaker_states(preview_client.statsd_client) == [
+        'template-preview.circuit-breaker.open',
+        'template-preview.circuit-breaker.rejected',
+        'template-preview.circuit-breaker.half-open',
+        'template-preview.circuit-breaker.closed',
+    ]
+
+
+def test_breaker_opens_again_if_the_service_is_still_failing():
+    breaker = CircuitBreaker('foo', failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.allow_request() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_only_one_call_tries_the_service_while_half_open(mocker):
+    mock_monotonic = mocker.patch('app.template_preview_client.monotonic', return_value=0)
+    breaker = CircuitBreaker('foo', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    mock_monotonic.return_value = 30
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+
+def test_preview_isnt_requested_if_too_many_are_already_going(preview_client, mocker):
+    mock_post = mocker.patch('requests.Session.post')
+    preview_client.queue_timeout = 0
+    for _ in range(preview_client.max_concurrency):
+        preview_client._semaphore.acquire()
+
+    assert preview_client.preview('png', {})[1] == 503
+
+    assert mock_post.called is False
+    preview_client.statsd_client.incr.assert_called_once_with('template-preview.queue-full')
+
+
+def test_placeholder_is_a_valid_png():
+    png = get_placeholder_png()
+
+    assert png.startswith(b'\x89PNG\r\n\x1a\n')
+    width, height = struct.unpack('>II', png[16:24])
+    assert (width, height) == (595, 842)
+    idat_length = struct.unpack('>I', png[33:37])[0]
+    assert png[37:41] == b'IDAT'
+    assert len(zlib.decompress(png[41:41 + idat_length])) == (width + 1) * height
@@ -1,9 +1,12 @@
 import pytest
 
+from collections import OrderedDict
 from functools import partial
 from unittest.mock import Mock
 from notifications_utils.template import LetterPreviewTemplate
 
+from app import preview_cache, service_api_client
+from app.cache import LocalCache
 from app.template_previews import TemplatePreview, get_page_count_for_letter
 
 
@@ -46,14 +49,14 @@ def test_from_database_object_makes_request(
     partial_call,
     expected_url,
 ):
-    resp = Mock(content='a', status_code='b', headers={'c': 'd'})
-    request_mock = mocker.patch('app.template_previews.requests.post', return_value=resp)
+    resp = Mock(content='a', status_code=200, headers={'c': 'd'})
+    request_mock = mocker.patch('requests.Session.post', return_value=resp)
     mocker.patch('app.template_previews.current_service', __getitem__=Mock(return_value='123'))
 
     ret = partial_call(template='foo')
 
     assert ret[0] == 'a'
-    assert ret[1] == 'b'
+    assert ret[1] == 200
     assert list(ret[2]) == [('c', 'd')]
 
     data = {
@@ -64,7 +67,43 @@ def test_from_database_object_makes_request(
     }
     headers = {'Authorization': 'Token my-secret-key'}
 
-    request_mock.assert_called_once_with(expected_url, json=data, headers=headers)
+    request_mock.assert_called_once_with(expected_url, json=data, headers=headers, timeout=(3.05, 15))
+
+
+def test_from_database_object_reuses_the_same_preview(
+    mocker,
+    client,
+):
+    resp = Mock(content=b'a', status_code=200, headers={'c': 'd'})
+    request_mock = mocker.patch('requests.Session.post', return_value=resp)
+    mocker.patch('app.template_previews.current_service', __getitem__=Mock(return_value='123'))
+    mocker.patch.object(preview_cache, '_memory', OrderedDict())
+    mocker.patch.object(preview_cache, 'memory_bytes', 1024)
+
+    first = TemplatePreview.from_database_object({'id': '1', 'version': 1}, 'png', page='1')
+    second = TemplatePreview.from_database_object({'id': '1', 'version': 1}, 'png', page='1')
+    TemplatePreview.from_database_object({'id': '1', 'version': 1}, 'png', page='2')
+
+    assert first == second == (b'a', 200, [('c', 'd')])
+    assert request_mock.call_count == 2
+
+
+@pytest.mark.parametrize('values, expected_on_disk', [
+    (None, True),
+    ({'name': 'Jo'}, False),
+])
+def test_from_database_object_only_keeps_previews_without_personalisation_on_disk(
+    mocker,
+    client,
+    values,
+    expected_on_disk,
+):
+    mocker.patch('app.template_previews.current_service', __getitem__=Mock(return_value='123'))
+    mock_get_or_render = mocker.patch.object(preview_cache, 'get_or_render')
+
+    TemplatePreview.from_database_object({'id': '1', 'version': 1}, 'png', values)
+
+    assert mock_get_or_render.call_args[1] == {'on_disk': expected_on_disk}
 
 
 @pytest.mark.parametrize('template_type', [
@@ -94,3 +133,42 @@ def test_page_count_unpacks_from_json_response(
 
     assert partial_call({'template_type': 'letter'}) == 99
     mock_template_preview.assert_called_once_with(*expected_template_preview_args)
+
+
+def test_page_count_is_remembered_until_the_template_changes(
+    mocker,
+):
+    mocker.patch('app.shared_cache.backend', LocalCache())
+    mocker.patch('app.template_previews.current_service', __getitem__=Mock(return_value='123'))
+    mocker.patch('app.notify_client.current_user', id='1')
+    mocker.patch('app.service_api_client.post')
+    mock_template_preview = mocker.patch('app.template_previews.TemplatePreview.from_database_object')
+    mock_template_preview.return_value = (b'{"count": 2}', 200, {})
+    template = {'template_type': 'letter', 'service': '1234', 'id': '5678', 'version': 1}
+
+    assert get_page_count_for_letter(template) == 2
+    assert get_page_count_for_letter(template) == 2
+    assert mock_template_preview.call_count == 1
+
+    get_page_count_for_letter(template, values={'foo': 'bar'})
+    get_page_count_for_letter(dict(template, version=2))
+    assert mock_template_preview.call_count == 3
+
+    service_api_client.update_service_template('5678', 'name', 'letter', 'content', '1234')
+    get_page_count_for_letter(template)
+    assert mock_template_preview.call_count == 4
+
+
+def test_page_count_isnt_remembered_while_the_template_preview_service_is_unavailable(
+    mocker,
+):
+    mocker.patch('app.shared_cache.backend', LocalCache())
+    mocker.patch('app.template_previews.current_service', __getitem__=Mock(return_value='123'))
+    mock_template_preview = mocker.patch('app.template_previews.TemplatePreview.from_database_object')
+    mock_template_preview.return_value = (b'', 503, [])
+    template = {'template_type': 'letter', 'service': '1234', 'id': '5678', 'version': 1}
+
+    assert get_page_count_for_letter(template) is None
+
+    mock_template_preview.return_value = (b'{"count": 2}', 200, {})
+    assert get_page_count_for_letter(template) == 2
@@ -1,10 +1,12 @@
 from pathlib import Path
-from io import StringIO
+from io import BytesIO, StringIO
 from collections import OrderedDict
 from csv import DictReader
 
+import dateutil
 from freezegun import freeze_time
 import pytest
+from werkzeug.http import generate_etag, quote_etag
 
 from app.utils import (
     email_safe,
@@ -13,7 +15,9 @@ from app.utils import (
     generate_next_dict,
     Spreadsheet,
     get_letter_timings,
-    get_cdn_domain
+    get_cdn_domain,
+    gmt_timezones,
+    with_etag,
 )
 
 
@@ -121,6 +125,52 @@ def test_can_create_spreadsheet_from_dict_with_filename():
     assert Spreadsheet.from_dict({}, filename='empty.csv').as_dict['file_name'] == "empty.csv"
 
 
+@pytest.mark.parametrize('file_contents', [
+    b'',
+    b'phone number\n07700900123\n',
+    b'phone number\r\n07700900123\r\n07700900124',
+    b'name\rJos\xc3\xa9\r\r\nZo\xc3\xab\n',
+])
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 64 * 1024])
+def test_csv_files_are_converted_the_same_whatever_the_chunk_size(mocker, file_contents, chunk_size):
+    mocker.patch.object(Spreadsheet, 'chunk_size', chunk_size)
+    expected = '\r\n'.join(file_contents.decode('utf-8').splitlines())
+
+    assert Spreadsheet.from_file(BytesIO(file_contents), filename='foo.csv').as_csv_data == expected
+    assert Spreadsheet.from_file(BytesIO(file_contents), filename='foo.csv').as_stream().read() == (
+        expected.encode('utf-8')
+    )
+
+
+@pytest.mark.parametrize('filename', [
+    'excel_97.xls',
+    'open document spreadsheet.ods',
+    'tab separated.tsv',
+])
+def test_spreadsheets_can_be_streamed(mocker, filename):
+    mocker.patch.object(Spreadsheet, 'chunk_size', 16)
+
+    with open(str(Path.cwd() / 'tests' / 'spreadsheet_files' / filename), 'rb') as spreadsheet:
+        stream = Spreadsheet.from_file(spreadsheet, filename=filename).as_stream()
+        chunks = list(iter(lambda: stream.read(16), b''))
+
+    assert len(chunks) > 1
+    assert b''.join(chunks).decode('utf-8').startswith('phone number,name,favourite colour,fruit\r\n')
+
+
+def test_unreadable_files_are_rejected_before_being_streamed():
+    with pytest.raises(UnicodeDecodeError):
+        Spreadsheet.from_file(BytesIO(b'\x89PNG\r\n'), filename='foo.csv')
+
+
+def test_spreadsheet_can_only_be_streamed_once():
+    spreadsheet = Spreadsheet.from_rows([['foo'], ['bar']])
+    spreadsheet.as_stream()
+
+    with pytest.raises(RuntimeError):
+        spreadsheet.as_csv_data
+
+
 def test_generate_notifications_csv_returns_correct_csv_file(_get_notifications_csv_mock):
     csv_content = generate_notifications_csv(service_id='1234')
     csv_file = DictReader(StringIO('\n'.join(csv_content)))
@@ -156,6 +206,49 @@ def test_generate_notifications_csv_calls_twice_if_next_link(mocker):
     assert mock_get_notifications.mock_calls[1][2]['page'] == 2
 
 
+def test_generate_notifications_csv_quotes_values(mocker):
+    mocker.patch(
+        'app.notification_api_client.get_notifications_for_service',
+        return_value=_get_notifications_csv('1234', recipient='Doe, Jane', job_name='"quoted".csv'),
+    )
+
+    csv_file = DictReader(StringIO(''.join(generate_notifications_csv(service_id='1234'))))
+    row = next(csv_file)
+
+    assert row['Recipient'] == 'Doe, Jane'
+    assert row['Job'] == '"quoted".csv'
+
+
+def test_generate_notifications_csv_yields_chunks_of_whole_rows(app_, mocker):
+    mocker.patch.dict(app_.config, {'CSV_EXPORT_CHUNK_SIZE': 100})
+    mocker.patch(
+        'app.notification_api_client.get_notifications_for_service',
+        return_value=_get_notifications_csv('1234', rows=10),
+    )
+
+    chunks = list(generate_notifications_csv(service_id='1234'))
+
+    assert len(chunks) > 1
+    assert all(chunk.endswith('\n') for chunk in chunks if chunk)
+    assert len(list(DictReader(StringIO(''.join(chunks))))) == 10
+
+
+def test_generate_notifications_csv_doesnt_keep_pages_for_the_rest_of_the_request(app_, mocker):
+    mocker.patch(
+        'app.notification_api_client.get_notifications_for_service',
+        side_effect=[
+            _get_notifications_csv('1234', rows=7, with_links=True),
+            _get_notifications_csv('1234', rows=3, with_links=False),
+        ]
+    )
+    mock_clear_request_cache = mocker.patch('app.notify_client.clear_request_cache')
+
+    csv_content = generate_notifications_csv(service_id='1234', page='1')
+
+    assert len(list(DictReader(StringIO(''.join(csv_content))))) == 10
+    assert mock_clear_request_cache.call_count == 2
+
+
 @freeze_time('2017-07-14 14:59:59')  # Friday, before print deadline
 @pytest.mark.parametrize('upload_time, expected_print_time, is_printed, expected_earliest, expected_latest', [
 
@@ -290,6 +383,29 @@ def test_get_estimated_delivery_date_for_letter(
     assert timings.latest_delivery.strftime('%A %Y-%m-%d') == expected_latest
 
 
+@pytest.mark.parametrize('timestamp, expected_uk_time', [
+    ('2017-01-01T12:00:00.000000+00:00', '2017-01-01 12:00:00+00:00'),
+    ('2017-07-01T12:00:00.000000+00:00', '2017-07-01 13:00:00+01:00'),
+    ('2017-07-01 23:30:00.5', '2017-07-02 00:30:00.500000+01:00'),
+    ('2017-07-01T23:30:00Z', '2017-07-02 00:30:00+01:00'),
+    ('2017-07-01', '2017-07-01 01:00:00+01:00'),
+    ('1 July 2017 12:00', '2017-07-01 13:00:00+01:00'),
+])
+def test_gmt_timezones(timestamp, expected_uk_time):
+    assert str(gmt_timezones(timestamp)) == expected_uk_time
+
+
+def test_gmt_timezones_only_parses_each_timestamp_once(mocker):
+    mock_parse = mocker.patch('app.utils.dateutil.parser.parse', wraps=dateutil.parser.parse)
+    gmt_timezones.cache_clear()
+
+    for _ in range(3):
+        gmt_timezones('2017-07-01T12:00:00.000000+00:00')
+        gmt_timezones('1 July 2017 12:00')
+
+    mock_parse.assert_called_once_with('1 July 2017 12:00')
+
+
 def test_get_cdn_domain_on_localhost(client, mocker):
     mocker.patch.dict('app.current_app.config', values={'ADMIN_BASE_URL': 'http://localhost:6012'})
     domain = get_cdn_domain()
@@ -300,3 +416,38 @@ def test_get_cdn_domain_on_non_localhost(client, mocker):
     mocker.patch.dict('app.current_app.config', values={'ADMIN_BASE_URL': 'https://some.admintest.com'})
     domain = get_cdn_domain()
     assert domain == 'static-logos.admintest.com'
+
+
+FOO_ETAG = quote_etag(generate_etag(b'foo\n'))
+
+
+@pytest.mark.parametrize('method', ['GET', 'POST'])
+@pytest.mark.parametrize('if_none_match, expected_status, expected_stat', [
+    (None, 200, 'etag.foo.modified'),
+    ('"something else"', 200, 'etag.foo.modified'),
+    (FOO_ETAG, 304, 'etag.foo.not-modified'),
+])
+def test_with_etag_only_sends_content_the_browser_doesnt_have(
+    app_, mocker, method, if_none_match, expected_status, expected_stat
+):
+    mock_incr = mocker.patch('app.statsd_client.incr')
+    headers = {'If-None-Match': if_none_match} if if_none_match else {}
+
+    with app_.test_request_context(method=method, headers=headers) as request_context:
+        request_context.request.url_rule = mocker.Mock(endpoint='foo')
+        response = with_etag(lambda: 'foo\n')()
+
+    assert response.status_code == expected_status
+    assert response.headers['ETag'] == FOO_ETAG
+    mock_incr.assert_called_once_with(expected_stat)
+
+
+def test_with_etag_leaves_errors_alone(app_, mocker):
+    mock_incr = mocker.patch('app.statsd_client.incr')
+
+    with app_.test_request_context():
+        response = with_etag(lambda: ('Not found', 404))()
+
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+    assert not mock_incr.called
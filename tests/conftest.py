@@ -1315,6 +1315,9 @@ def mock_get_users_by_service(mocker):
 @pytest.fixture(scope='function')
 def mock_s3_upload(mocker):
     def _upload(service_id, filedata, region):
+        # read streamed uploads now, while the file they're converted from is still open
+        if hasattr(filedata['data'], 'read'):
+            filedata['data'] = filedata['data'].read().decode('utf-8')
         return fake_uuid()
 
     return mocker.patch('app.main.views.send.s3upload', side_effect=_upload)